@@ -1,5 +1,5 @@
 import logging
-import os, json
+import os, sys, json, shutil, threading, time, contextlib
 
 import vtk
 
@@ -115,30 +115,48 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
         # cache time expensive check results (run async later)
         self._imageLocallyAvailable = ""
+        self._imageCheckPending = False
+        self._prefetchCheckPending = False
         self._isDockerInstalled = None
+        self.startupTelemetry = None    # startup time by stage (see setup)
+        self._logTransient = False      # the last line of the log window is a progress bar update (see addLog)
+
+        # running and queued jobs (see MRunnerLogic.processAsync)
+        self._jobs = []
 
     def setup(self):
         """
         Called when the user opens the module the first time and the widget is initialized.
         """
         logging.info('>>>>>>>> MRunnerWidget Setup')
+
+        # add file-path to pythonpath (NOTE: seems only required on linux?)
+        sys.path.insert(0, os.path.join(os.getcwd(), 'MRunner'))
+
+        # startup time by stage, logged with the run telemetry (see Utils.Telemetry)
+        from Utils.Telemetry import RunTelemetry
+        self.startupTelemetry = RunTelemetry(f"{int(time.time() * 1000):x}", "startup")
+
         ScriptedLoadableModuleWidget.setup(self)
 
         # Load widget from .ui file (created by Qt Designer).
         # Additional widgets can be instantiated manually and added to self.layout.
-        uiWidget = slicer.util.loadUI(self.resourcePath('UI/MRunner.ui'))
-        self.layout.addWidget(uiWidget)
-        self.ui = slicer.util.childWidgetVariables(uiWidget)
+        with self.startupTelemetry.span("load ui"):
+            uiWidget = slicer.util.loadUI(self.resourcePath('UI/MRunner.ui'))
+            self.layout.addWidget(uiWidget)
+            self.ui = slicer.util.childWidgetVariables(uiWidget)
 
-        # Set scene in MRML widgets. Make sure that in Qt designer the top-level qMRMLWidget's
-        # "mrmlSceneChanged(vtkMRMLScene*)" signal in is connected to each MRML widget's.
-        # "setMRMLScene(vtkMRMLScene*)" slot.
-        uiWidget.setMRMLScene(slicer.mrmlScene)
+            # Set scene in MRML widgets. Make sure that in Qt designer the top-level qMRMLWidget's
+            # "mrmlSceneChanged(vtkMRMLScene*)" signal in is connected to each MRML widget's.
+            # "setMRMLScene(vtkMRMLScene*)" slot.
+            uiWidget.setMRMLScene(slicer.mrmlScene)
 
         # Create logic class. Logic implements all computations that should be possible to run
         # in batch mode, without a graphical user interface.
         self.logic = MRunnerLogic()
         self.logic.logCallback = self.addLog
+        self.logic.progressCallback = self.onProgress
+        self.logic.telemetryCallback = self.onRunTelemetry
         self.logic.resourcePath = self.resourcePath
 
         # Connections
@@ -158,20 +176,36 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.ui.gpuCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
         self.ui.dockerNoCacheCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
         self.ui.modelComboBox.currentTextChanged.connect(self.updateParameterNodeFromGUI)
-
-        # install required python packages and add file-path to pythonpath (NOTE: the latter seems only required on linux?)
-        self.logic.setupPythonRequirements()
-        import sys
-        sys.path.insert(0, os.path.join(os.getcwd(), 'MRunner'))
-
-        # load repo definition and pass down to logic
-        from Utils.Repo import Repository
-        self.repo = Repository(self.resourcePath('Dockerfiles/repo.json'))
-        self.logic.repo = self.repo
-
-        # exract model names from repo definition and feed into dropdown
-        for model in self.repo.getModels():
-            self.ui.modelComboBox.addItem(f"{model.getLabel()} ({model.getDockerfile().REPOSITORY}:{model.getDockerfile().getImageName()})", model)
+        self.ui.batchModeCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.keepWarmCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.warmIdleTimeoutSpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.maxWorkersSpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.useResultCacheCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.keepRunsSpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.workDirQuotaSpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.sharedMemoryInputCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.importWorkersSpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.streamImportCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.prefetchImageCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.limitContainerResourcesCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.containerCPUsSpinBox.connect("valueChanged(double)", self.updateParameterNodeFromGUI)
+        self.ui.containerMemorySpinBox.connect("valueChanged(int)", self.updateParameterNodeFromGUI)
+        self.ui.containerShmSpinBox.connect("valueChanged(double)", self.updateParameterNodeFromGUI)
+        self.ui.containerHostIPCCheckBox.connect("toggled(bool)", self.updateParameterNodeFromGUI)
+        self.ui.batchInputSelector.connect("checkedNodesChanged()", self.updateParameterNodeFromGUI)
+        self.ui.batchFolderLineEdit.connect("currentPathChanged(QString)", self.updateParameterNodeFromGUI)
+
+        # required python packages are installed before the first run (see onApplyButton),
+        # docker is checked in the background, the apply button is enabled once it is available
+        self.logic.startDockerProbe()
+        qt.QTimer.singleShot(self.logic.dockerProbeInterval, self.onDockerProbeTimeout)
+
+        # load repo definition (local copy of the catalog) and refresh the catalog in the background
+        with self.startupTelemetry.span("load catalog"):
+            self.repo = self.logic.loadRepo()
+            self.updateModelComboBox()
+        self.logic.downloadRepo()
+        qt.QTimer.singleShot(self.logic.catalogSyncInterval, self.onCatalogSyncTimeout)
 
         # test table view
         self.ui.modelTableWidget.setRowCount(2)
@@ -187,6 +221,9 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
         # Buttons
         self.ui.applyButton.connect('clicked(bool)', self.onApplyButton)
+        self.ui.cancelButton.connect('clicked(bool)', self.onCancelButton)
+        self.ui.resultCacheInspectButton.connect('clicked(bool)', self.onResultCacheInspectButton)
+        self.ui.resultCacheClearButton.connect('clicked(bool)', self.onResultCacheClearButton)
         self.ui.advancedCollapsibleButton.collapsed = False
         self.ui.cmdTest1.connect('clicked(bool)', self.onTest1ButtonClick)
         self.ui.cmdTest2.connect('clicked(bool)', self.onTest2ButtonClick)
@@ -200,13 +237,25 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.ui.cmdTest2.setVisible(False)
 
         # Make sure parameter node is initialized (needed for module reload)
-        self.initializeParameterNode()
+        with self.startupTelemetry.span("parameter node"):
+            self.initializeParameterNode()
+
+        self.logic.finishTelemetry(self.startupTelemetry, "done")
+        logging.info(f"MRunner startup completed in {self.startupTelemetry.root.duration:.2f} seconds.")
+
+        # result cache summary (reads all entries, refreshed after runs and clear only)
+        qt.QTimer.singleShot(0, self.updateResultCacheLabel)
 
     def cleanup(self):
         """
         Called when the application closes and the module widget is destroyed.
         """
         self.removeObservers()
+        if self.logic:
+            self.logic.cancelAllJobs()
+            self.logic.stopWarmServers()
+            self.logic.clearExports()
+            self.logic.cancelPrefetches()
 
     def enter(self):
         """
@@ -304,6 +353,51 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.updateDownloadDockerfileCheckBox(model)
         self.updateGpuCheckBox(model)
 
+        # update warm model server options
+        self.ui.keepWarmCheckBox.checked = (self._parameterNode.GetParameter("KeepWarm") == "true")
+        self.ui.warmIdleTimeoutSpinBox.value = int(self._parameterNode.GetParameter("WarmIdleTimeout"))
+        self.logic.warmIdleTimeout = self.ui.warmIdleTimeoutSpinBox.value * 60
+
+        # update worker pool size (0: auto)
+        self.ui.maxWorkersSpinBox.value = int(self._parameterNode.GetParameter("MaxWorkers"))
+        self.logic.maxWorkers = self.ui.maxWorkersSpinBox.value
+
+        # update result cache
+        self.ui.useResultCacheCheckBox.checked = (self._parameterNode.GetParameter("UseResultCache") == "true")
+        self.logic.useResultCache = self.ui.useResultCacheCheckBox.checked
+
+        # update working directory options
+        self.ui.keepRunsSpinBox.value = int(self._parameterNode.GetParameter("KeepRuns"))
+        self.logic.keepRuns = self.ui.keepRunsSpinBox.value
+        self.ui.workDirQuotaSpinBox.value = int(self._parameterNode.GetParameter("WorkDirQuota"))
+        self.logic.workDirQuotaGB = self.ui.workDirQuotaSpinBox.value
+        self.ui.sharedMemoryInputCheckBox.checked = (self._parameterNode.GetParameter("SharedMemoryInput") == "true")
+        self.logic.useSharedMemoryInput = self.ui.sharedMemoryInputCheckBox.checked
+        self.ui.importWorkersSpinBox.value = int(self._parameterNode.GetParameter("ImportWorkers"))
+        self.logic.importWorkers = self.ui.importWorkersSpinBox.value
+        self.ui.streamImportCheckBox.checked = (self._parameterNode.GetParameter("StreamImport") == "true")
+        self.logic.streamImport = self.ui.streamImportCheckBox.checked
+        self.ui.prefetchImageCheckBox.checked = (self._parameterNode.GetParameter("PrefetchImage") == "true")
+        self.logic.prefetchImages = self.ui.prefetchImageCheckBox.checked
+
+        # update container resource limits
+        self.ui.limitContainerResourcesCheckBox.checked = (self._parameterNode.GetParameter("LimitContainerResources") == "true")
+        self.logic.limitContainerResources = self.ui.limitContainerResourcesCheckBox.checked
+        self.ui.containerCPUsSpinBox.value = float(self._parameterNode.GetParameter("ContainerCPUs"))
+        self.logic.containerCPUs = self.ui.containerCPUsSpinBox.value
+        self.ui.containerMemorySpinBox.value = int(self._parameterNode.GetParameter("ContainerMemory"))
+        self.logic.containerMemoryGB = self.ui.containerMemorySpinBox.value
+        self.ui.containerShmSpinBox.value = float(self._parameterNode.GetParameter("ContainerShm"))
+        self.logic.containerShmGB = self.ui.containerShmSpinBox.value
+        self.ui.containerHostIPCCheckBox.checked = (self._parameterNode.GetParameter("ContainerHostIPC") == "true")
+        self.logic.containerHostIPC = self.ui.containerHostIPCCheckBox.checked
+        for widget in (self.ui.containerCPUsSpinBox, self.ui.containerMemorySpinBox, self.ui.containerShmSpinBox, self.ui.containerHostIPCCheckBox):
+            widget.enabled = self.ui.limitContainerResourcesCheckBox.checked
+
+        # update batch mode
+        self.ui.batchModeCheckBox.checked = (self._parameterNode.GetParameter("BatchMode") == "true")
+        self.updateBatchModeVisibility()
+
         # update output
         self.updateOutputSegmentationSelectorBasename(model)
 
@@ -358,20 +452,122 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             Set the apply button text to indicate if (re-)build or pull is required on apply.
         """
 
-        # check if docker image is available (not cached)
-        try:
-            imageLocallyAvailable = self.logic.checkImage(model, useGPU=self.ui.gpuCheckBox.checked)
-        except:
+        # check if docker image is available (cached, never blocks on the docker daemon, checked after the docker probe)
+        if self._isDockerInstalled is None:
+            imageLocallyAvailable = None
+        elif not self._isDockerInstalled:
             imageLocallyAvailable = False
+        else:
+            try:
+                imageLocallyAvailable = self.logic.checkImage(model, useGPU=self.ui.gpuCheckBox.checked, wait=False)
+            except:
+                imageLocallyAvailable = False
         self._imageLocallyAvailable = imageLocallyAvailable
 
+        # inventory not loaded yet, check again once the background refresh is done (unless it failed, e.g. daemon down)
+        if imageLocallyAvailable is None and self._isDockerInstalled:
+            if self.logic.getImageInventory().getError() is not None and not self.logic.getImageInventory().isRefreshing():
+                imageLocallyAvailable = self._imageLocallyAvailable = False
+            elif not self._imageCheckPending:
+                self._imageCheckPending = True
+                qt.QTimer.singleShot(250, self.onImageCheckTimeout)
+
+        # start downloading a missing image while the input is selected
+        useGPU = self.ui.gpuCheckBox.checked
+        if imageLocallyAvailable is False and self.ui.prefetchImageCheckBox.checked and not self.ui.dockerNoCacheCheckBox.checked:
+            self.logic.prefetchImage(model, useGPU=useGPU, downloadDockerfile=self.ui.downloadDockerfileCheckBox.checked)
+
+        # check again once the prefetch is done
+        prefetchTask = self.logic.getPrefetchTask(model, useGPU=useGPU)
+        prefetching = prefetchTask is not None and not prefetchTask.isDone()
+        if prefetching and not self._prefetchCheckPending:
+            self._prefetchCheckPending = True
+            qt.QTimer.singleShot(1000, self.onPrefetchTimeout)
+
         # set button text
-        if imageLocallyAvailable and not self.ui.dockerNoCacheCheckBox.checked:
+        if imageLocallyAvailable is None:
+            self.ui.applyButton.text = "Apply (checking image...)"
+        elif prefetching and not self.ui.dockerNoCacheCheckBox.checked:
+            self.ui.applyButton.text = "Apply (run model, image is being downloaded...)"
+        elif imageLocallyAvailable and not self.ui.dockerNoCacheCheckBox.checked:
             self.ui.applyButton.text = "Apply (run model)"
         else:
             self.ui.applyButton.text = "Pull / Build image and Apply (run model)"
 
 
+    def onImageCheckTimeout(self):
+        """ Re-evaluate the apply button text after a background image inventory refresh.
+        """
+        self._imageCheckPending = False
+        model = self.ui.modelComboBox.currentData
+        if model is not None:
+            self.updateApplyButtonText(model)
+
+
+    def updateModelComboBox(self):
+        """ GUI-UPDATE
+            Exract model names from repo definition and feed into dropdown (keeps the selected model).
+        """
+        selected = self.ui.modelComboBox.currentData
+        selectedKey = (selected.getName(), selected.getLabel()) if selected is not None else None
+
+        wasBlocked = self.ui.modelComboBox.blockSignals(True)
+        self.ui.modelComboBox.clear()
+        for model in self.repo.getModels():
+            self.ui.modelComboBox.addItem(f"{model.getLabel()} ({model.getDockerfile().REPOSITORY}:{model.getDockerfile().getImageName()})", model)
+            if (model.getName(), model.getLabel()) == selectedKey:
+                self.ui.modelComboBox.setCurrentIndex(self.ui.modelComboBox.count - 1)
+        self.ui.modelComboBox.blockSignals(wasBlocked)
+
+
+    def onCatalogSyncTimeout(self):
+        """ Reload the model list once the background catalog sync is done and a source changed.
+        """
+        if self.logic is None:
+            return
+        if self.logic.isRepoSyncing():
+            qt.QTimer.singleShot(self.logic.catalogSyncInterval, self.onCatalogSyncTimeout)
+            return
+
+        changed, errors = self.logic.getCatalog().getSyncResult()
+        for name, error in errors.items():
+            self.addLog(f"Model catalog {name} could not be updated: {error}")
+        if changed:
+            self.repo = self.logic.loadRepo()
+            self.updateModelComboBox()
+            self.addLog(f"Model catalog updated ({len(self.repo.getModels())} models).")
+            self.updateGUIFromParameterNode()
+
+
+    def onDockerProbeTimeout(self):
+        """ Enable the apply button once the background docker check is done.
+        """
+        if self.logic is None:
+            return
+        if self.logic.isDockerProbing():
+            qt.QTimer.singleShot(self.logic.dockerProbeInterval, self.onDockerProbeTimeout)
+            return
+
+        isDockerInstalled, message = self.logic.getDockerProbeResult() or (False, None)
+        if message:
+            self.addLog(message)
+        self._isDockerInstalled = isDockerInstalled
+        self.updateApplyButtonEnabled()
+
+        model = self.ui.modelComboBox.currentData
+        if model is not None:
+            self.updateApplyButtonText(model)
+
+
+    def onPrefetchTimeout(self):
+        """ Re-evaluate the apply button text while the image of the selected model is prefetched.
+        """
+        self._prefetchCheckPending = False
+        model = self.ui.modelComboBox.currentData
+        if model is not None:
+            self.updateApplyButtonText(model)
+
+
     def updateApplyButtonEnabled(self):
         """ GUI-UPDATE
             Disable the apply button if docker is not installed or no input volume is selected.
@@ -381,25 +577,46 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         #       This won't be enforced for now, as we keep the option 
         #       to build the image outside of the plugins lifecycle during development. 
         
-        # check if docker is installed (cache this check)
-        if self._isDockerInstalled is None:
-            isDockerInstalled = self.logic.checkForDocker()
-            self._isDockerInstalled = isDockerInstalled
+        # docker is checked in the background on startup (see onDockerProbeTimeout)
+        isDockerInstalled = self._isDockerInstalled
+
+        # check if input volume is available (or batch inputs in batch mode)
+        if self.ui.batchModeCheckBox.checked:
+            inputVolume = len(self.ui.batchInputSelector.checkedNodes()) > 0 or os.path.isdir(self.ui.batchFolderLineEdit.currentPath)
         else:
-            isDockerInstalled = self._isDockerInstalled
+            inputVolume = self._parameterNode.GetNodeReference("InputVolume")
 
-        # check if input volume is available
-        inputVolume = self._parameterNode.GetNodeReference("InputVolume")
+        # jobs are running (more jobs can be queued, see MRunnerLogic.getMaxWorkers)
+        self.ui.cancelButton.enabled = len(self._jobs) > 0
 
         # set tooltip, enabled state and text
         if inputVolume and isDockerInstalled:
-            self.ui.applyButton.toolTip = "Start segmentation"
+            self.ui.applyButton.toolTip = "Start segmentation" if not self._jobs else f"Queue segmentation ({len(self._jobs)} jobs running or queued)"
             self.ui.applyButton.enabled = True
+        elif isDockerInstalled is None:
+            self.ui.applyButton.toolTip = "Checking the docker installation..."
+            self.ui.applyButton.enabled = False
         else:
             self.ui.applyButton.toolTip = "Select input volume nodes"
             self.ui.applyButton.enabled = False
 
 
+    def updateBatchModeVisibility(self):
+        """ GUI-UPDATE
+            Show the batch inputs in batch mode and the single input / output selectors otherwise.
+        """
+
+        batchMode = self.ui.batchModeCheckBox.checked
+
+        self.ui.batchInputLabel.setVisible(batchMode)
+        self.ui.batchInputSelector.setVisible(batchMode)
+        self.ui.batchFolderLabel.setVisible(batchMode)
+        self.ui.batchFolderLineEdit.setVisible(batchMode)
+        self.ui.label.setVisible(not batchMode)
+        self.ui.inputSelector.setVisible(not batchMode)
+        self.ui.outputsCollapsibleButton.setVisible(not batchMode)
+
+
     def updateOutputSegmentationSelectorBasename(self, model):
         """ GUI-UPDATE?
             Set the basename of the output node selector.
@@ -430,6 +647,36 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self._parameterNode.SetParameter("DownloadDockerfile", "true" if self.ui.downloadDockerfileCheckBox.checked else "false")
         self._parameterNode.SetParameter("UseGPU", "true" if self.ui.gpuCheckBox.checked else "false")
         self._parameterNode.SetParameter("DockerNoCache", "true" if self.ui.dockerNoCacheCheckBox.checked else "false")
+        self._parameterNode.SetParameter("BatchMode", "true" if self.ui.batchModeCheckBox.checked else "false")
+        self._parameterNode.SetParameter("KeepWarm", "true" if self.ui.keepWarmCheckBox.checked else "false")
+        self._parameterNode.SetParameter("WarmIdleTimeout", str(self.ui.warmIdleTimeoutSpinBox.value))
+        self.logic.warmIdleTimeout = self.ui.warmIdleTimeoutSpinBox.value * 60
+        self._parameterNode.SetParameter("MaxWorkers", str(self.ui.maxWorkersSpinBox.value))
+        self.logic.maxWorkers = self.ui.maxWorkersSpinBox.value
+        self._parameterNode.SetParameter("UseResultCache", "true" if self.ui.useResultCacheCheckBox.checked else "false")
+        self.logic.useResultCache = self.ui.useResultCacheCheckBox.checked
+        self._parameterNode.SetParameter("KeepRuns", str(self.ui.keepRunsSpinBox.value))
+        self.logic.keepRuns = self.ui.keepRunsSpinBox.value
+        self._parameterNode.SetParameter("WorkDirQuota", str(self.ui.workDirQuotaSpinBox.value))
+        self.logic.workDirQuotaGB = self.ui.workDirQuotaSpinBox.value
+        self._parameterNode.SetParameter("SharedMemoryInput", "true" if self.ui.sharedMemoryInputCheckBox.checked else "false")
+        self.logic.useSharedMemoryInput = self.ui.sharedMemoryInputCheckBox.checked
+        self._parameterNode.SetParameter("ImportWorkers", str(self.ui.importWorkersSpinBox.value))
+        self.logic.importWorkers = self.ui.importWorkersSpinBox.value
+        self._parameterNode.SetParameter("StreamImport", "true" if self.ui.streamImportCheckBox.checked else "false")
+        self.logic.streamImport = self.ui.streamImportCheckBox.checked
+        self._parameterNode.SetParameter("PrefetchImage", "true" if self.ui.prefetchImageCheckBox.checked else "false")
+        self.logic.prefetchImages = self.ui.prefetchImageCheckBox.checked
+        self._parameterNode.SetParameter("LimitContainerResources", "true" if self.ui.limitContainerResourcesCheckBox.checked else "false")
+        self.logic.limitContainerResources = self.ui.limitContainerResourcesCheckBox.checked
+        self._parameterNode.SetParameter("ContainerCPUs", str(self.ui.containerCPUsSpinBox.value))
+        self.logic.containerCPUs = self.ui.containerCPUsSpinBox.value
+        self._parameterNode.SetParameter("ContainerMemory", str(self.ui.containerMemorySpinBox.value))
+        self.logic.containerMemoryGB = self.ui.containerMemorySpinBox.value
+        self._parameterNode.SetParameter("ContainerShm", str(self.ui.containerShmSpinBox.value))
+        self.logic.containerShmGB = self.ui.containerShmSpinBox.value
+        self._parameterNode.SetParameter("ContainerHostIPC", "true" if self.ui.containerHostIPCCheckBox.checked else "false")
+        self.logic.containerHostIPC = self.ui.containerHostIPCCheckBox.checked
 
         # get selected model
         model = self.ui.modelComboBox.currentData
@@ -438,6 +685,9 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.updateDownloadDockerfileCheckBox(model)
         self.updateGpuCheckBox(model)
 
+        # update batch mode
+        self.updateBatchModeVisibility()
+
         # update output
         self.updateOutputSegmentationSelectorBasename(model)
 
@@ -450,14 +700,55 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self._parameterNode.EndModify(wasModified)
 
 
-    def addLog(self, text, setStep=False):
-        """Append text to log window
+    def addLog(self, text, setStep=False, transient=False):
+        """Append text to log window. A transient line (progress bar update) is replaced by the next line.
+           The log window keeps the last lines only (maximumBlockCount), the complete log of a run is in its log file.
         """
-        if not setStep:
+        if setStep:
+            self.ui.stepLabel.plainText = text
+            return
+
+        if self._logTransient:
+            cursor = self.ui.statusLabel.textCursor()
+            cursor.movePosition(qt.QTextCursor.End)
+            cursor.movePosition(qt.QTextCursor.StartOfBlock, qt.QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        else:
             self.ui.statusLabel.appendPlainText(text)
+        self._logTransient = transient
+
+    def onProgress(self, snapshot):
+        """Show pull / build progress (see Utils.Progress) in the step label and the progress bar.
+        """
+        self.ui.stepLabel.plainText = snapshot.getText()
+        percent = snapshot.getPercent()
+        if snapshot.failed:
+            self.ui.progressBar.setRange(0, 100)
+            self.ui.progressBar.value = 0
+        elif percent is None:
+            self.ui.progressBar.setRange(0, 0) # busy indicator
         else:
-            self.ui.stepLabel.plainText = text
-        slicer.app.processEvents()  # force update
+            self.ui.progressBar.setRange(0, 100)
+            self.ui.progressBar.value = percent
+
+    def onRunTelemetry(self, telemetry):
+        """Show the per-stage breakdown of a finished run (see Utils.Telemetry) in the run profile table.
+            IO and RSS are counted for the whole Slicer process, concurrent runs are included.
+        """
+        columns = ["Stage", "Wall s", "CPU s", "Read MB (process)", "Written MB (process)", "Peak RSS MB (process)"]
+        rows = telemetry.getRows()
+
+        table = self.ui.profileTableWidget
+        table.clear()
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setRowCount(len(rows))
+        for row, (name, span) in enumerate(rows):
+            values = [span.duration or 0.0, span.cpu, span.bytesRead / 1e6, span.bytesWritten / 1e6, span.peakRSS / 1e6]
+            table.setItem(row, 0, qt.QTableWidgetItem(name + (" (failed)" if span.error else "")))
+            for column, value in enumerate(values, 1):
+                table.setItem(row, column, qt.QTableWidgetItem(f"{value:.2f}" if column < 3 else f"{value:.1f}"))
+        table.resizeColumnsToContents()
 
     def onApplyButton(self):
         """
@@ -466,31 +757,99 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         with slicer.util.tryWithErrorDisplay("Failed to compute results.", waitCursor=True):
 
             # clear text field
-            self.ui.statusLabel.plainText = ''
-            self.ui.stepLabel.plainText = ''
-
-            # setup python requirements 
-            # self.logic.setupPythonRequirements() NOTE: moved to setup()
+            if not self._jobs:
+                self.ui.statusLabel.plainText = ''
+                self._logTransient = False
+                self.ui.stepLabel.plainText = ''
+                self.ui.progressBar.setRange(0, 100)
+                self.ui.progressBar.value = 0
 
-            # Create new segmentation node, if not selected yet
-            if not self.ui.outputSegmentationSelector.currentNode():
-                self.ui.outputSegmentationSelector.addNode()
-                self._parameterNode.SetNodeReferenceID("OutputSegmentation", self.ui.outputSegmentationSelector.currentNodeID)
+            # setup python requirements (checked once, deferred from setup to keep the module startup fast)
+            self.logic.setupPythonRequirements()
 
             # get image tag from dropdown
             selectedModel = self.ui.modelComboBox.currentData
 
-            # Compute output
-            self.logic.process(
+            # batch mode: one container launch for all selected volumes and / or all files of the selected folder
+            if self.ui.batchModeCheckBox.checked:
+                inputFolder = self.ui.batchFolderLineEdit.currentPath
+                job = self.logic.processBatch(
+                    model               = selectedModel,
+                    inputVolumes        = self.ui.batchInputSelector.checkedNodes(),
+                    inputFolder         = inputFolder if os.path.isdir(inputFolder) else None,
+                    downloadDockerfile  = self.ui.downloadDockerfileCheckBox.checked,
+                    useGPU              = self.ui.gpuCheckBox.checked,
+                    noCache             = self.ui.dockerNoCacheCheckBox.checked
+                )
+                self._jobs.append(job)
+                job.addDoneCallback(self.onJobFinished)
+                self.updateApplyButtonEnabled()
+                return
+
+            # Create new segmentation node, if not selected yet or still used by a running job
+            busySegmentations = [job.outputSegmentation for job in self._jobs]
+            if not self.ui.outputSegmentationSelector.currentNode() or self.ui.outputSegmentationSelector.currentNode() in busySegmentations:
+                self.ui.outputSegmentationSelector.addNode()
+                self._parameterNode.SetNodeReferenceID("OutputSegmentation", self.ui.outputSegmentationSelector.currentNodeID)
+
+            # Compute output (runs in the background, see onJobFinished)
+            job = self.logic.processAsync(
                 model               = selectedModel,
                 inputVolume         = self.ui.inputSelector.currentNode(), 
                 outputSegmentation  = self.ui.outputSegmentationSelector.currentNode(),
-                imageThreshold      = self.ui.imageThresholdSliderWidget.value, 
                 downloadDockerfile  = self.ui.downloadDockerfileCheckBox.checked,
                 useGPU              = self.ui.gpuCheckBox.checked,
-                noCache             = self.ui.dockerNoCacheCheckBox.checked
+                noCache             = self.ui.dockerNoCacheCheckBox.checked,
+                keepWarm            = self.ui.keepWarmCheckBox.checked
             )
+            self._jobs.append(job)
+            job.addDoneCallback(self.onJobFinished)
+            self.updateApplyButtonEnabled()
+
+    def onCancelButton(self):
+        """
+        Cancel all running and queued jobs (kills the containers).
+        """
+        if self._jobs:
+            self.addLog("Cancelling...", setStep=True)
+            for job in list(self._jobs):
+                job.cancel()
 
+    def onJobFinished(self, job):
+        """
+        Called on the main thread once a job is done, failed or was cancelled.
+        """
+        from Utils.Jobs import JobState
+
+        self._jobs.remove(job)
+        self.updateApplyButtonEnabled()
+
+        # image inventory changed if the image was pulled or built
+        self.updateApplyButtonText(job.model)
+
+        if job.state == JobState.FAILED:
+            slicer.util.errorDisplay(f"Failed to compute results.\n{job.error}")
+
+        # result cache might have a new entry
+        self.updateResultCacheLabel()
+
+    def updateResultCacheLabel(self):
+        cache = self.logic.getResultCache()
+        entries = cache.getEntries()
+        size = sum(entry.bytes for entry in entries)
+        self.ui.resultCacheLabel.text = f"{len(entries)} results, {size / 1024**2:.1f} MB" if entries else "Empty"
+
+    def onResultCacheInspectButton(self):
+        import datetime
+        entries = sorted(self.logic.getResultCache().getEntries(), key=lambda entry: entry.lastUsed, reverse=True)
+        self.addLog(f"-- Result cache ({len(entries)} entries) ------------")
+        for entry in entries:
+            lastUsed = datetime.datetime.fromtimestamp(entry.lastUsed).strftime('%Y-%m-%d %H:%M')
+            self.addLog(f"{entry.model}: {len(entry.files)} files, {entry.bytes / 1024**2:.1f} MB, last used {lastUsed} ({entry.key[:12]})")
+
+    def onResultCacheClearButton(self):
+        self.logic.getResultCache().clear()
+        self.updateResultCacheLabel()
 
     def onTest1ButtonClick(self):
         self.addLog("-- Test 1 (Segmentation names) ------------")
@@ -511,14 +870,22 @@ class MRunnerWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             self._parameterNode.SetNodeReferenceID("OutputSegmentation", self.ui.outputSegmentationSelector.currentNodeID)
 
         outputSegmentation = self.ui.outputSegmentationSelector.currentNode()
+        inputVolume = self.ui.inputSelector.currentNode()
 
-        # expected directory
-        dir = "/Users/lenny/Projects/SlicerMHubIntegration/test_data"
+        # synthetic model outputs on the geometry of the input volume (see Testing/Python/FakeDocker.py)
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Testing', 'Python'))
+        import FakeDocker
+        workDirs = self.logic.getWorkDirManager()
+        dir = workDirs.create('test', model.getName().lower())
+        try:
+            FakeDocker.writeOutputs(dir, FakeDocker.getModelOutputs(model), FakeDocker.getVolumeGeometry(inputVolume))
+            self.addLog(f"-- importing synthetic outputs from {dir}")
 
-        # call logic
-        self.logic.displaySegmentation(outputSegmentation, dir, model)
+            # call logic
+            self.logic.displaySegmentation(outputSegmentation, dir, model)
+        finally:
+            workDirs.release(dir)
 
-        inputVolume = self.ui.inputSelector.currentNode()
         outputSegmentation.SetNodeReferenceID(outputSegmentation.GetReferenceImageGeometryReferenceRole(), inputVolume.GetID())
         outputSegmentation.SetReferenceImageGeometryParameterFromVolumeNode(inputVolume)
 
@@ -550,9 +917,101 @@ class MRunnerLogic(ScriptedLoadableModuleLogic):
         ScriptedLoadableModuleLogic.__init__(self)
 
         self.logCallback = None
+        self.progressCallback = None    # called with a Utils.Progress.ProgressSnapshot during pulls and builds (main thread)
+        self.progressInterval = 0.25    # s, minimum time between two progress reports
         self.resourcePath = None
         self.repo = None
 
+        # model catalog (see getCatalog), raw-path using the docker-dev branch instead of main.
+        self.catalog = None
+        self.catalogURL = "https://raw.githubusercontent.com/AIM-Harvard/SlicerMHubRunner/docker-dev/MRunner/Resources/Dockerfiles/repo.json"
+        self.catalogTimeout = 10        # s
+        self.catalogSyncInterval = 500  # ms, polling interval of the widget while the catalog syncs
+
+        # docker engine api or cli (see getDockerBackend)
+        self.dockerBackend = None
+        self.dockerBackendLock = threading.Lock()
+        self.useDockerEngine = True     # False: always fork the docker cli
+        self.dockerProbeThread = None   # background docker check (see startDockerProbe)
+        self.dockerProbeResult = None
+        self.dockerInfo = None          # last docker info (cpus and memory of the docker host)
+        self.dockerProbeInterval = 200  # ms, polling interval of the widget while docker is checked
+
+        # python packages are checked (and installed) before the first run, not on startup
+        self.pythonRequirementsChecked = False
+
+        # local docker image inventory (see getImageInventory)
+        self.imageInventory = None
+        self.imageInventoryTTL = 60
+
+        # asynchronous jobs (see processAsync)
+        self.jobs = []
+        self.jobTimer = None
+        self.jobPollInterval = 100      # ms
+        self.jobOutputMaxLines = 200    # lines forwarded to the log per poll interval
+        self.keepRunLogs = 50           # complete logs of the last runs (see openRunLog)
+
+        # worker pool (see scheduleJobs)
+        self.maxWorkers = 0             # 0: size the pool by cpu cores and available memory
+        self.workerCPUs = 4             # cpu cores per job (auto sizing)
+        self.workerMemoryGB = 8         # memory per job (auto sizing)
+
+        # container resource limits (see getContainerResources), 0: model hint or a share of the docker host
+        self.limitContainerResources = True
+        self.containerCPUs = 0
+        self.containerMemoryGB = 0
+        self.containerShmGB = 0
+        self.containerHostIPC = False
+        self.imageLocks = {}
+        self.imageLocksLock = threading.Lock()
+
+        # background image prefetch of the selected model (see prefetchImage)
+        self.imagePrefetcher = None
+        self.prefetchImages = False
+        self.prefetchMaxConcurrent = 1  # concurrent pulls / builds, newer requests replace older queued ones
+        self.prefetchRetryInterval = 60 # s
+
+        # cached dockerfiles and build contexts (see getDockerfileCache)
+        self.dockerfileCache = None
+        self.dockerfileTimeout = 10     # s
+
+        # managed working directories (see getWorkDirManager)
+        self.workDirManager = None
+        self.keepRuns = 0               # number of finished run directories kept for debugging
+        self.workDirQuotaGB = 50        # 0: no quota
+
+        # import output files while the model is running (see startOutputWatcher)
+        self.streamImport = False
+        self.streamImportMaxFiles = 2   # files imported per timer tick
+
+        # parallel reading (and decompression) of model output files (see importLabelFiles)
+        self.importWorkers = 0          # 0: auto
+
+        # input transport through tmpfs (see createInputDir)
+        self.useSharedMemoryInput = False
+        self.sharedMemoryPath = '/dev/shm'
+        self.inputDirManagers = {}      # by location (shared memory or disk)
+        self._loggedRemoteDockerHost = False
+
+        # reuse of unchanged input exports (see stageInputVolume)
+        self.exportManifests = {}
+        self.verifyExportHash = False   # compare the voxel data instead of the node modification time
+
+        # inference result cache (see getResultCache)
+        self.resultCache = None
+        self.useResultCache = True
+        self.resultCacheMaxGB = 20
+
+        # warm model servers (see runContainerWarmSync)
+        self.warmServerPool = None
+        self.warmIdleTimeout = 600      # s, idle servers are stopped after this time
+        self.warmReapTimer = None
+
+        # per-stage run telemetry (see startTelemetry)
+        self.telemetryLog = None
+        self.lastTelemetry = None
+        self.telemetryCallback = None   # called with the Utils.Telemetry.RunTelemetry of each finished run (main thread)
+
 
     def setDefaultParameters(self, parameterNode):
         """
@@ -562,69 +1021,149 @@ class MRunnerLogic(ScriptedLoadableModuleLogic):
             parameterNode.SetParameter("Threshold", "100.0")
         if not parameterNode.GetParameter("Invert"):
             parameterNode.SetParameter("Invert", "false")
-
-
-    def log(self, text, setStep = False):
-        logging.info(text)
+        if not parameterNode.GetParameter("WarmIdleTimeout"):
+            parameterNode.SetParameter("WarmIdleTimeout", "10")
+        if not parameterNode.GetParameter("MaxWorkers"):
+            parameterNode.SetParameter("MaxWorkers", "0")
+        if not parameterNode.GetParameter("UseResultCache"):
+            parameterNode.SetParameter("UseResultCache", "true")
+        if not parameterNode.GetParameter("SharedMemoryInput"):
+            parameterNode.SetParameter("SharedMemoryInput", "false")
+        if not parameterNode.GetParameter("ImportWorkers"):
+            parameterNode.SetParameter("ImportWorkers", "0")
+        if not parameterNode.GetParameter("StreamImport"):
+            parameterNode.SetParameter("StreamImport", "false")
+        if not parameterNode.GetParameter("PrefetchImage"):
+            parameterNode.SetParameter("PrefetchImage", "false")
+        if not parameterNode.GetParameter("KeepRuns"):
+            parameterNode.SetParameter("KeepRuns", "0")
+        if not parameterNode.GetParameter("WorkDirQuota"):
+            parameterNode.SetParameter("WorkDirQuota", "50")
+        if not parameterNode.GetParameter("LimitContainerResources"):
+            parameterNode.SetParameter("LimitContainerResources", "true")
+        if not parameterNode.GetParameter("ContainerCPUs"):
+            parameterNode.SetParameter("ContainerCPUs", "0")
+        if not parameterNode.GetParameter("ContainerMemory"):
+            parameterNode.SetParameter("ContainerMemory", "0")
+        if not parameterNode.GetParameter("ContainerShm"):
+            parameterNode.SetParameter("ContainerShm", "0")
+        if not parameterNode.GetParameter("ContainerHostIPC"):
+            parameterNode.SetParameter("ContainerHostIPC", "false")
+
+
+    def log(self, text, setStep = False, job = None, transient = False):
+        # output of jobs running on a worker thread is queued and forwarded on the main thread (see onJobTimer)
+        # transient lines (progress bars) are replaced by the next line (see Utils.LogPipeline)
+        if job is not None:
+            job.appendOutput(text, setStep, transient)
+            return
+        if not transient:
+            logging.info(text)
         if self.logCallback:
-            self.logCallback(text, setStep)
+            self.logCallback(text, setStep, transient)
 
 
-    def logProcessOutput(self, proc):
-        # Wait for the process to end and forward output to the log
-        from subprocess import CalledProcessError
-        while True:
+    def followDockerOperation(self, op, job = None, progress = None):
+        # Forward the progress of a docker operation (pull, build, run, see Utils.Docker) to the log and wait for it.
+        # Events are fed into the progress tracker if given (see reportProgress).
+        from Utils.Docker import DockerError, formatEvent
+        from Utils.Progress import ProgressReporter
+        reporter = ProgressReporter(progress, lambda snapshot: self.reportProgress(snapshot, job=job), self.progressInterval) if progress is not None else None
+        if job is not None:
+            job.attachProcess(op)
+        try:
             try:
-                line = proc.stdout.readline()
-            except UnicodeDecodeError as e:
-                # Code page conversion happens because `universal_newlines=True` sets process output to text mode,
-                # and it fails because probably system locale is not UTF8. We just ignore the error and discard the string,
-                # as we only guarantee correct behavior if an UTF8 locale is used.
-                pass
-            if not line:
-                break
-            self.log(line.rstrip())
-        proc.wait()
-        retcode = proc.returncode
-        if retcode != 0:
-            raise CalledProcessError(retcode, proc.args, output=proc.stdout, stderr=proc.stderr)
+                for event in op:
+                    if reporter is not None:
+                        reporter.update(event)
+                    line = formatEvent(event)
+                    if line is not None:
+                        self.log(line, job=job, transient=event.get("transient", False))
+                op.wait()
+            finally:
+                if job is not None:
+                    job.detachProcess()
+            if job is not None:
+                job.checkCancelled()
+            if op.returncode != 0:
+                raise DockerError(op.returncode, op.args, op.error)
+        except BaseException:
+            # reset the progress bar, a failed pull / build never finishes
+            if reporter is not None:
+                reporter.fail()
+            raise
+        if reporter is not None:
+            reporter.finish()
+
+
+    def reportProgress(self, snapshot, job = None):
+        # progress of jobs running on a worker thread is forwarded on the main thread (see onJobTimer)
+        if job is not None:
+            job.setProgress(snapshot)
+            return
+        if self.progressCallback:
+            self.progressCallback(snapshot)
 
 
     def setupPythonRequirements(self, upgrade=False):
-        
+        """ Install missing python packages. The packages are only looked up (not imported), the check runs once per session.
+        """
+        if self.pythonRequirementsChecked and not upgrade:
+            return
+        import importlib.util
+
         # install yaml python package
-        needToInstallPackage = False
-        try:
-          import yaml
-        except ModuleNotFoundError as e:
-           needToInstallPackage = True
-        if needToInstallPackage:
+        if importlib.util.find_spec('yaml') is None:
            self.log('PyYaml is required. Installing...')
            slicer.util.pip_install('pyyaml')
 
-        # install pandas python package
-        needToInstallPackage = False
-        try:
-          import pandas
-        except ModuleNotFoundError as e:
-           needToInstallPackage = True
-        if needToInstallPackage:
-           self.log('Pandas is required. Installing...')
-           slicer.util.pip_install('pandas')
-
         # install numpy python package
-        needToInstallPackage = False
-        try:
-          import numpy
-        except ModuleNotFoundError as e:
-           needToInstallPackage = True
-        if needToInstallPackage:
+        if importlib.util.find_spec('numpy') is None:
            self.log('Numpy is required. Installing...')
            slicer.util.pip_install('numpy')
 
-    def downloadRepo(self):
-        # raw-path using the docker-dev branch instead of main.
-        repo_json_url = ""
+        self.pythonRequirementsChecked = True
+
+    def getCatalog(self):
+        """ Model catalog: the bundled repo.json merged with the local copies of the remote catalog sources.
+            Additional sources (e.g. an internal catalog) are read from the MRunner/CatalogURLs setting.
+        """
+        if self.catalog is None:
+            from Utils.Catalog import Catalog, CatalogSource
+            sources = [CatalogSource('upstream', self.catalogURL)]
+            urls = qt.QSettings().value("MRunner/CatalogURLs") or []
+            if isinstance(urls, str):
+                urls = [url.strip() for url in urls.split(',')]
+            for index, url in enumerate([url for url in urls if url]):
+                sources.append(CatalogSource(f'source{index + 1}', url))
+            cacheDir = os.path.join(slicer.app.cachePath, 'MRunner', 'catalog')
+            self.catalog = Catalog(cacheDir, self.resourcePath('Dockerfiles/repo.json'), sources, timeout=self.catalogTimeout)
+        return self.catalog
+
+    def loadRepo(self):
+        """ Load the model catalog from disk (never waits on the network, see downloadRepo).
+        """
+        from Utils.Repo import RepositoryError
+        try:
+            self.repo = self.getCatalog().load()
+        except (RepositoryError, ValueError, OSError) as e:
+            # a broken local copy must not take down the module, fall back to the bundled catalog
+            logging.warning(f"Loading the model catalog failed, using the bundled repo.json: {e}")
+            from Utils.Repo import Repository
+            self.repo = Repository(self.resourcePath('Dockerfiles/repo.json'))
+        return self.repo
+
+    def downloadRepo(self, wait=False):
+        """ Revalidate all catalog sources (conditional requests) in the background.
+            Poll isRepoSyncing() / getCatalog().getSyncResult() and call loadRepo() once it changed.
+        """
+        catalog = self.getCatalog()
+        if wait:
+            return catalog.syncAll()
+        catalog.syncAsync()
+
+    def isRepoSyncing(self):
+        return self.catalog is not None and self.catalog.isSyncing()
 
 
     def addDockerPath(self):
@@ -647,6 +1186,21 @@ class MRunnerLogic(ScriptedLoadableModuleLogic):
         return dockerExecPath
 
 
+    def getDockerBackend(self):
+        """ Docker backend: the Docker Engine API over the local unix socket if it is reachable, the docker cli otherwise.
+        """
+        with self.dockerBackendLock:
+            if self.dockerBackend is None:
+                from Utils.Docker import DockerCLIBackend, DockerEngineBackend, DockerEngineClient
+
+                client = DockerEngineClient.fromEnvironment() if self.useDockerEngine else None
+                if client is not None and client.ping():
+                    self.dockerBackend = DockerEngineBackend(client)
+                else:
+                    self.dockerBackend = DockerCLIBackend(self.getDockerExecutable(), launch=slicer.util.launchConsoleProcess)
+        return self.dockerBackend
+
+
     def checkForDocker(self):
         """
         Docker is required on the system to be installed and running. This function gets the docker executable and calls docker info for detailed information on the docker installation. If docker is not installed, fetching the executable will fail on unix systems and return None (but not on windows).
@@ -655,309 +1209,953 @@ class MRunnerLogic(ScriptedLoadableModuleLogic):
         > docker info --format '{{json .}}'
         """
 
-        print("os: ", os.name)
+        isDockerInstalled, message = self.probeDocker()
+        if message:
+            self.log(message)
+        return isDockerInstalled
 
-        import subprocess, json        
-        dockerExecPath = self.getDockerExecutable()
-        
-        if dockerExecPath is None:
-            self.log("Docker executable not found in your system.\nPlease install docker to proceed.")
-            return False
 
-        # run docker version
-        # command = [dockerExecPath, '--version']
+    def probeDocker(self):
+        """ Check the docker installation without logging (safe on a worker thread, see startDockerProbe).
+            Returns (docker is usable, message to show or None).
+        """
+
+        import json
+        backend = self.getDockerBackend()
 
-        # run docker info        
-        command =  [dockerExecPath, 'info']
-        command += ['--format', '{{json .}}']
+        if backend.name == "cli" and backend.executable is None:
+            return False, "Docker executable not found in your system.\nPlease install docker to proceed."
 
+        # run docker info
         try:
-            docker_info = subprocess.check_output(command).decode('utf-8')
-            docker_info = json.loads(docker_info)
+            docker_info = backend.info()
+            self.dockerInfo = docker_info
 
             if "ServerErrors" in docker_info:
-                self.log(f"Docker ServerError: {', '.join(docker_info['ServerErrors'])}")
-                return False
+                return False, f"Docker ServerError: {', '.join(docker_info['ServerErrors'])}"
 
         except json.decoder.JSONDecodeError as e:
-            self.log("Docker is not installed in your system.\nPlease install docker to proceed.")
-            return False
+            return False, "Docker is not installed in your system.\nPlease install docker to proceed."
         except Exception as e:
             print(f"Unexpected exception when pulling docker info: {str(e)}")
-            return False
+            return False, None
 
-        return True
+        return True, None
 
 
-    def checkImage(self, model, useGPU=False):
-        """Search available docker images. Returns true if the image is available. 
-           > docker images --format '{{.Repository}}:{{.Tag}}'
+    def startDockerProbe(self):
+        """ Check the docker installation on a background thread (the daemon may take seconds to answer).
+            The result is available through getDockerProbeResult once isDockerProbing returns False.
         """
-        #
-        import subprocess
-        
-        #
-        dockerExecPath = self.getDockerExecutable()
-        assert dockerExecPath is not None, "DockerExecPath is None."
+        if self.dockerProbeThread is not None:
+            return
+
+        def probe():
+            try:
+                self.dockerProbeResult = self.probeDocker()
+            except Exception as e:
+                self.dockerProbeResult = (False, f"Docker check failed: {e}")
+
+        self.dockerProbeResult = None
+        self.dockerProbeThread = threading.Thread(target=probe, name="MRunnerDockerProbe", daemon=True)
+        self.dockerProbeThread.start()
+
+
+    def isDockerProbing(self):
+        return self.dockerProbeThread is not None and self.dockerProbeThread.is_alive()
+
+
+    def getDockerProbeResult(self):
+        """ (docker is usable, message or None) of the background check, None while it is running or if it was not started.
+        """
+        return self.dockerProbeResult if not self.isDockerProbing() else None
+
+
+    def getImageInventory(self):
+        """Cached inventory of all locally available docker images (filled by a single docker images call).
+           The inventory expires after imageInventoryTTL seconds and is invalidated on pull, build and remove.
+        """
+        if self.imageInventory is None:
+            from Utils.ImageInventory import ImageInventory
+
+            # resolve the docker backend once on the main thread (refreshes run in the background)
+            self.getDockerBackend()
+            self.imageInventory = ImageInventory(self.listImages, ttl=self.imageInventoryTTL)
+        return self.imageInventory
+
+
+    def listImages(self):
+        """List all available docker images. Returns a dictionary of image records keyed by image ref.
+           > docker images --no-trunc --format '{{.Repository}}:{{.Tag}}\t{{.ID}}\t{{.Size}}'
+        """
+        return self.getDockerBackend().listImages()
 
-        #
-        command =  [dockerExecPath, 'images']
-        command += ['--format', '{{.Repository}}:{{.Tag}}']
 
-        # get list of images
-        images_lst = subprocess.check_output(command).decode('utf-8').split("\n")
+    def checkImage(self, model, useGPU=False, wait=True):
+        """Search available docker images. Returns true if the image is available.
+           The lookup uses the cached image inventory. If wait is False, the call never blocks on the docker daemon
+           and returns None if the inventory was not loaded yet (a refresh is started in the background).
+        """
 
         # search image
         image_ref =  model.getDockerfile().getImageRef(useGPU=useGPU) # image_name:image_tag
 
         #
-        return image_ref in images_lst
+        return self.getImageInventory().contains(image_ref, wait=wait)
 
 
-    def pullImage(self, model, useGPU = False):
-        """Pull image from docker hub.
-           > docker pull [OPTIONS] NAME[:TAG|@DIGEST]
+    def removeImage(self, model, useGPU=False):
+        """Remove a local image.
+           > docker rmi NAME[:TAG]
         """
 
         #
-        import subprocess
-        
-        #
-        dockerExecPath = self.getDockerExecutable()
-        assert dockerExecPath is not None, "DockerExecPath is None."
+        image_ref = model.getDockerfile().getImageRef(useGPU=useGPU)
+        backend = self.getDockerBackend()
+
+        # run command
+        self.log(f"Removing image ({image_ref}, {backend.name})", setStep=True)
+        try:
+            for line in backend.removeImage(image_ref):
+                self.log(line)
+        finally:
+            self.getImageInventory().invalidate()
+        self.log("Image removed.")
+
+
+    def pullImage(self, model, useGPU = False, job = None):
+        """Pull image from docker hub.
+           > docker pull [OPTIONS] NAME[:TAG|@DIGEST]
+        """
 
         #
         image_ref = model.getDockerfile().getImageRef(useGPU=useGPU)
-        command =  [dockerExecPath, 'pull', image_ref]
 
         # run command
-        self.log(f"Pulling image ({ ' '.join(command)})", setStep=True)
-        proc = slicer.util.launchConsoleProcess(command)
-        self.logProcessOutput(proc)
-        self.log("Image pulled.")
+        from Utils.Telemetry import span
+        try:
+            from Utils.Progress import PullProgress
+            with span("pull", image=image_ref, backend=self.getDockerBackend().name):
+                op = self.getDockerBackend().pullImage(image_ref)
+                self.log(f"Pulling image ({' '.join(op.args)})", setStep=True, job=job)
+                self.followDockerOperation(op, job=job, progress=PullProgress(image_ref))
+        finally:
+            self.getImageInventory().invalidate()
+        self.log("Image pulled.", job=job)
+
+
+    def getDockerfileCache(self):
+        """ Downloaded Dockerfiles in stable build context directories (see downloadDockerfile).
+        """
+        if self.dockerfileCache is None:
+            from Utils.DockerfileCache import DockerfileCache
+            self.dockerfileCache = DockerfileCache(os.path.join(slicer.app.cachePath, 'MRunner', 'dockerfiles'), timeout=self.dockerfileTimeout)
+        return self.dockerfileCache
 
 
-    def downloadDockerfile(self, model, useGPU=False):
+    def downloadDockerfile(self, model, useGPU=False, job=None, force=False):
         """Downlaods the dockerfile from mhub repository to locally build image.
+           The dockerfile is cached and only downloaded again if it changed (force: always download).
         """
 
         # get download url from repository definition
-        dockerfile_url = model.getDockerfile().getDownloadPath(useGPU)
-
-        # create temp folder 
-        dockerfile_dir = slicer.util.tempDirectory()
-
-        # download file 
-        import urllib
-        urllib.request.urlretrieve(dockerfile_url, os.path.join(dockerfile_dir, "Dockerfile"))
+        dockerfile = model.getDockerfile()
+        dockerfile_url = dockerfile.getDownloadPath(useGPU)
+
+        # stable build folder per model, branch and image tag
+        from Utils.Telemetry import span
+        cache = self.getDockerfileCache()
+        key = cache.getKey(dockerfile.getImageName(), dockerfile.getDownloadBranch(), dockerfile.getImageTag(useGPU))
+        with span("dockerfile") as s:
+            dockerfile_dir, status = cache.get(dockerfile_url, key, force=force)
+            if s is not None:
+                s.attrs["status"] = status
 
         #
-        self.log(f"Dockerfile downloaded to {dockerfile_dir}")
+        self.log(f"Dockerfile {status} ({dockerfile_dir}, sha256 {(cache.getChecksum(key) or '')[:12]})", job=job)
         return dockerfile_dir
 
 
-    def buildImage(self, model, downloadDockerfile=True, noCache=False, useGPU=False):
+    def buildImage(self, model, downloadDockerfile=True, noCache=False, useGPU=False, job=None):
         """ Build a image locally.
             > docker build -t NAME[:TAG|@DIGEST] --build-arg USER_ID=1001 --build-arg GROUP_ID=1001 --platform linux/amd64 [--no-cache]
         """
 
         # download dockerfile
-        dockerDir = self.downloadDockerfile(model, useGPU=useGPU)
+        dockerDir = self.downloadDockerfile(model, useGPU=useGPU, job=job, force=noCache)
 
         if not os.path.isdir(dockerDir):
             # TODO: handle error in calling methods
             raise FileNotFoundError(f"Cannot build image. Dockerfile for '{model.getName()} ({model.getDockerfile().getImageRef(useGPU=useGPU)})' not found at specified location '{dockerDir}'.")
 
-        # prepare docker build command
-        dockerExecPath = self.getDockerExecutable()
-        assert dockerExecPath is not None, "DockerExecPath is None."
+        # build arguments
+        buildArgs = {'USER_ID': '1001', 'GROUP_ID': '1001'}
 
-        command =  [dockerExecPath, 'build']
-        command += ['-t', model.getDockerfile().getImageRef(useGPU=useGPU)]
-        command += ['--build-arg', 'USER_ID=1001']
-        command += ['--build-arg', 'GROUP_ID=1001']
-        command += ['--platform', 'linux/amd64']
-        
-        if noCache:
-            command += ["--no-cache"]
-       
         # TODO: for Mac with M1 add platform
-        # command += ['--platform', 'linux/amd64']
         # TODO: for linux add local user and group id --> no longer needed in newer docker files.
 
-        command += [dockerDir]
-
         # run command
-        self.log(f"Build image ({' '.join(command)})", setStep=True)
-        proc = slicer.util.launchConsoleProcess(command)
-        self.logProcessOutput(proc)
-        self.log("Image build.")
+        from Utils.Telemetry import span
+        try:
+            from Utils.Progress import BuildProgress
+            image_ref = model.getDockerfile().getImageRef(useGPU=useGPU)
+            with span("build", image=image_ref, backend=self.getDockerBackend().name):
+                op = self.getDockerBackend().buildImage(image_ref, dockerDir, buildArgs=buildArgs, platform='linux/amd64', noCache=noCache)
+                self.log(f"Build image ({' '.join(op.args)})", setStep=True, job=job)
+                self.followDockerOperation(op, job=job, progress=BuildProgress(image_ref))
+        finally:
+            self.getImageInventory().invalidate()
+        self.log("Image build.", job=job)
+
+
+    def prepareImage(self, model, downloadDockerfile=True, useGPU=False, noCache=False, job=None):
+        """ Make sure the image of the model is available locally (pull or build it otherwise).
+        """
 
+        # jobs of the same image wait for each other instead of pulling / building twice
+        imageRef = model.getDockerfile().getImageRef(useGPU=useGPU)
 
-    def runContainerSync(self, model, dir, useGPU=False, containerArguments=None):
-        """ Create and run a container of the specified image.
-            NOTE: This code is blocking.
-        """
-        #
-        dockerExecPath = self.getDockerExecutable()
-        assert dockerExecPath is not None, "DockerExecPath is None."
-        
-        #
-        command  = [dockerExecPath, "run", "--rm"]
-        command += ["--volume", f"{dir}:/app/data/input_data"]
-        command += ["--volume", f"{dir}:/app/data/output_data"]
+        from Utils.Telemetry import span
 
-        if useGPU:
-            command += ["--gpus", "all"]
+        with span("prepare image", image=imageRef):
 
-        # image to create container from
-        command += [model.getDockerfile().getImageRef(useGPU=useGPU)]
+            # join an in-flight prefetch of the image
+            task = self.imagePrefetcher.getTask(imageRef) if self.imagePrefetcher is not None else None
+            if task is not None and task.job is not job and not task.isDone() and not noCache:
+                with span("join prefetch"):
+                    self.joinPrefetch(task, job=job)
 
-        # slcier entrypoint
-        mhub_model_dir = model.getName().lower()
-        command += ["python3", f"/app/models/{mhub_model_dir}/scripts/slicer_run.py"]
+            with self.imageLocksLock:
+                imageLock = self.imageLocks.setdefault(imageRef, threading.Lock())
 
-        # commands
-        if isinstance(containerArguments, list) and len(containerArguments) > 0:
-            command += containerArguments
+            with imageLock:
+                self.prepareImageLocked(model, downloadDockerfile=downloadDockerfile, useGPU=useGPU, noCache=noCache, job=job)
 
-        # run
-        self.log(f"Run container ({' '.join(command)})", setStep=True)
-        proc = slicer.util.launchConsoleProcess(command)
-        self.logProcessOutput(proc)
 
+    def getImagePrefetcher(self):
+        if self.imagePrefetcher is None:
+            from Utils.Prefetch import ImagePrefetcher
+            self.imagePrefetcher = ImagePrefetcher(maxConcurrent=self.prefetchMaxConcurrent)
+        return self.imagePrefetcher
 
-    def displaySegmentation(self, outputSegmentation, dir, model):
 
-        # log
-        self.log(f"Import segmentations", setStep=True)
+    def prefetchImage(self, model, useGPU=False, downloadDockerfile=True):
+        """ Pull (or build) the image of a model in the background if it is not available locally.
+            Returns the prefetch task (see Utils.Prefetch) or None if the image is available or not known yet.
+        """
+        from Utils.Jobs import Job
 
-        # clear output segmentation
-        outputSegmentation.GetSegmentation().RemoveAllSegments()
+        # never blocks, the image inventory is loaded in the background
+        if self.checkImage(model, useGPU=useGPU, wait=False) is not False:
+            return None
 
-        # iterate all output files from the repo
-        ofs = model.getOutputFiles()
-        for of in ofs:
-            fileName = of.getFileName()
-            ofls = of.getLabels()
+        imageRef = model.getDockerfile().getImageRef(useGPU=useGPU)
+        downloadDockerfile = downloadDockerfile and model.getDockerfile().isDownloadableFromRepository()
 
-            if len(ofls) == 1:
-                ofl = ofls[0]
+        # do not retry a failed prefetch on every gui update
+        prefetcher = self.getImagePrefetcher()
+        lastTask = prefetcher.getTask(imageRef)
+        if lastTask is not None and lastTask.state == "failed" and time.time() - lastTask.finishedAt < self.prefetchRetryInterval:
+            return lastTask
 
-                # import this file's single label
-                segment = ofl.getSegment()
-                segmentName = segment.getName()
-                segmentColor = segment.getColor()
-                segmentRGB = segmentColor.getComponentsAsFloat() if segmentColor is not None else [0, 0, 0]
-                labelValue = ofl.getID()
+        def run():
+            self.prepareImage(model, downloadDockerfile=downloadDockerfile, useGPU=useGPU, job=job)
+            # the inventory is up to date once the prefetch is reported done
+            self.getImageInventory().refresh()
 
-                self.log(f"Importing {segmentName} (label: {labelValue}, file: {fileName})")
+        # the prefetch job collects output and progress, forwarded to a run that joins it
+        job = Job(model, useGPU=useGPU)
+        task = prefetcher.request(imageRef, run, job=job)
+        if task.job is job:
+            self.log(f"Prefetching image {imageRef} in the background.")
+        return task
 
-                #
-                segmentPath = os.path.join(dir, fileName)
-                assert os.path.isfile(segmentPath), f"Segment file not found at {segmentPath}."
 
-                # create a label volume node and configure it
-                segmentName = segment.getName()
-                labelmapVolumeNode = slicer.util.loadLabelVolume(segmentPath, {"name": segmentName})
-
-                # add segment
-                segmentId = outputSegmentation.GetSegmentation().AddEmptySegment(segmentName, segmentName, segmentRGB)
-                updatedSegmentIds = vtk.vtkStringArray()
-                updatedSegmentIds.InsertNextValue(segmentId)
-                
-                # add the label volume node to the segmentation node and remove it
-                slicer.modules.segmentations.logic().ImportLabelmapToSegmentationNode(labelmapVolumeNode, outputSegmentation, updatedSegmentIds)
-                #self.setTerminology(outputSegmentation, segmentName, segmentId)
-                slicer.mrmlScene.RemoveNode(labelmapVolumeNode)
+    def getPrefetchTask(self, model, useGPU=False):
+        if self.imagePrefetcher is None:
+            return None
+        return self.imagePrefetcher.getTask(model.getDockerfile().getImageRef(useGPU=useGPU))
 
-            else:
 
-                # setup
-                maxLabelValue = len(ofls)
-                opacity = 1
+    def joinPrefetch(self, task, job=None):
+        """ Wait for a running prefetch and forward its output and progress to the job.
+            A cancelled job stops waiting, the prefetch continues.
+        """
+        self.log(f"Waiting for the image prefetch of {task.key}.", setStep=True, job=job)
+        while not task.wait(0.1):
+            if job is not None:
+                job.checkCancelled()
+                for text, setStep, transient in task.job.takeOutput():
+                    job.appendOutput(text, setStep, transient)
+                snapshot = task.job.takeProgress()
+                if snapshot is not None:
+                    job.setProgress(snapshot)
+        if task.state == "failed":
+            self.log(f"Image prefetch failed ({task.error}), trying again.", job=job)
+
+
+    def cancelPrefetches(self):
+        if self.imagePrefetcher is not None:
+            self.imagePrefetcher.cancel()
+
+
+    def prepareImageLocked(self, model, downloadDockerfile=True, useGPU=False, noCache=False, job=None):
+        """ See prepareImage (called while holding the lock of the image).
+        """
+        from Utils.Jobs import JobState
+        from Utils.Telemetry import span
 
-                # create color table for this segmentation task
-                colorTableNode = slicer.vtkMRMLColorTableNode()
-                colorTableNode.SetTypeToUser()
-                colorTableNode.SetNumberOfColors(maxLabelValue+1)
-                colorTableNode.SetName(f"MHub [{model.getLabel()}]")
+        # check / build image
+        with span("check image"):
+            imageAvailable = self.checkImage(model, useGPU=useGPU)
 
-                # iterate all file labels
-                for ofl in ofls:
-                    segment = ofl.getSegment()
-                    segmentName = segment.getName()
-                    segmentColor = segment.getColor()
-                    segmentRGB = segmentColor.getComponentsAsFloat() if segmentColor is not None else [0, 0, 0]
-                    labelValue = ofl.getID()
+        if not imageAvailable or noCache:
 
-                    colorTableNode.SetColor(labelValue, segmentRGB[0], segmentRGB[1], segmentRGB[2], opacity)
-                    colorTableNode.SetColorName(labelValue, segmentName)
-                slicer.mrmlScene.AddNode(colorTableNode)
+            # download dockerfile and build image locally if download opion is enabled
+            if downloadDockerfile:
+                if job is not None:
+                    job.setState(JobState.BUILDING)
+                self.buildImage(model, downloadDockerfile=downloadDockerfile, noCache=noCache, useGPU=useGPU, job=job)
+            
+            # if not, just pull the image from dockerhub
+            else:
+                if job is not None:
+                    job.setState(JobState.PULLING)
+                self.pullImage(model, useGPU=useGPU, job=job)
 
-                # link color table and load the segmentation file 
-                self.log(f"Importing {fileName} (# labels: {maxLabelValue})")
-                outputSegmentation.SetLabelmapConversionColorTableNodeID(colorTableNode.GetID())
-                outputSegmentation.AddDefaultStorageNode()
-                storageNode = outputSegmentation.GetStorageNode()
-                storageNode.SetFileName(os.path.join(dir, fileName))
-                storageNode.ReadData(outputSegmentation)
 
-                # remove the color table
-                slicer.mrmlScene.RemoveNode(colorTableNode)
+    def runContainerSync(self, model, dir, useGPU=False, containerArguments=None, job=None, inputDir=None):
+        """ Create and run a container of the specified image.
+            The input is read from inputDir if given (mounted read-only, see createInputDir) and from dir otherwise.
+            NOTE: This code is blocking. Pass a job to run it on a worker thread (the container is named after the job so it can be killed).
+        """
+        #
+        binds  = [f"{inputDir}:/app/data/input_data:ro" if inputDir else f"{dir}:/app/data/input_data"]
+        binds += [f"{dir}:/app/data/output_data"]
+
+        # slcier entrypoint
+        command = ["python3", self.getEntrypoint(model)]
 
+        # commands
+        if isinstance(containerArguments, list) and len(containerArguments) > 0:
+            command += containerArguments
 
-    def process(self, model, inputVolume, outputSegmentation, imageThreshold, downloadDockerfile=True, useGPU=False, noCache=False):
+        # run
+        from Utils.Telemetry import span
+        resources = self.getContainerResources(model)
+        with span("container", backend=self.getDockerBackend().name, resources=str(resources)):
+            with span("start"):
+                op = self.getDockerBackend().runContainer(model.getDockerfile().getImageRef(useGPU=useGPU), command, binds,
+                                                          name=job.containerName if job is not None else None, useGPU=useGPU, resources=resources)
+            self.log(f"Run container ({' '.join(op.args)})", setStep=True, job=job)
+            with span("inference"):
+                self.followDockerOperation(op, job=job)
+
+
+    def runContainerBatchSync(self, model, batchDir, useGPU=False, job=None):
+        """ Create and run a single container for all cases staged in the batch directory (one sub-directory per case).
+            The batch driver (Resources/Scripts/batch_run.py) runs the slicer entrypoint for each case in one interpreter.
+            NOTE: This code is blocking.
         """
-        Run the processing algorithm.
-        Can be used without GUI widget.
-        :param inputVolume: volume to be thresholded
-        :param outputVolume: thresholding result
-        :param imageThreshold: values above/below this threshold will be set to 0
-        :param invert: if True then values above the threshold will be set to 0, otherwise values below are set to 0
-        :param showResult: show output volume in slice viewers
+        #
+        binds  = [f"{batchDir}:/app/data/batch"]
+        binds += [f"{self.getScriptsDir()}:/app/mrunner:ro"]
+
+        # batch driver running the slicer entrypoint for every case
+        command = ["python3", "/app/mrunner/batch_run.py", self.getEntrypoint(model), "/app/data/batch"]
+
+        # run
+        from Utils.Telemetry import span
+        resources = self.getContainerResources(model)
+        with span("container", backend=self.getDockerBackend().name, resources=str(resources)):
+            with span("start"):
+                op = self.getDockerBackend().runContainer(model.getDockerfile().getImageRef(useGPU=useGPU), command, binds,
+                                                          name=job.containerName if job is not None else None, useGPU=useGPU, resources=resources)
+            self.log(f"Run container ({' '.join(op.args)})", setStep=True, job=job)
+            with span("inference"):
+                self.followDockerOperation(op, job=job)
+
+
+    def getContainerResources(self, model):
+        """ Resource limits of a model container (see Utils.Docker.ContainerResources), None if limits are disabled.
+            Each limit is taken from the user setting or the model's hint (dockerfile.resources in repo.json).
+            Cpu and memory are only limited if asked for (a hard memory cap kills a model that exceeds it),
+            the shared memory is raised from docker's default for every container.
         """
+        if not self.limitContainerResources:
+            return None
 
-        if not inputVolume:
-            raise ValueError("Input volume is invalid")
+        from Utils.Docker import ContainerResources
+        from Utils.Host import getCPUCount, getTotalMemory
 
-        import time, os
-        startTime = time.time()
-        self.log('Processing started')
+        # cores and memory of the docker host (a vm on windows and mac), the local machine if unknown
+        info = self.dockerInfo or {}
+        hostCPUs = info.get("NCPU") or getCPUCount()
+        hostMemory = info.get("MemTotal") or getTotalMemory()
+        dockerfile = model.getDockerfile()
 
-        # create a temp directory icer
-        tempDir = slicer.util.tempDirectory()
+        cpus = self.containerCPUs or dockerfile.getCPUs()
+        if cpus:
+            cpus = min(cpus, hostCPUs)
 
-        # input file
-        # TODO: rename to input.nrrd (requires update in aimi_alpha)
-        inputFile = os.path.join(tempDir, "image.nrrd")
+        memory = int(self.containerMemoryGB * 1024**3) or dockerfile.getMemory()
+        if memory and hostMemory:
+            memory = min(memory, hostMemory)
 
-        # write selected input volume to temp directory
-        volumeStorageNode = slicer.mrmlScene.CreateNodeByClass("vtkMRMLVolumeArchetypeStorageNode")
-        volumeStorageNode.SetFileName(inputFile)
-        volumeStorageNode.UseCompressionOff()
-        volumeStorageNode.WriteData(inputVolume)
-        volumeStorageNode.UnRegister(None)
+        # pytorch data loaders exchange batches through /dev/shm (docker default: 64 MB), tmpfs only takes memory when used
+        ipcMode = "host" if self.containerHostIPC else dockerfile.getIpcMode()
+        shmSize = int(self.containerShmGB * 1024**3) or dockerfile.getShmSize() or min((memory or hostMemory or 8 * 1024**3) // 4, 8 * 1024**3)
 
-        # image to run
-        #image_tag = 'aimi/totalsegmentator:latest' # 'aimi/thresholder' # 'leo/thresholder'
+        return ContainerResources(cpus=cpus, memory=memory, shmSize=shmSize, ipcMode=ipcMode)
 
-        # check / build image
-        if not self.checkImage(model, useGPU=useGPU) or noCache:
 
-            # download dockerfile and build image locally if download opion is enabled
-            if downloadDockerfile:
-                self.buildImage(model, downloadDockerfile=downloadDockerfile, noCache=noCache, useGPU=useGPU)
-            
-            # if not, just pull the image from dockerhub
+    def getWarmServerPool(self):
+        """ Registry of warm model servers (create on the main thread).
+        """
+        if self.warmServerPool is None:
+            from Utils.WarmServer import WarmServerPool
+            self.warmServerPool = WarmServerPool(os.path.join(slicer.app.temporaryPath, 'MRunner', 'warm'))
+            self.warmServerLock = threading.Lock()
+        return self.warmServerPool
+
+
+    def startWarmServer(self, server, model, useGPU=False, job=None):
+        """ Start a long-lived container running the warm server (Resources/Scripts/warm_server.py) for a model.
+            > docker run -d --rm --name NAME --volume SERVER_DIR:/app/data/warm IMAGE python3 /app/mrunner/warm_server.py ENTRYPOINT /app/data/warm
+        """
+        backend = self.getDockerBackend()
+
+        # remove a leftover container and all server state
+        backend.removeContainer(server.containerName)
+        server.reset()
+
+        #
+        binds  = [f"{server.serverDir}:/app/data/warm"]
+        binds += [f"{self.getScriptsDir()}:/app/mrunner:ro"]
+
+        # warm server running the slicer entrypoint for every submitted job (stops itself if the client is gone)
+        command  = ["python3", "/app/mrunner/warm_server.py", self.getEntrypoint(model), "/app/data/warm"]
+        command += ["--idle-timeout", str(2 * self.warmIdleTimeout)]
+
+        from Utils.Telemetry import span
+        imageRef = model.getDockerfile().getImageRef(useGPU=useGPU)
+        self.log(f"Start warm server ({server.containerName}, {imageRef} {' '.join(command)}, {backend.name})", setStep=True, job=job)
+        with span("start warm server"):
+            backend.startContainer(imageRef, command, binds, server.containerName, useGPU=useGPU, resources=self.getContainerResources(model))
+        server.startedAt = time.time()
+
+
+    def runContainerWarmSync(self, model, dir, useGPU=False, job=None):
+        """ Run the model on the input staged in dir through a warm (long-lived) model server.
+            The server container is started on first use and kept running until it was idle for warmIdleTimeout seconds.
+            Returns the job directory containing the model output.
+            NOTE: This code is blocking.
+        """
+        from Utils.WarmServer import WarmServerError
+
+        pool = self.getWarmServerPool()
+        with self.warmServerLock:
+            server = pool.getServer(model.getName(), useGPU) or pool.createServer(model.getName(), useGPU)
+            server.busy += 1
+
+        jobId = job.id if job is not None else f"{time.time_ns():x}"
+
+        try:
+            # start the server on first use or if it died
+            with server.startLock:
+                if server.startedAt is None or (server.getHeartbeatAge() is not None and not server.isAlive()):
+                    self.startWarmServer(server, model, useGPU=useGPU, job=job)
+
+            # a cancelled job only cancels its own request, the server (shared by other jobs) keeps running
+            if job is not None:
+                job.setCancelHandler(lambda job: server.cancel(jobId))
+                job.checkCancelled()
+
+            # stage input
+            jobDir = server.createJobDir(jobId)
+            for fileName in os.listdir(dir):
+                self.linkFile(os.path.join(dir, fileName), os.path.join(jobDir, fileName))
+
+            # submit and wait for the response
+            from Utils.Telemetry import span
+            self.log(f"Run on warm server {server.containerName}", setStep=True, job=job)
+            with span("inference", warm=True):
+                jobDir = server.submit(jobId, {"outputs": [of.getFileName() for of in model.getOutputFiles()]})
+                response = server.wait(jobDir, logCallback=lambda line, transient: self.log(line, job=job, transient=transient), isCancelled=job.isCancelRequested if job is not None else None)
+
+        except WarmServerError:
+            if job is not None and job.isCancelRequested():
+                server.cancel(jobId)
+                job.checkCancelled()
+            with self.warmServerLock:
+                pool.removeServer(server)
+            raise
+
+        finally:
+            with self.warmServerLock:
+                server.busy -= 1
+
+        # move the output back to the run directory, the server directory only holds pending jobs
+        for fileName in os.listdir(jobDir):
+            if not os.path.exists(os.path.join(dir, fileName)):
+                self.linkFile(os.path.join(jobDir, fileName), os.path.join(dir, fileName))
+        shutil.rmtree(jobDir, ignore_errors=True)
+
+        if not response["ok"]:
+            raise RuntimeError(f"Model failed on warm server: {response['error']}")
+
+        self.log(f"Model finished in {response['duration']:.2f} seconds (warm).", job=job)
+        return dir
+
+
+    def startWarmReapTimer(self):
+        if self.warmReapTimer is None:
+            self.warmReapTimer = qt.QTimer()
+            self.warmReapTimer.setInterval(30 * 1000)
+            self.warmReapTimer.timeout.connect(self.reapWarmServers)
+        if not self.warmReapTimer.isActive():
+            self.warmReapTimer.start()
+
+
+    def reapWarmServers(self, idleTimeout=None):
+        """ Stop all warm servers that were idle for more than idleTimeout (default: warmIdleTimeout) seconds.
+        """
+        if self.warmServerPool is None:
+            return
+
+        idleTimeout = self.warmIdleTimeout if idleTimeout is None else idleTimeout
+        with self.warmServerLock:
+            servers = self.warmServerPool.getIdleServers(idleTimeout)
+            for server in servers:
+                self.warmServerPool.removeServer(server)
+
+        for server in servers:
+            self.log(f"Stopping idle warm server {server.containerName}.")
+            server.requestShutdown()
+            self.killContainer(server.containerName)
+
+        if not self.warmServerPool.getAllServers() and self.warmReapTimer is not None:
+            self.warmReapTimer.stop()
+
+
+    def stopWarmServers(self):
+        """ Stop all warm servers that are not busy.
+        """
+        self.reapWarmServers(idleTimeout=-1)
+
+
+    def getEntrypoint(self, model):
+        """ Path of the slicer entrypoint script of a model inside the container.
+        """
+        mhub_model_dir = model.getName().lower()
+        return f"/app/models/{mhub_model_dir}/scripts/slicer_run.py"
+
+
+    def getScriptsDir(self):
+        """ Directory of the helper scripts that are mounted into containers.
+        """
+        return os.path.join(os.path.dirname(__file__), 'Resources', 'Scripts')
+
+
+    def killContainer(self, containerName):
+        """ Kill a running container (non-blocking).
+            > docker kill NAME
+        """
+        from Utils.Docker import DockerError
+        backend = self.getDockerBackend()
+        if backend.name == "cli" and backend.executable is None:
+            return
+
+        try:
+            backend.killContainer(containerName)
+        except (OSError, DockerError) as e:
+            logging.warning(f"Cannot kill container {containerName}: {e}")
+
+
+    def displaySegmentation(self, outputSegmentation, dir, model, importedFiles=None):
+        """ Import all output files of a model into the output segmentation.
+            Files in importedFiles were already imported while the model was running (see importStreamedFiles) and are skipped.
+        """
+
+        # log
+        self.log(f"Import segmentations", setStep=True)
+
+        # clear output segmentation (unless segments were streamed into it)
+        if not importedFiles:
+            outputSegmentation.GetSegmentation().RemoveAllSegments()
+
+        # gzipped output files are read (and inflated) directly, in parallel for single label files (see importLabelFiles)
+        from Utils.Telemetry import span
+        ofs = [of for of in model.getOutputFiles() if of.getFileName() not in (importedFiles or [])]
+        filePaths = {of.getFileName(): os.path.join(dir, of.getFileName()) for of in ofs}
+
+        with span("import labels", files=len(ofs)):
+            self.importOutputFiles(outputSegmentation, ofs, filePaths, model)
+
+
+    def importOutputFiles(self, outputSegmentation, ofs, filePaths, model):
+        """ Import the output files of a model into the output segmentation.
+        """
+
+        # iterate all output files from the repo
+        # (single label files are collected and imported together, see importLabelFiles)
+        singleLabels = []
+        for of in ofs:
+            fileName = of.getFileName()
+            ofls = of.getLabels()
+
+            if len(ofls) == 1:
+                singleLabels.append((ofls[0], filePaths[fileName]))
+
+            else:
+                # multi-label files (e.g. all labels of a model in one file) are read one after the other by the storage node
+
+                # setup
+                maxLabelValue = len(ofls)
+                opacity = 1
+
+                # create color table for this segmentation task
+                colorTableNode = slicer.vtkMRMLColorTableNode()
+                colorTableNode.SetTypeToUser()
+                colorTableNode.SetNumberOfColors(maxLabelValue+1)
+                colorTableNode.SetName(f"MHub [{model.getLabel()}]")
+
+                # iterate all file labels
+                for ofl in ofls:
+                    segment = ofl.getSegment()
+                    segmentName = segment.getName()
+                    segmentColor = segment.getColor()
+                    segmentRGB = segmentColor.getComponentsAsFloat() if segmentColor is not None else [0, 0, 0]
+                    labelValue = ofl.getID()
+
+                    colorTableNode.SetColor(labelValue, segmentRGB[0], segmentRGB[1], segmentRGB[2], opacity)
+                    colorTableNode.SetColorName(labelValue, segmentName)
+                slicer.mrmlScene.AddNode(colorTableNode)
+
+                # link color table and load the segmentation file 
+                self.log(f"Importing {fileName} (# labels: {maxLabelValue})")
+                startTime = time.time()
+                outputSegmentation.SetLabelmapConversionColorTableNodeID(colorTableNode.GetID())
+                outputSegmentation.AddDefaultStorageNode()
+                storageNode = outputSegmentation.GetStorageNode()
+                storageNode.SetFileName(filePaths[fileName])
+                storageNode.ReadData(outputSegmentation)
+                logging.info(f"Read {fileName} ({os.path.getsize(filePaths[fileName]) / 1e6:.1f} MB) in {time.time()-startTime:.2f} seconds.")
+
+                # remove the color table
+                slicer.mrmlScene.RemoveNode(colorTableNode)
+
+        # import all single label files
+        if len(singleLabels) > 0:
+            self.importLabelFiles(outputSegmentation, singleLabels)
+
+
+    def importLabelFiles(self, outputSegmentation, labels):
+        """ Import single label files (list of (output file label, file path)) into the output segmentation.
+            All files are read in parallel and merged into as few labelmaps as possible (see Utils.LabelIO),
+            each labelmap is imported with a single ImportLabelmapToSegmentationNode call.
+        """
+        import numpy as np
+        from Utils.LabelIO import readLabelFiles, mergeLabelImages
+
+        for _, segmentPath in labels:
+            assert os.path.isfile(segmentPath), f"Segment file not found at {segmentPath}."
+
+        # read all files in parallel and merge them into shared labelmaps
+        # (read time and size of every file are logged and added to the telemetry span)
+        from Utils.Telemetry import span
+        startTime = time.time()
+        with span("read label files") as readSpan:
+            images = readLabelFiles([segmentPath for _, segmentPath in labels], maxWorkers=self.importWorkers or None)
+            for image in images:
+                logging.info(f"Read {os.path.basename(image.path)} ({image.fileSize / 1e6:.1f} MB, {image.array.nbytes / 1e6:.1f} MB inflated) in {image.readTime:.2f} seconds.")
+            if readSpan is not None:
+                readSpan.attrs["files"] = [{"file": os.path.basename(image.path), "bytes": image.fileSize, "inflated": image.array.nbytes, "read": image.readTime} for image in images]
+        labelmaps = mergeLabelImages(images)
+        self.log(f"Read {len(images)} label files in {time.time()-startTime:.2f} seconds, importing {len(labelmaps)} labelmap(s).")
+
+        # add a segment for every label in model order (empty labels keep their empty segment)
+        # (segments of a failed import are removed again, so a retry does not add them twice)
+        segmentation = outputSegmentation.GetSegmentation()
+        segmentIds = []
+        try:
+            for ofl, _ in labels:
+                segment = ofl.getSegment()
+                segmentName = segment.getName()
+                segmentColor = segment.getColor()
+                segmentRGB = segmentColor.getComponentsAsFloat() if segmentColor is not None else [0, 0, 0]
+                segmentIds.append(segmentation.AddEmptySegment(segmentName, segmentName, segmentRGB))
+
+            # label value i+1 of a labelmap updates the segment of its i-th label file
+            for labelmap in labelmaps:
+                labelmapVolumeNode = slicer.util.addVolumeFromArray(labelmap.array, slicer.util.vtkMatrixFromArray(np.array(labelmap.ijkToRAS)), nodeClassName="vtkMRMLLabelMapVolumeNode")
+                try:
+                    updatedSegmentIds = vtk.vtkStringArray()
+                    for index in labelmap.indices:
+                        updatedSegmentIds.InsertNextValue(segmentIds[index])
+
+                    slicer.modules.segmentations.logic().ImportLabelmapToSegmentationNode(labelmapVolumeNode, outputSegmentation, updatedSegmentIds)
+                finally:
+                    slicer.mrmlScene.RemoveNode(labelmapVolumeNode)
+        except Exception:
+            for segmentId in segmentIds:
+                segmentation.RemoveSegment(segmentId)
+            raise
+
+
+    def exportInputVolume(self, inputVolume, dir):
+        """ Write the input volume into the (mounted) data directory. Returns the path of the written file.
+        """
+
+        # input file
+        # TODO: rename to input.nrrd (requires update in aimi_alpha)
+        inputFile = os.path.join(dir, "image.nrrd")
+
+        # write selected input volume to temp directory
+        volumeStorageNode = slicer.mrmlScene.CreateNodeByClass("vtkMRMLVolumeArchetypeStorageNode")
+        volumeStorageNode.SetFileName(inputFile)
+        volumeStorageNode.UseCompressionOff()
+        volumeStorageNode.WriteData(inputVolume)
+        volumeStorageNode.UnRegister(None)
+
+        return inputFile
+
+
+    def exportInputVolumeRaw(self, inputVolume, dir):
+        """ Write the input volume as detached header NRRD (image.nrrd + image.raw) straight from the voxel array.
+            Much faster than exportInputVolume (no vtk writer pipeline), used for tmpfs input directories.
+            Returns the path of the header file.
+        """
+        from Utils.Nrrd import writeDetachedNrrd
+
+        inputFile = os.path.join(dir, "image.nrrd")
+        ijkToRAS = vtk.vtkMatrix4x4()
+        inputVolume.GetIJKToRASMatrix(ijkToRAS)
+        writeDetachedNrrd(inputFile, slicer.util.arrayFromVolume(inputVolume), [[ijkToRAS.GetElement(r, c) for c in range(4)] for r in range(4)])
+
+        return inputFile
+
+
+    def getExportManifest(self, raw=False):
+        """ Manifest of reusable input exports (see Utils.ExportManifest). Raw exports live in shared memory.
+        """
+        if raw not in self.exportManifests:
+            from Utils.ExportManifest import ExportManifest
+            if raw:
+                self.exportManifests[raw] = ExportManifest(os.path.join(self.sharedMemoryPath, f"MRunner-{os.getuid()}-exports"), maxEntries=2)
+            else:
+                self.exportManifests[raw] = ExportManifest(os.path.join(slicer.app.temporaryPath, 'MRunner', 'exports'))
+        return self.exportManifests[raw]
+
+
+    def stageInputVolume(self, inputVolume, dir, raw=False, contentHash=None, readOnly=False):
+        """ Stage the input volume in dir (as image.nrrd, see exportInputVolume and exportInputVolumeRaw).
+            The volume is exported once and reused by all later runs until the volume is modified. The export is
+            hard-linked into dirs that are mounted read-only (readOnly, see createInputDir) and copied into all others,
+            so a model rewriting its input cannot modify the shared export.
+            Returns the path of the staged file.
+        """
+        manifest = self.getExportManifest(raw)
+
+        imageData = inputVolume.GetImageData()
+        mtime = max(inputVolume.GetMTime(), imageData.GetMTime() if imageData is not None else 0)
+        if self.verifyExportHash and contentHash is None:
+            contentHash = self.computeVolumeHash(inputVolume)
+
+        from Utils.Telemetry import span
+        entry = manifest.lookup(inputVolume.GetID(), mtime, contentHash if self.verifyExportHash else None)
+        if entry is None:
+            writer = self.exportInputVolumeRaw if raw else self.exportInputVolume
+            with span("export", raw=raw):
+                entry = manifest.add(inputVolume.GetID(), mtime, contentHash, lambda exportDir: writer(inputVolume, exportDir))
+        else:
+            self.log(f"Input volume {inputVolume.GetName()} unchanged, reusing the previous export.")
+
+        import shutil
+        for fileName in entry.files:
+            if readOnly:
+                self.linkFile(os.path.join(entry.dir, fileName), os.path.join(dir, fileName))
             else:
-                self.pullImage(model, useGPU=useGPU)
+                shutil.copyfile(os.path.join(entry.dir, fileName), os.path.join(dir, fileName))
+        return os.path.join(dir, "image.nrrd")
+
+
+    def clearExports(self):
+        for manifest in self.exportManifests.values():
+            manifest.clear()
+
+
+    def createInputDir(self, name, requiredBytes=0):
+        """ Create an input directory that is mounted read-only into the container, separately from the output directory
+            (staged exports are hard-linked into it, see stageInputVolume). The directory is in shared memory (tmpfs) if
+            enabled and available (useSharedMemoryInput, linux only) and large enough, on disk otherwise.
+            Returns (dir, raw): raw input (see exportInputVolumeRaw) is written to shared memory.
+        """
+        from Utils.WorkDirs import WorkDirManager
+
+        raw = self.useSharedMemoryInput and sys.platform.startswith('linux') and os.path.isdir(self.sharedMemoryPath) and self.isDockerHostLocal()
+
+        # leave room for other users of the tmpfs
+        if raw:
+            stat = os.statvfs(self.sharedMemoryPath)
+            if stat.f_bavail * stat.f_frsize < 2 * requiredBytes:
+                self.log("Not enough shared memory, writing input to disk.")
+                raw = False
+
+        if raw not in self.inputDirManagers:
+            rootDir = os.path.join(self.sharedMemoryPath, f"MRunner-{os.getuid()}") if raw else os.path.join(slicer.app.temporaryPath, 'MRunner', 'inputs')
+            self.inputDirManagers[raw] = WorkDirManager(rootDir)
+        return self.inputDirManagers[raw].create('input', name), raw
+
+
+    def isDockerHostLocal(self):
+        """ True if the docker daemon runs on this machine (see probeDocker), so host tmpfs paths like /dev/shm can be
+            mounted into containers. VM based daemons (e.g. Docker Desktop for Linux) and remote daemons only share
+            selected directories with the host.
+        """
+        import socket
+        info = self.dockerInfo or {}
+        if "Docker Desktop" in info.get("OperatingSystem", "") or info.get("Name") != socket.gethostname():
+            if not self._loggedRemoteDockerHost:
+                self.log("Docker does not run on this machine, writing input to disk instead of shared memory.")
+                self._loggedRemoteDockerHost = True
+            return False
+        return True
+
+
+    def releaseInputDir(self, inputDir):
+        if inputDir is None:
+            return
+        for manager in self.inputDirManagers.values():
+            if os.path.dirname(inputDir) == manager.rootDir:
+                manager.release(inputDir)
+
+
+    def getWorkDirManager(self):
+        """ Managed working directories of all runs and builds (see Utils.WorkDirs).
+        """
+        if self.workDirManager is None:
+            from Utils.WorkDirs import WorkDirManager
+            self.workDirManager = WorkDirManager(os.path.join(slicer.app.temporaryPath, 'MRunner', 'runs'))
+        self.workDirManager.keepLast = self.keepRuns
+        self.workDirManager.maxBytes = int(self.workDirQuotaGB * 1024**3)
+        return self.workDirManager
+
+
+    def createJobDir(self, job, requiredBytes=0):
+        """ Create the working directory of a job (released when the job is finished, see releaseJobDir).
+        """
+        job.workDir = self.getWorkDirManager().create('run', f"{job.model.getName().lower()}-{job.id}", requiredBytes=requiredBytes)
+        return job.workDir
+
+
+    def releaseJobDir(self, job, state=None):
+        if job.workDir is not None:
+            self.getWorkDirManager().release(job.workDir, state=state or job.state.value)
+            job.workDir = None
+        self.releaseInputDir(job.inputDir)
+        job.inputDir = None
+
+
+    def abortStaging(self, job, error=None):
+        """ Clean up a job that failed before it was submitted (e.g. a failed export or a quota error):
+            release its working and input directories and finish its telemetry as failed.
+        """
+        self.releaseJobDir(job, state="failed")
+        self.finishTelemetry(job.telemetry, "failed", error)
+        job.telemetry = None
+
+
+    def getVolumeBytes(self, inputVolume):
+        """ Size of the voxel data of a volume in bytes (estimate of the exported input file).
+        """
+        imageData = inputVolume.GetImageData()
+        if imageData is None:
+            return 0
+        return imageData.GetNumberOfPoints() * imageData.GetNumberOfScalarComponents() * imageData.GetScalarSize()
+
+
+    def getResultCache(self):
+        """ Size-bounded on-disk cache of model outputs (see Utils.ResultCache).
+        """
+        if self.resultCache is None:
+            from Utils.ResultCache import ResultCache
+            self.resultCache = ResultCache(os.path.join(slicer.app.cachePath, 'MRunner', 'results'), int(self.resultCacheMaxGB * 1024**3))
+        self.resultCache.maxBytes = int(self.resultCacheMaxGB * 1024**3)
+        return self.resultCache
+
+
+    def computeVolumeHash(self, inputVolume):
+        """ Hash of the voxel data and the geometry of a volume (identifies the exported model input).
+        """
+        import hashlib
+        import numpy as np
+
+        voxels = np.ascontiguousarray(slicer.util.arrayFromVolume(inputVolume))
+        ijkToRAS = vtk.vtkMatrix4x4()
+        inputVolume.GetIJKToRASMatrix(ijkToRAS)
+
+        h = hashlib.blake2b(digest_size=32)
+        h.update(f"{voxels.dtype}:{voxels.shape}".encode('utf-8'))
+        h.update(",".join(f"{ijkToRAS.GetElement(r, c):.9g}" for r in range(4) for c in range(4)).encode('utf-8'))
+        h.update(memoryview(voxels).cast('B'))
+        return h.hexdigest()
+
+
+    def getResultCacheKey(self, model, inputHash, useGPU=False, wait=True):
+        """ Result cache key of a run. Returns None if the image (digest) is not available locally.
+        """
+        from Utils.ResultCache import ResultCache
+
+        imageDigest = self.getImageInventory().getImageID(model.getDockerfile().getImageRef(useGPU=useGPU), wait=wait)
+        if not imageDigest:
+            return None
+
+        outputFiles = [of.getFileName() for of in model.getOutputFiles()]
+        return ResultCache.computeKey(inputHash, model.getName(), outputFiles, imageDigest, useGPU)
+
+
+    def lookupResult(self, model, inputHash, useGPU=False, wait=True):
+        """ Returns the cached output directory of a run or None.
+            If wait is False the lookup never blocks on the docker daemon (no result if the image inventory is not loaded yet).
+        """
+        key = self.getResultCacheKey(model, inputHash, useGPU=useGPU, wait=wait)
+        if key is None:
+            return None
+
+        entry = self.getResultCache().lookup(key)
+        return entry.dir if entry is not None else None
 
-        # run container
-        self.runContainerSync(model, tempDir, useGPU=useGPU)
 
-        # display segmentation
-        self.displaySegmentation(outputSegmentation, tempDir, model)
+    def storeResult(self, model, inputHash, dir, useGPU=False, job=None):
+        """ Add the output files of a finished run to the result cache (errors are logged, not raised).
+        """
+        try:
+            key = self.getResultCacheKey(model, inputHash, useGPU=useGPU)
+            outputFiles = [of.getFileName() for of in model.getOutputFiles()]
+            if key is None or not all(os.path.isfile(os.path.join(dir, f)) for f in outputFiles):
+                return
+            from Utils.Telemetry import span
+            with span("store result"):
+                self.getResultCache().store(key, dir, outputFiles, model=model.getName())
+            self.log("Result stored in cache.", job=job)
+        except Exception as e:
+            self.log(f"Failed to store result in cache: {e}", job=job)
+
+
+    def linkFile(self, src, dst):
+        """ Hard-link a staged file into another (mounted) directory, copy it if linking is not possible.
+        """
+        import shutil
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+
+    def linkSegmentationToVolume(self, outputSegmentation, inputVolume):
+        """ Set the input volume as source of the segmentation and place both in the same subject hierarchy folder.
+        """
 
         # Set source volume - required for DICOM Segmentation export
         outputSegmentation.SetNodeReferenceID(outputSegmentation.GetReferenceImageGeometryReferenceRole(), inputVolume.GetID())
@@ -970,13 +2168,660 @@ class MRunnerLogic(ScriptedLoadableModuleLogic):
         segmentationShItem = shNode.GetItemByDataNode(outputSegmentation)
         shNode.SetItemParent(segmentationShItem, studyShItem)
 
-        # cleaning temp dir
-        # TODO: clean temp dir
+
+    def getTelemetryLog(self):
+        """ Local JSON lines log of the telemetry of all finished runs.
+        """
+        if self.telemetryLog is None:
+            from Utils.Telemetry import TelemetryLog
+            self.telemetryLog = TelemetryLog(os.path.join(slicer.app.cachePath, 'MRunner', 'telemetry.jsonl'))
+        return self.telemetryLog
+
+
+    def openRunLog(self, job):
+        """ Write the complete output of a job to a log file in the Slicer cache folder (the log window only keeps
+            the last lines). Only the newest keepRunLogs files are kept.
+        """
+        from Utils.LogPipeline import RunLogFile, getRunLogPath, pruneRunLogs
+
+        logDir = os.path.join(slicer.app.cachePath, 'MRunner', 'logs')
+        pruneRunLogs(logDir, max(0, self.keepRunLogs - 1))
+        try:
+            job.logFile = RunLogFile(getRunLogPath(logDir, f"{job.model.getName().lower()}-{job.id}"))
+        except OSError as e:
+            logging.warning(f"Log file of job {job.id} not created: {e}")
+            return
+        job.addDoneCallback(lambda job: job.logFile.close())
+        self.log(f"Run log: {job.logFile.path}")
+
+
+    def startTelemetry(self, runId, model, useGPU=False, **attrs):
+        """ Create the span tree of a run (see Utils.Telemetry), stages add their spans while the run is activated
+            on the calling thread. Finished by finishTelemetry.
+        """
+        from Utils.Telemetry import RunTelemetry
+        return RunTelemetry(runId, "run", {"model": model.getName(), "image": model.getDockerfile().getImageRef(useGPU=useGPU), "useGPU": useGPU, **attrs})
+
+
+    def finishTelemetry(self, telemetry, state, error=None):
+        """ Close the run, append it to the telemetry log and report it (main thread).
+        """
+        if telemetry is None:
+            return
+
+        telemetry.finish(state, error)
+        self.lastTelemetry = telemetry
+
+        try:
+            self.getTelemetryLog().append(telemetry)
+        except OSError as e:
+            logging.warning(f"Telemetry of run {telemetry.runId} not written: {e}")
+
+        if self.telemetryCallback:
+            self.telemetryCallback(telemetry)
+
+
+    @contextlib.contextmanager
+    def traceRun(self, telemetry):
+        """ Activate a run on the calling thread and finish it when the block is left (done or failed).
+        """
+        from Utils.Telemetry import activate
+        try:
+            with activate(telemetry):
+                yield telemetry
+        except BaseException as e:
+            self.finishTelemetry(telemetry, "failed", e)
+            raise
+        self.finishTelemetry(telemetry, "done")
+
+
+    def process(self, model, inputVolume, outputSegmentation, imageThreshold, downloadDockerfile=True, useGPU=False, noCache=False, keepWarm=False):
+        """
+        Run the processing algorithm.
+        Can be used without GUI widget.
+        NOTE: This call is blocking, use processAsync to run the model without blocking the main thread.
+        :param model: repository model to run
+        :param inputVolume: volume passed to the model
+        :param outputSegmentation: segmentation node the model output is imported into
+        :param downloadDockerfile: build the image from the downloaded dockerfile instead of pulling it
+        :param useGPU: run the cuda image with gpu support
+        :param noCache: rebuild or pull the image even if it is available locally
+        :param keepWarm: run the model on a warm (long-lived) model server container
+        """
+
+        if not inputVolume:
+            raise ValueError("Input volume is invalid")
+
+        import time, os
+        from Utils.Telemetry import span
+        startTime = time.time()
+        self.log('Processing started')
+        telemetry = self.startTelemetry(f"{int(startTime * 1000):x}", model, useGPU=useGPU, keepWarm=keepWarm)
+
+        with self.traceRun(telemetry):
+            # result cache: import the cached output instead of running the model again
+            with span("cache lookup"):
+                inputHash = self.computeVolumeHash(inputVolume) if self.useResultCache and not noCache else None
+                cachedDir = self.lookupResult(model, inputHash, useGPU=useGPU) if inputHash is not None else None
+            if cachedDir is not None:
+                self.log('Result found in cache.')
+                with span("import"):
+                    self.displaySegmentation(outputSegmentation, cachedDir, model)
+                    self.linkSegmentationToVolume(outputSegmentation, inputVolume)
+                self.log(f'Processing completed in {time.time()-startTime:.2f} seconds.', setStep=True)
+                return
+
+            # create a working directory (removed or kept for debugging when done, see getWorkDirManager)
+            workDirs = self.getWorkDirManager()
+            tempDir = workDirs.create('run', model.getName().lower(), requiredBytes=self.getVolumeBytes(inputVolume))
+            inputDir = None
+            state = "failed"
+
+            try:
+                # write selected input volume to a read-only input directory (warm servers read it from the temp directory)
+                if not keepWarm:
+                    inputDir, raw = self.createInputDir(os.path.basename(tempDir), self.getVolumeBytes(inputVolume))
+                    self.stageInputVolume(inputVolume, inputDir, raw=raw, contentHash=inputHash, readOnly=True)
+                else:
+                    self.stageInputVolume(inputVolume, tempDir, contentHash=inputHash)
+
+                # image to run
+                #image_tag = 'aimi/totalsegmentator:latest' # 'aimi/thresholder' # 'leo/thresholder'
+
+                # check / build image
+                self.prepareImage(model, downloadDockerfile=downloadDockerfile, useGPU=useGPU, noCache=noCache)
+
+                # run container
+                if keepWarm:
+                    self.getWarmServerPool()
+                    tempDir = self.runContainerWarmSync(model, tempDir, useGPU=useGPU)
+                else:
+                    self.runContainerSync(model, tempDir, useGPU=useGPU, inputDir=inputDir)
+
+                # add the output to the result cache
+                if inputHash is not None:
+                    self.storeResult(model, inputHash, tempDir, useGPU=useGPU)
+
+                with span("import"):
+                    # display segmentation
+                    self.displaySegmentation(outputSegmentation, tempDir, model)
+
+                    # link segmentation and input volume
+                    self.linkSegmentationToVolume(outputSegmentation, inputVolume)
+                state = "done"
+
+            finally:
+                # cleaning temp dir
+                workDirs.release(tempDir, state=state)
+                self.releaseInputDir(inputDir)
 
         stopTime = time.time()
         self.log(f'Processing completed in {stopTime-startTime:.2f} seconds.', setStep=True)
 
 
+    def processAsync(self, model, inputVolume, outputSegmentation, downloadDockerfile=True, useGPU=False, noCache=False, keepWarm=False):
+        """
+        Run the processing algorithm without blocking the main thread.
+        The input volume is exported immediately, the image preparation and the container run happen on a worker thread
+        and the segmentation is imported on the main thread once the container is done.
+        If keepWarm is set, the model runs on a warm (long-lived) model server container instead of a new container.
+        Returns a job handle (see Utils.Jobs.Job) that can be cancelled and reports completion through callbacks.
+        """
+
+        if not inputVolume:
+            raise ValueError("Input volume is invalid")
+
+        from Utils.Jobs import Job
+        from Utils.Telemetry import activate, span
+
+        # create job
+        job = Job(model, useGPU=useGPU)
+        job.inputVolume = inputVolume
+        job.outputSegmentation = outputSegmentation
+        job.keepWarm = keepWarm
+        job.setCancelHandler(lambda job: self.killContainer(job.containerName))
+        job.telemetry = self.startTelemetry(job.id, model, useGPU=useGPU, keepWarm=keepWarm)
+        self.log(f'Processing started (job {job.id})')
+
+        # result cache: import the cached output instead of running the model again
+        if self.useResultCache and not noCache:
+            with activate(job.telemetry), span("cache lookup"):
+                job.inputHash = self.computeVolumeHash(inputVolume)
+                cachedDir = self.lookupResult(model, job.inputHash, useGPU=useGPU, wait=False)
+            if cachedDir is not None:
+                self.log(f'Result found in cache (job {job.id}).')
+                job.dir = cachedDir
+                job.cacheHit = True
+                job.setWorkerStarted()
+                job.setWorkerResult()
+                self.submitJob(job)
+                return job
+
+        # warm server registry and reaper live on the main thread
+        if keepWarm:
+            self.getWarmServerPool()
+            self.startWarmReapTimer()
+
+        # write selected input volume to a read-only input directory (warm servers read it from the job directory)
+        # (MRML access is restricted to the main thread)
+        try:
+            job.dir = self.createJobDir(job, requiredBytes=self.getVolumeBytes(inputVolume))
+            with activate(job.telemetry):
+                if not keepWarm:
+                    job.inputDir, raw = self.createInputDir(job.id, self.getVolumeBytes(inputVolume))
+                    self.stageInputVolume(inputVolume, job.inputDir, raw=raw, contentHash=job.inputHash, readOnly=True)
+                else:
+                    self.stageInputVolume(inputVolume, job.dir, contentHash=job.inputHash)
+        except Exception as e:
+            self.abortStaging(job, e)
+            raise
+
+        # import output files as soon as they are written (not supported on warm servers, outputs appear when the job is done)
+        if self.streamImport and not keepWarm:
+            self.startOutputWatcher(job)
+
+        # queue the job, it is started as soon as a worker is free
+        job.downloadDockerfile = downloadDockerfile
+        job.noCache = noCache
+        self.submitJob(job)
+
+        return job
+
+
+    def scheduleJobs(self, requests, downloadDockerfile=True, useGPU=False, noCache=False):
+        """
+        Run several (model, volume) jobs concurrently on the bounded worker pool (see getMaxWorkers).
+        Each volume is exported only once and shared (hard-linked) between all jobs using it (see stageInputVolume).
+        Results are imported in completion order.
+        :param requests: list of (model, inputVolume) or (model, inputVolume, outputSegmentation) tuples,
+                         a new segmentation node is created if no output segmentation is given
+        Returns the list of job handles.
+        """
+
+        from Utils.Jobs import Job
+        from Utils.Telemetry import activate
+
+        stagedVolumes = set()
+        jobs = []
+        createdSegmentations = []
+        try:
+            for request in requests:
+                model, inputVolume = request[0], request[1]
+                outputSegmentation = request[2] if len(request) > 2 else None
+
+                if not inputVolume:
+                    raise ValueError("Input volume is invalid")
+
+                # create output segmentation
+                if outputSegmentation is None:
+                    outputSegmentation = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode", f"{inputVolume.GetName()} [{model.getLabel()}]")
+                    outputSegmentation.CreateDefaultDisplayNodes()
+                    createdSegmentations.append(outputSegmentation)
+
+                # create job
+                job = Job(model, useGPU=useGPU)
+                job.inputVolume = inputVolume
+                job.outputSegmentation = outputSegmentation
+                job.downloadDockerfile = downloadDockerfile
+                job.noCache = noCache
+                job.setCancelHandler(lambda job: self.killContainer(job.containerName))
+                job.telemetry = self.startTelemetry(job.id, model, useGPU=useGPU)
+                jobs.append(job)
+
+                # export each volume once, later jobs link the exported file into their read-only input directory
+                requiredBytes = 0 if inputVolume.GetID() in stagedVolumes else self.getVolumeBytes(inputVolume)
+                job.dir = self.createJobDir(job, requiredBytes=requiredBytes)
+                with activate(job.telemetry):
+                    job.inputDir, raw = self.createInputDir(job.id, requiredBytes)
+                    self.stageInputVolume(inputVolume, job.inputDir, raw=raw, readOnly=True)
+                stagedVolumes.add(inputVolume.GetID())
+        except Exception as e:
+            # none of the jobs is started
+            for job in jobs:
+                self.abortStaging(job, e)
+            for outputSegmentation in createdSegmentations:
+                slicer.mrmlScene.RemoveNode(outputSegmentation)
+            raise
+
+        self.log(f'Scheduled {len(jobs)} jobs (max. {self.getMaxWorkers()} in parallel).')
+        for job in jobs:
+            self.submitJob(job)
+
+        return jobs
+
+
+    def getMaxWorkers(self):
+        """ Number of jobs running in parallel. Unless set explicitly (maxWorkers), the pool is sized
+            by the number of cpu cores (workerCPUs per job) and the available memory (workerMemoryGB per job).
+        """
+        if self.maxWorkers > 0:
+            return self.maxWorkers
+
+        from Utils.Host import getCPUCount, getAvailableMemory
+
+        byCPU = getCPUCount() // self.workerCPUs
+        availableMemory = getAvailableMemory()
+        byMemory = availableMemory // int(self.workerMemoryGB * 1024**3) if availableMemory else byCPU
+
+        return max(1, min(byCPU, byMemory))
+
+
+    def submitJob(self, job):
+        """ Queue a prepared job and start it if a worker is free.
+        """
+
+        # initialize the image inventory on the main thread
+        self.getImageInventory()
+
+        # the working directory is removed (or kept for debugging) once the job is finished
+        job.addDoneCallback(self.releaseJobDir)
+        job.addDoneCallback(lambda job: self.finishTelemetry(job.telemetry, job.state.value, job.error))
+        if self.keepRunLogs > 0:
+            self.openRunLog(job)
+
+        self.jobs.append(job)
+        self.startQueuedJobs()
+        self.startJobTimer()
+
+
+    def startQueuedJobs(self):
+        """ Start queued jobs (in submission order) until the worker pool is full.
+        """
+
+        running = [job for job in self.jobs if job.isWorkerStarted() and not job.isWorkerDone()]
+        queued = [job for job in self.jobs if not job.isWorkerStarted() and not job.isCancelRequested()]
+
+        for job in queued[:max(0, self.getMaxWorkers() - len(running))]:
+            job.setWorkerStarted()
+            worker = threading.Thread(target=self.runJobWorker, args=(job,), name=f"MRunnerJob-{job.id}", daemon=True)
+            worker.start()
+
+
+    def runJobWorker(self, job):
+        """ Worker thread of a job: prepare the image and run the container. Never touches MRML or Qt.
+        """
+        from Utils.Jobs import JobState
+        from Utils.Telemetry import activate
+
+        with activate(job.telemetry):
+            try:
+                job.checkCancelled()
+                self.prepareImage(job.model, downloadDockerfile=job.downloadDockerfile, useGPU=job.useGPU, noCache=job.noCache, job=job)
+
+                job.checkCancelled()
+                job.setState(JobState.RUNNING)
+                if job.cases:
+                    self.runContainerBatchSync(job.model, job.dir, useGPU=job.useGPU, job=job)
+                elif job.keepWarm:
+                    job.dir = self.runContainerWarmSync(job.model, job.dir, useGPU=job.useGPU, job=job)
+                else:
+                    self.runContainerSync(job.model, job.dir, useGPU=job.useGPU, job=job, inputDir=job.inputDir)
+
+                # add the output to the result cache
+                if job.inputHash is not None:
+                    self.storeResult(job.model, job.inputHash, job.dir, useGPU=job.useGPU, job=job)
+
+                job.setWorkerResult()
+            except BaseException as e:
+                job.setWorkerResult(e)
+
+
+    def processBatch(self, model, inputVolumes=None, inputFolder=None, downloadDockerfile=True, useGPU=False, noCache=False):
+        """
+        Run a model on many inputs with a single container launch (asynchronous, see processAsync).
+        All inputs are staged into one batch directory (one sub-directory per case), the model's entrypoint is run once
+        over all cases and each case's output files are imported into their own, newly created segmentation node.
+        :param inputVolumes: list of volume nodes
+        :param inputFolder: folder of image files (nrrd files are staged as-is, other formats are loaded and exported)
+        Returns a job handle, the cases of the batch are available in job.cases.
+        """
+
+        from Utils.Jobs import Job
+
+        inputVolumes = list(inputVolumes or [])
+        if not inputVolumes and not inputFolder:
+            raise ValueError("No batch inputs selected")
+
+        # create job
+        job = Job(model, useGPU=useGPU)
+        job.setCancelHandler(lambda job: self.killContainer(job.containerName))
+        job.telemetry = self.startTelemetry(job.id, model, useGPU=useGPU, batch=True)
+
+        # stage all inputs into the batch directory (MRML access is restricted to the main thread)
+        try:
+            job.dir = self.createJobDir(job, requiredBytes=sum(self.getVolumeBytes(inputVolume) for inputVolume in inputVolumes))
+            for inputVolume in inputVolumes:
+                self.stageBatchVolume(job, inputVolume)
+            if inputFolder:
+                for fileName in sorted(os.listdir(inputFolder)):
+                    filePath = os.path.join(inputFolder, fileName)
+                    if os.path.isfile(filePath) and not fileName.startswith('.'):
+                        self.stageBatchFile(job, filePath)
+
+            if not job.cases:
+                raise ValueError("No batch inputs found")
+        except Exception as e:
+            self.abortStaging(job, e)
+            raise
+        self.log(f'Batch processing started (job {job.id}, {len(job.cases)} cases)')
+
+        # queue the job
+        job.downloadDockerfile = downloadDockerfile
+        job.noCache = noCache
+        self.submitJob(job)
+
+        return job
+
+
+    def addBatchCase(self, job, name):
+        """ Create the case directory for the next case of a batch job.
+        """
+        from Utils.Jobs import JobCase
+
+        caseDir = os.path.join(job.dir, f"case_{len(job.cases):04d}")
+        os.makedirs(caseDir)
+        case = JobCase(name, caseDir)
+        job.cases.append(case)
+        return case
+
+
+    def stageBatchVolume(self, job, inputVolume):
+        """ Export a volume node as a new case of a batch job.
+        """
+        case = self.addBatchCase(job, inputVolume.GetName())
+        case.inputVolume = inputVolume
+        self.stageInputVolume(inputVolume, case.dir)
+        return case
+
+
+    def stageBatchFile(self, job, filePath):
+        """ Stage an image file as a new case of a batch job. NRRD files are linked (or copied) without loading them.
+        """
+        fileName = os.path.basename(filePath)
+        name = fileName.split('.')[0]
+
+        if fileName.lower().endswith('.nrrd'):
+            case = self.addBatchCase(job, name)
+            self.linkFile(filePath, os.path.join(case.dir, "image.nrrd"))
+            return case
+
+        # other formats are converted through a (temporary) volume node
+        try:
+            volumeNode = slicer.util.loadVolume(filePath, {"show": False})
+        except Exception as e:
+            self.log(f"Skipping {fileName}, not a readable volume ({e}).")
+            return None
+        case = self.addBatchCase(job, name)
+        self.exportInputVolume(volumeNode, case.dir)
+        slicer.mrmlScene.RemoveNode(volumeNode)
+        return case
+
+
+    def importBatchResults(self, job):
+        """ Import the output files of each case of a batch job into its own segmentation node.
+        """
+        imported = 0
+        for case in job.cases:
+
+            # result of the case reported by the batch driver
+            statusFile = os.path.join(case.dir, ".mrunner_status")
+            if os.path.isfile(statusFile):
+                with open(statusFile, 'r') as f:
+                    status = json.load(f)
+                case.ok, case.error = bool(status["ok"]), status.get("error")
+            else:
+                case.ok, case.error = False, "Case was not processed."
+
+            if not case.ok:
+                self.log(f"Case {case.name} failed: {case.error}")
+                continue
+
+            # create output segmentation
+            case.outputSegmentation = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode", f"{case.name} [{job.model.getLabel()}]")
+            case.outputSegmentation.CreateDefaultDisplayNodes()
+
+            # display segmentation
+            self.displaySegmentation(case.outputSegmentation, case.dir, job.model)
+
+            # link segmentation and input volume
+            if case.inputVolume is not None:
+                self.linkSegmentationToVolume(case.outputSegmentation, case.inputVolume)
+
+            imported += 1
+
+        self.log(f"Imported {imported}/{len(job.cases)} cases.")
+
+
+    def startJobTimer(self):
+        if self.jobTimer is None:
+            self.jobTimer = qt.QTimer()
+            self.jobTimer.setInterval(self.jobPollInterval)
+            self.jobTimer.timeout.connect(self.onJobTimer)
+        if not self.jobTimer.isActive():
+            self.jobTimer.start()
+
+
+    def onJobTimer(self):
+        """ Main thread pump: forward job output at a bounded rate, finish jobs whose worker is done
+            (in completion order) and start queued jobs.
+        """
+        from Utils.Jobs import JobState
+
+        for job in self.jobs:
+            self.forwardJobOutput(job, maxItems=self.jobOutputMaxLines)
+
+        # import output files of running jobs as soon as they are written
+        for job in self.jobs:
+            if job.watcher is not None and job.state == JobState.RUNNING and not job.isCancelRequested():
+                self.importStreamedFiles(job, maxItems=self.streamImportMaxFiles)
+
+        # jobs cancelled before they were started never get a worker
+        finished = [job for job in self.jobs if job.isWorkerDone() or (job.isCancelRequested() and not job.isWorkerStarted())]
+        finished.sort(key=lambda job: job.getWorkerDoneAt() or 0)
+
+        # removed before finishing, a failing import or done callback must not finish the job again on the next tick
+        for job in finished:
+            self.jobs.remove(job)
+            self.forwardJobOutput(job)
+            self.finishJob(job)
+
+        self.startQueuedJobs()
+
+        if not self.jobs:
+            self.jobTimer.stop()
+
+
+    def startOutputWatcher(self, job):
+        """ Watch the job directory for single label output files to import them while the model is running (see importStreamedFiles).
+        """
+        from Utils.OutputWatcher import OutputWatcher
+
+        fileNames = [of.getFileName() for of in job.model.getOutputFiles() if len(of.getLabels()) == 1]
+        if fileNames:
+            job.watcher = OutputWatcher(job.dir, fileNames)
+            job.watcher.start()
+
+
+    def importStreamedFiles(self, job, maxItems=None):
+        """ Import the completed output files of a running job (main thread).
+            Failed files are logged and imported again once the job is done (importLabelFiles removes the segments of a failed import).
+        """
+        fileNames = job.watcher.takeCompleted(maxItems)
+        if not fileNames:
+            return
+
+        from Utils.Telemetry import activate, span
+
+        outputFiles = {of.getFileName(): of for of in job.model.getOutputFiles()}
+        ofs = [outputFiles[fileName] for fileName in fileNames]
+
+        try:
+            # the first streamed file replaces the previous content of the segmentation
+            if not job.streamedFiles:
+                job.outputSegmentation.GetSegmentation().RemoveAllSegments()
+            with activate(job.telemetry), span("import labels", files=len(ofs)):
+                self.importLabelFiles(job.outputSegmentation, [(of.getLabels()[0], os.path.join(job.dir, of.getFileName())) for of in ofs])
+            job.streamedFiles += fileNames
+            self.log(f"Imported {', '.join(fileNames)} (job {job.id}).")
+        except Exception as e:
+            self.log(f"Import of {', '.join(fileNames)} failed, retrying when the job is done ({e}).")
+
+
+    def forwardJobOutput(self, job, maxItems=None):
+        """ Forward queued job output to the log in batches of lines (followed by the latest step and pull / build progress).
+            A transient line (progress bar) is forwarded on its own, the log window replaces it with the next line.
+        """
+        items = job.takeOutput(maxItems)
+        dropped = job.takeDroppedOutput()
+
+        lines = []
+        if dropped:
+            lines.append(f"... {dropped} lines skipped" + (f" (see {job.logFile.path})" if job.logFile is not None else ""))
+
+        def flushLines():
+            if lines:
+                text = "\n".join(lines)
+                logging.info(text)
+                if self.logCallback:
+                    self.logCallback(text, False, False)
+                lines.clear()
+
+        for text, setStep, transient in items:
+            if setStep:
+                continue
+            if transient:
+                flushLines()
+                if self.logCallback:
+                    self.logCallback(text, False, True)
+            else:
+                lines.append(text)
+        flushLines()
+
+        steps = [text for text, setStep, transient in items if setStep]
+        if steps and self.logCallback:
+            self.logCallback(steps[-1], True, False)
+
+        if job.logFile is not None:
+            job.logFile.flush()
+
+        snapshot = job.takeProgress()
+        if snapshot is not None and self.progressCallback:
+            self.progressCallback(snapshot)
+
+
+    def finishJob(self, job):
+        """ Import the results of a job on the main thread and run its completion callbacks.
+        """
+        from Utils.Jobs import JobState
+        from Utils.Telemetry import activate, span
+
+        error = job.getWorkerError()
+
+        # no more streaming imports, remaining files are imported below
+        if job.watcher is not None:
+            job.watcher.stop()
+
+        if job.isCancelRequested():
+            self.log(f'Processing cancelled (job {job.id}).', setStep=True)
+            job.finish(JobState.CANCELLED, error)
+            return
+
+        if error is not None:
+            self.log(f'Processing failed (job {job.id}): {error}', setStep=True)
+            job.finish(JobState.FAILED, error)
+            return
+
+        try:
+            job.setState(JobState.IMPORTING)
+            self.forwardJobOutput(job)
+
+            with activate(job.telemetry), span("import"):
+                if job.cases:
+                    self.importBatchResults(job)
+                else:
+                    # display segmentation
+                    self.displaySegmentation(job.outputSegmentation, job.dir, job.model, importedFiles=job.streamedFiles)
+
+                    # link segmentation and input volume
+                    self.linkSegmentationToVolume(job.outputSegmentation, job.inputVolume)
+        except Exception as e:
+            self.log(f'Processing failed (job {job.id}): {e}', setStep=True)
+            job.finish(JobState.FAILED, e)
+            return
+
+        self.log(f'Processing completed in {time.time()-job.createdAt:.2f} seconds (job {job.id}).', setStep=True)
+        job.finish(JobState.DONE)
+
+
+    def hasActiveJobs(self):
+        return len(self.jobs) > 0
+
+
+    def cancelAllJobs(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+
 #
 # MRunnerTest
 #
@@ -998,6 +2843,10 @@ class MRunnerTest(ScriptedLoadableModuleTest):
         """
         self.setUp()
         self.test_MRunner1()
+        self.setUp()
+        self.test_MRunnerFakeDocker()
+        self.setUp()
+        self.test_MRunnerPrefetchSelection()
 
     def test_MRunner1(self):
         """ Ideally you should have several levels of tests.  At the lowest level
@@ -1044,3 +2893,67 @@ class MRunnerTest(ScriptedLoadableModuleTest):
         self.assertEqual(outputScalarRange[1], inputScalarRange[1])
 
         self.delayDisplay('Test passed')
+
+    def test_MRunnerFakeDocker(self):
+        """ Run a synthetic model end to end on the fake docker cli (Testing/Python/FakeDocker.py),
+        no docker, gpu or network is needed. See Testing/Python/MRunnerBenchmark.py for timings.
+        """
+        if os.name == 'nt':
+            self.delayDisplay("Fake docker test skipped (posix only)")
+            return
+
+        self.delayDisplay("Starting the fake docker test")
+
+        import tempfile
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Testing', 'Python'))
+        import MRunnerBenchmark
+
+        binDir = tempfile.mkdtemp()
+        try:
+            model = MRunnerBenchmark.createBenchmarkModel(4, "files")
+            logic = MRunnerLogic()
+            logic.useResultCache = False
+            logic.dockerBackend = MRunnerBenchmark.createFakeDockerBackend(binDir, model)
+
+            inputVolume = MRunnerBenchmark.createInputVolume([32, 32, 16])
+            outputSegmentation = MRunnerBenchmark.createSegmentation()
+            logic.process(model, inputVolume, outputSegmentation, None, downloadDockerfile=False)
+
+            self.assertEqual(outputSegmentation.GetSegmentation().GetNumberOfSegments(), 4)
+            self.assertEqual(logic.lastTelemetry.state, "done")
+        finally:
+            shutil.rmtree(binDir, ignore_errors=True)
+
+        self.delayDisplay('Test passed')
+
+    def test_MRunnerPrefetchSelection(self):
+        """ Select a model while the image of that model is prefetched: the apply button schedules a re-check of the
+        prefetch and the parameter node is not left in modify state.
+        """
+        import threading
+
+        widget = slicer.modules.mrunner.widgetRepresentation().self()
+        comboBox = widget.ui.modelComboBox
+        if comboBox.count == 0:
+            self.delayDisplay("Prefetch selection test skipped (no models)")
+            return
+
+        self.delayDisplay("Starting the prefetch selection test")
+
+        # a prefetch that runs until the test is done (for the gpu and the cpu image)
+        model = comboBox.itemData(0)
+        release = threading.Event()
+        prefetcher = widget.logic.getImagePrefetcher()
+        tasks = [prefetcher.request(model.getDockerfile().getImageRef(useGPU=useGPU), lambda: release.wait(30)) for useGPU in (False, True)]
+        try:
+            comboBox.setCurrentIndex(0)
+            widget.updateParameterNodeFromGUI()
+
+            self.assertFalse(widget._parameterNode.GetDisableModifiedEvent())
+            self.assertTrue(widget._prefetchCheckPending)
+        finally:
+            release.set()
+            for task in tasks:
+                task.wait(30)
+
+        self.delayDisplay('Test passed')
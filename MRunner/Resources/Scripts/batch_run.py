@@ -0,0 +1,98 @@
+"""
+-------------------------------------------------
+MRunner - Batch driver (runs inside the container)
+-------------------------------------------------
+
+Runs the slicer entrypoint of a mhub model for every
+case directory of a staged batch within a single
+container and a single python interpreter, so that
+imported frameworks stay loaded between cases.
+
+The mhub entrypoint reads from /app/data/input_data
+and writes to /app/data/output_data. Both are re-linked
+to the case directory before each run. The result of
+each case is written to <case>/.mrunner_status.
+
+Limitations: the image must allow replacing
+/app/data/input_data and /app/data/output_data
+(/app/data must be writable by the container user).
+mhub entrypoints process a single input, so the
+entrypoint runs once per case and the model weights
+are loaded again for every case; only the container
+start and the framework imports are shared.
+
+usage: python3 batch_run.py <entrypoint.py> <batch_dir>
+-------------------------------------------------
+"""
+
+import os, sys, json, runpy, shutil, time, traceback
+
+INPUT_DIR = "/app/data/input_data"
+OUTPUT_DIR = "/app/data/output_data"
+STATUS_FILE = ".mrunner_status"
+
+
+def relink(link: str, target: str) -> None:
+    if os.path.islink(link) or os.path.isfile(link):
+        os.unlink(link)
+    elif os.path.isdir(link):
+        shutil.rmtree(link)
+    os.symlink(target, link)
+
+
+def runEntrypoint(entrypoint: str, caseDir: str) -> None:
+    """Run the entrypoint script for a single case directory in the current interpreter.
+       The script is executed again for every case: imported modules stay loaded, the model weights are loaded again."""
+    relink(INPUT_DIR, caseDir)
+    relink(OUTPUT_DIR, caseDir)
+
+    cwd, argv = os.getcwd(), sys.argv
+    try:
+        sys.argv = [entrypoint]
+        runpy.run_path(entrypoint, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"Entrypoint exited with code {e.code}.")
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+
+
+def writeStatus(caseDir: str, ok: bool, duration: float, error: str = "") -> None:
+    with open(os.path.join(caseDir, STATUS_FILE), "w") as f:
+        json.dump({"ok": ok, "duration": duration, "error": error}, f)
+
+
+def main() -> int:
+    entrypoint, batchDir = sys.argv[1], sys.argv[2]
+    cases = sorted(d for d in os.listdir(batchDir) if os.path.isdir(os.path.join(batchDir, d)))
+
+    # the data directories are replaced by links to each case
+    dataDir = os.path.dirname(INPUT_DIR)
+    if not os.access(dataDir, os.W_OK):
+        error = f"{dataDir} is not writable in this image, batch mode is not supported."
+        print(f"[batch] {error}", flush=True)
+        for case in cases:
+            writeStatus(os.path.join(batchDir, case), False, 0.0, error)
+        return 1
+
+    failed = 0
+    for i, case in enumerate(cases):
+        caseDir = os.path.join(batchDir, case)
+        print(f"[batch] case {i+1}/{len(cases)}: {case}", flush=True)
+
+        start = time.time()
+        try:
+            runEntrypoint(entrypoint, caseDir)
+            writeStatus(caseDir, True, time.time() - start)
+        except Exception as e:
+            failed += 1
+            traceback.print_exc()
+            writeStatus(caseDir, False, time.time() - start, str(e))
+
+    print(f"[batch] done, {len(cases) - failed}/{len(cases)} cases succeeded.", flush=True)
+    return 0 if failed < len(cases) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
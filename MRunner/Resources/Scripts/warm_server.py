@@ -0,0 +1,129 @@
+"""
+-------------------------------------------------
+MRunner - Warm model server (runs inside the container)
+-------------------------------------------------
+
+Long-lived server that keeps the python interpreter
+(and all frameworks imported by the model) alive and
+runs the slicer entrypoint of a mhub model for every
+job submitted through the mounted server directory.
+The entrypoint script itself is executed for every
+job (see batch_run.runEntrypoint): mhub entrypoints
+offer no way to keep a loaded model, so the weights
+are still loaded per job. Saved are the container
+start and the framework imports.
+
+Protocol (all paths relative to the server directory):
+  heartbeat                 written by the server on every poll (unix time)
+  jobs/<id>/                job directory, staged by the client (input files)
+  jobs/<id>/request.json    written last by the client, marks the job as ready
+  jobs/<id>/log.txt         output of the job
+  jobs/<id>/response.json   written by the server when the job is done
+                            {"ok": bool, "duration": float, "error": str}
+  jobs/<id>/cancel          written by the client to cancel a job: a pending
+                            job is skipped, the directory of a cancelled job
+                            is removed by the server once it is done
+  shutdown                  written by the client to stop the server
+
+usage: python3 warm_server.py <entrypoint.py> <server_dir> [--idle-timeout S]
+-------------------------------------------------
+"""
+
+from typing import Callable, Optional
+import os, sys, json, time, shutil, argparse, contextlib, traceback
+
+REQUEST_FILE = "request.json"
+RESPONSE_FILE = "response.json"
+LOG_FILE = "log.txt"
+HEARTBEAT_FILE = "heartbeat"
+SHUTDOWN_FILE = "shutdown"
+CANCEL_FILE = "cancel"
+
+
+def writeAtomic(path: str, text: str) -> None:
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def pendingJobs(jobsDir: str):
+    """Job directories with a request but without a response, oldest request first."""
+    jobs = []
+    for name in os.listdir(jobsDir):
+        jobDir = os.path.join(jobsDir, name)
+        requestFile = os.path.join(jobDir, REQUEST_FILE)
+        if name.startswith(".") or not os.path.isfile(requestFile) or os.path.isfile(os.path.join(jobDir, RESPONSE_FILE)):
+            continue
+        jobs.append((os.path.getmtime(requestFile), jobDir))
+    return [jobDir for _, jobDir in sorted(jobs)]
+
+
+def serve(serverDir: str, handler: Callable[[str, dict], None], idleTimeout: Optional[float] = None, pollInterval: float = 0.25) -> None:
+    """Serve jobs until the shutdown file appears or the server was idle for idleTimeout seconds."""
+    jobsDir = os.path.join(serverDir, "jobs")
+    os.makedirs(jobsDir, exist_ok=True)
+
+    lastActive = time.time()
+    print(f"[warm] serving {serverDir}", flush=True)
+
+    while True:
+        writeAtomic(os.path.join(serverDir, HEARTBEAT_FILE), str(time.time()))
+
+        shutdownFile = os.path.join(serverDir, SHUTDOWN_FILE)
+        if os.path.isfile(shutdownFile):
+            os.remove(shutdownFile)
+            print("[warm] shutdown requested", flush=True)
+            return
+
+        if idleTimeout is not None and time.time() - lastActive > idleTimeout:
+            print("[warm] idle timeout", flush=True)
+            return
+
+        for jobDir in pendingJobs(jobsDir):
+            if os.path.isfile(os.path.join(jobDir, CANCEL_FILE)):
+                print(f"[warm] job {os.path.basename(jobDir)} cancelled", flush=True)
+                shutil.rmtree(jobDir, ignore_errors=True)
+                continue
+
+            with open(os.path.join(jobDir, REQUEST_FILE), "r") as f:
+                request = json.load(f)
+
+            print(f"[warm] job {os.path.basename(jobDir)}", flush=True)
+            start = time.time()
+            ok, error = True, ""
+            with open(os.path.join(jobDir, LOG_FILE), "w", buffering=1) as log:
+                with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    try:
+                        handler(jobDir, request)
+                    except Exception as e:
+                        ok, error = False, str(e)
+                        traceback.print_exc()
+
+            # a job cancelled while it was running is not collected by the client
+            if os.path.isfile(os.path.join(jobDir, CANCEL_FILE)):
+                shutil.rmtree(jobDir, ignore_errors=True)
+            else:
+                writeAtomic(os.path.join(jobDir, RESPONSE_FILE), json.dumps({"ok": ok, "duration": time.time() - start, "error": error}))
+            lastActive = time.time()
+            writeAtomic(os.path.join(serverDir, HEARTBEAT_FILE), str(lastActive))
+
+        time.sleep(pollInterval)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MRunner warm model server")
+    parser.add_argument("entrypoint")
+    parser.add_argument("server_dir")
+    parser.add_argument("--idle-timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    # the entrypoint runner is shared with the batch driver
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from batch_run import runEntrypoint
+
+    serve(args.server_dir, lambda jobDir, request: runEntrypoint(args.entrypoint, jobDir), idleTimeout=args.idle_timeout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
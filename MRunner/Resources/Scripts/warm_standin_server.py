@@ -0,0 +1,45 @@
+"""
+-------------------------------------------------
+MRunner - Warm server stand-in (runs locally)
+-------------------------------------------------
+
+Implements the warm server protocol (see warm_server.py)
+without docker or a real model: every expected output
+file listed in the request is written as a copy of the
+staged input image after an optional delay.
+
+usage: python3 warm_standin_server.py <server_dir> [--delay S] [--idle-timeout S] [--fail]
+-------------------------------------------------
+"""
+
+import os, sys, time, shutil, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from warm_server import serve
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MRunner warm server stand-in")
+    parser.add_argument("server_dir")
+    parser.add_argument("--delay", type=float, default=0.0, help="simulated inference time per job (s)")
+    parser.add_argument("--idle-timeout", type=float, default=None)
+    parser.add_argument("--fail", action="store_true", help="fail every job")
+    args = parser.parse_args()
+
+    def handler(jobDir: str, request: dict) -> None:
+        print(f"stand-in: processing {os.path.basename(jobDir)}")
+        time.sleep(args.delay)
+        if args.fail:
+            raise RuntimeError("stand-in configured to fail")
+
+        inputFile = os.path.join(jobDir, "image.nrrd")
+        for fileName in request.get("outputs", []):
+            shutil.copyfile(inputFile, os.path.join(jobDir, fileName))
+            print(f"stand-in: wrote {fileName}")
+
+    serve(args.server_dir, handler, idleTimeout=args.idle_timeout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
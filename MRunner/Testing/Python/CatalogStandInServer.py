@@ -0,0 +1,80 @@
+"""
+-------------------------------------------------
+MRunner - Catalog stand-in server
+-------------------------------------------------
+
+Local HTTP server that serves a repo.json like a remote
+catalog, including ETag / Last-Modified validators and
+304 responses to conditional requests. The file is read
+on every request, edit it to publish a new catalog.
+
+usage: python3 CatalogStandInServer.py <repo.json> [--port 8765] [--host 127.0.0.1]
+       then add http://127.0.0.1:8765/repo.json as catalog source
+-------------------------------------------------
+"""
+
+import os, sys, hashlib, argparse
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def createHandler(catalogFile: str):
+
+    class CatalogHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            try:
+                with open(catalogFile, "rb") as f:
+                    body = f.read()
+            except OSError:
+                self.send_error(404)
+                return
+
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            mtime = int(os.path.getmtime(catalogFile))
+            lastModified = formatdate(mtime, usegmt=True)
+
+            # conditional request (If-None-Match takes precedence)
+            ifNoneMatch = self.headers.get("If-None-Match")
+            ifModifiedSince = self.headers.get("If-Modified-Since")
+            notModified = False
+            if ifNoneMatch is not None:
+                notModified = etag in [tag.strip() for tag in ifNoneMatch.split(",")]
+            elif ifModifiedSince is not None:
+                try:
+                    notModified = mtime <= parsedate_to_datetime(ifModifiedSince).timestamp()
+                except (TypeError, ValueError):
+                    pass
+
+            self.send_response(304 if notModified else 200)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", lastModified)
+            if notModified:
+                self.end_headers()
+                return
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return CatalogHandler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MRunner catalog stand-in server")
+    parser.add_argument("catalog_file")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), createHandler(os.path.abspath(args.catalog_file)))
+    print(f"serving {args.catalog_file} on http://{args.host}:{server.server_port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
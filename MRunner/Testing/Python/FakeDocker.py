@@ -0,0 +1,269 @@
+"""
+-------------------------------------------------
+MRunner - Fake Docker CLI
+-------------------------------------------------
+
+Stand-in for the docker executable, to run models with
+the cli backend (Utils/Docker.py) without docker, gpu or
+real containers. "docker run" writes synthetic label
+files (nrrd, nii or nii.gz) into the mounted output
+directory, on the geometry of the exported input volume.
+The outputs, their label count and the image size are
+read from the JSON spec file in MRUNNER_FAKE_DOCKER:
+
+  {"images": ["mhubai/benchmark:nocuda"],
+   "outputs": [{"file": "liver.nii.gz", "labels": 2},
+               {"file": "a.nii.gz", "labels": 1, "slab": [0, 3]}],
+   "size": [128, 128, 64],     (optional, default: input size)
+   "delay": 0.0,               (optional, inference time in s)
+   "progress": 0}              (optional, tqdm style progress
+                                updates printed during the run)
+
+Labels fill slabs along the last axis, "slab": [i, n]
+restricts a file to the i-th of n slabs (non-overlapping
+single label files).
+
+usage: FakeDocker.py <docker arguments>
+       (see MRunnerBenchmark.py, createExecutable)
+-------------------------------------------------
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import os, sys, json, gzip, time, struct
+
+SPEC_VARIABLE = "MRUNNER_FAKE_DOCKER"
+
+Geometry = Tuple[List[int], List[List[float]], List[float]]  # sizes, space directions (lps, columns), space origin (lps)
+
+
+def loadSpec() -> dict:
+    path = os.environ.get(SPEC_VARIABLE)
+    if not path:
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def createExecutable(dir: str, specFile: Optional[str] = None, python: Optional[str] = None) -> str:
+    """Write a `docker` launcher script for this module into dir (posix only). Returns its path."""
+    path = os.path.join(dir, "docker")
+    lines = ["#!/bin/sh"]
+    if specFile is not None:
+        lines.append(f'export {SPEC_VARIABLE}="{specFile}"')
+    lines.append(f'exec "{python or sys.executable}" "{os.path.abspath(__file__)}" "$@"')
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(path, 0o755)
+    return path
+
+
+#
+# synthetic label files
+#
+
+def readNrrdGeometry(path: str) -> Geometry:
+    """Sizes, space directions and space origin (lps) of a 3d nrrd file (header only)."""
+    fields = {}
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            if ":" in line and not line.startswith("#"):
+                key, value = line.split(":", 1)
+                fields[key.strip()] = value.strip().lstrip("=").strip()
+
+    def vector(text: str) -> List[float]:
+        return [float(v) for v in text.strip("()").split(",")]
+
+    sizes = [int(v) for v in fields["sizes"].split()][-3:]
+    directions = [vector(v) for v in fields.get("space directions", "(1,0,0) (0,1,0) (0,0,1)").split() if v != "none"]
+    origin = vector(fields["space origin"]) if "space origin" in fields else [0.0, 0.0, 0.0]
+    return sizes, directions, origin
+
+
+def getLabelSlices(sizes: Sequence[int], labels: int, slab: Optional[Sequence[int]] = None):
+    """Yields the voxel bytes of each slice (last axis): label i fills the i-th part of the (selected) slab."""
+    nx, ny, nz = sizes
+    first, count = (slab[0], slab[1]) if slab else (0, 1)
+    z0, z1 = nz * first // count, nz * (first + 1) // count
+    empty = bytes(nx * ny)
+    for z in range(nz):
+        if z0 <= z < z1:
+            value = 1 + (z - z0) * labels // max(1, z1 - z0)
+            yield bytes([value]) * (nx * ny)
+        else:
+            yield empty
+
+
+def writeNrrd(path: str, geometry: Geometry, labels: int, slab: Optional[Sequence[int]] = None) -> None:
+    sizes, directions, origin = geometry
+    header = [
+        "NRRD0004",
+        "type: uchar",
+        "dimension: 3",
+        "space: left-posterior-superior",
+        f"sizes: {' '.join(str(s) for s in sizes)}",
+        "space directions: " + " ".join("(" + ",".join(f"{v:.17g}" for v in d) + ")" for d in directions),
+        "kinds: domain domain domain",
+        "endian: little",
+        "encoding: raw",
+        "space origin: (" + ",".join(f"{v:.17g}" for v in origin) + ")",
+    ]
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n\n").encode("ascii"))
+        for data in getLabelSlices(sizes, labels, slab):
+            f.write(data)
+
+
+def writeNifti(path: str, geometry: Geometry, labels: int, slab: Optional[Sequence[int]] = None) -> None:
+    """NIfTI-1 (uint8) with the sform set to the ras geometry, gzipped if the path ends with .gz."""
+    sizes, directions, origin = geometry
+
+    # lps -> ras
+    affine = [[(-1.0 if r < 2 else 1.0) * directions[c][r] for c in range(3)] + [(-1.0 if r < 2 else 1.0) * origin[r]] for r in range(3)]
+    spacing = [sum(v * v for v in d) ** 0.5 for d in directions]
+
+    header = bytearray(348)
+    struct.pack_into("<i", header, 0, 348)
+    struct.pack_into("<8h", header, 40, 3, sizes[0], sizes[1], sizes[2], 1, 1, 1, 1)  # dim
+    struct.pack_into("<hh", header, 70, 2, 8)                                      # datatype uint8, bitpix
+    struct.pack_into("<8f", header, 76, 1.0, *spacing, 0.0, 0.0, 0.0, 0.0)         # pixdim (qfac 1)
+    struct.pack_into("<f", header, 108, 352.0)                                     # vox_offset
+    struct.pack_into("<f", header, 112, 1.0)                                       # scl_slope
+    header[123] = 10                                                               # xyzt_units: mm, s
+    struct.pack_into("<hh", header, 252, 0, 2)                                     # qform_code, sform_code (aligned)
+    struct.pack_into("<12f", header, 280, *affine[0], *affine[1], *affine[2])      # srow_x, srow_y, srow_z
+    header[344:348] = b"n+1\0"
+
+    with (gzip.open(path, "wb", compresslevel=1) if path.lower().endswith(".gz") else open(path, "wb")) as f:
+        f.write(bytes(header) + bytes(4))
+        for data in getLabelSlices(sizes, labels, slab):
+            f.write(data)
+
+
+def writeLabelFile(path: str, geometry: Geometry, labels: int = 1, slab: Optional[Sequence[int]] = None) -> None:
+    """Write a synthetic label file (format by extension: .nrrd, .nii or .nii.gz)."""
+    assert 1 <= labels <= 255, f"Invalid label count {labels} (uint8 label files)."
+    if path.lower().endswith(".nrrd"):
+        writeNrrd(path, geometry, labels, slab)
+    else:
+        writeNifti(path, geometry, labels, slab)
+
+
+def getGeometry(sizes: Sequence[int], spacing: float = 1.0) -> Geometry:
+    return list(sizes), [[spacing, 0.0, 0.0], [0.0, spacing, 0.0], [0.0, 0.0, spacing]], [0.0, 0.0, 0.0]
+
+
+def getVolumeGeometry(volumeNode) -> Geometry:
+    """Geometry of a Slicer volume node (ras -> lps)."""
+    import vtk
+    matrix = vtk.vtkMatrix4x4()
+    volumeNode.GetIJKToRASMatrix(matrix)
+    flip = [-1.0, -1.0, 1.0]
+    directions = [[flip[r] * matrix.GetElement(r, c) for r in range(3)] for c in range(3)]
+    origin = [flip[r] * matrix.GetElement(r, 3) for r in range(3)]
+    return list(volumeNode.GetImageData().GetDimensions()), directions, origin
+
+
+def getModelOutputs(model) -> List[dict]:
+    """Output spec entries of a repository model (see Utils/Repo.py), single label files get their own slab."""
+    outputFiles = model.getOutputFiles()
+    single = [of for of in outputFiles if len(of.getLabels()) == 1]
+    outputs = []
+    for of in outputFiles:
+        labels = len(of.getLabels())
+        output = {"file": of.getFileName(), "labels": labels}
+        if labels == 1:
+            output["slab"] = [single.index(of), len(single)]
+        outputs.append(output)
+    return outputs
+
+
+def writeOutputs(dir: str, outputs: List[dict], geometry: Geometry) -> List[str]:
+    paths = []
+    for output in outputs:
+        path = os.path.join(dir, output["file"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writeLabelFile(path, geometry, output.get("labels", 1), output.get("slab"))
+        paths.append(path)
+    return paths
+
+
+#
+# docker commands
+#
+
+def parseRunArguments(args: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """Bind mounts (container path -> host path) and the remaining arguments (image ref, command) of docker run."""
+    binds, rest = {}, []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("--volume", "-v"):
+            hostPath, containerPath = args[i + 1].split(":")[:2]
+            binds[containerPath] = hostPath
+            i += 2
+        elif arg in ("--name", "--gpus", "--cpus", "--memory", "--shm-size", "--ipc"):
+            i += 2
+        elif arg.startswith("-") and not rest:
+            i += 1
+        else:
+            rest.append(arg)
+            i += 1
+    return binds, rest
+
+
+def run(args: List[str], spec: dict) -> int:
+    binds, rest = parseRunArguments(args)
+    outputDir = binds.get("/app/data/output_data")
+    inputDir = binds.get("/app/data/input_data")
+    if outputDir is None:
+        print("fake docker: no output directory mounted (batch runs are not supported)")
+        return 1
+
+    inputFile = os.path.join(inputDir, "image.nrrd") if inputDir else None
+    geometry = readNrrdGeometry(inputFile) if inputFile and os.path.isfile(inputFile) else getGeometry([64, 64, 64])
+    if spec.get("size"):
+        geometry = getGeometry(spec["size"])
+
+    print(f"fake docker: running {' '.join(rest)}", flush=True)
+    steps = int(spec.get("progress", 0))
+    for step in range(steps):
+        # carriage return updates of a progress bar (written unbuffered, like tqdm on a pipe)
+        sys.stdout.write(f"\rinference: {100 * (step + 1) // steps:3d}%|{'#' * (10 * (step + 1) // steps):<10}| {step + 1}/{steps}")
+        sys.stdout.flush()
+        time.sleep(float(spec.get("delay", 0.0)) / steps)
+    if steps:
+        sys.stdout.write("\n")
+    else:
+        time.sleep(float(spec.get("delay", 0.0)))
+    for path in writeOutputs(outputDir, spec.get("outputs", []), geometry):
+        print(f"fake docker: wrote {os.path.basename(path)} ({os.path.getsize(path)} bytes)", flush=True)
+    return 0
+
+
+def main(args: List[str]) -> int:
+    spec = loadSpec()
+    command = args[0] if args else ""
+
+    if command == "info":
+        print(json.dumps({"ServerVersion": "fake", "OperatingSystem": "fake", "NCPU": os.cpu_count(), "MemTotal": 0}))
+    elif command == "images":
+        for ref in spec.get("images", []):
+            print(f"{ref}\tsha256:{'0' * 64}\t1GB")
+    elif command in ("pull", "build"):
+        for i in range(3):
+            print(f"{'0123456789ab'}: Pull complete" if command == "pull" else f"Step {i + 1}/3 : RUN true", flush=True)
+    elif command == "run":
+        return run(args[1:], spec)
+    elif command in ("kill", "rm", "rmi"):
+        pass
+    else:
+        print(f"fake docker: unsupported command {command}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,377 @@
+"""
+-------------------------------------------------
+MRunner - Fake Docker Engine
+-------------------------------------------------
+
+Docker Engine API stand-in on a unix socket, to test the
+engine backend (Utils/Docker.py) without docker. Supports
+ping, info, image list / pull / build / remove and running
+containers (the "container" prints its command and the
+bind mounts, then exits with the code given by --exit-code).
+Streams are sent chunked like the real engine.
+
+usage: python3 FakeDockerEngine.py [--socket /tmp/fake-docker.sock] [--exit-code 0]
+       then start Slicer with DOCKER_HOST=unix:///tmp/fake-docker.sock
+       python3 FakeDockerEngine.py --self-test
+-------------------------------------------------
+"""
+
+import os, sys, io, json, time, struct, tarfile, argparse, tempfile, threading, socketserver, urllib.parse
+from http.server import BaseHTTPRequestHandler
+
+
+class FakeEngineState:
+
+    def __init__(self, exitCode: int = 0, stepDelay: float = 0.01) -> None:
+        self.exitCode = exitCode
+        self.stepDelay = stepDelay
+        self.images = {"mhubai/base:latest": {"Id": "sha256:" + "0" * 64, "Size": 123456789}}
+        self.containers = {}
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+def createHandler(state: FakeEngineState):
+
+    class FakeEngineHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def address_string(self):
+            return "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        # responses
+
+        def sendJSON(self, data, status=200):
+            body = json.dumps(data).encode("utf-8") if data is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def sendError(self, status, message):
+            self.sendJSON({"message": message}, status)
+
+        def startStream(self, contentType="application/json"):
+            self.send_response(200)
+            self.send_header("Content-Type", contentType)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def sendChunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def endStream(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def sendMessage(self, message):
+            self.sendChunk(json.dumps(message).encode("utf-8") + b"\r\n")
+            time.sleep(state.stepDelay)
+
+        def sendFrame(self, streamType, text):
+            data = text.encode("utf-8")
+            self.sendChunk(struct.pack(">BxxxI", streamType, len(data)) + data)
+            time.sleep(state.stepDelay)
+
+        # routing
+
+        def route(self, method):
+            url = urllib.parse.urlparse(self.path)
+            params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+            parts = url.path.strip("/").split("/")
+            if parts and parts[0].startswith("v1."):
+                parts = parts[1:]
+            path = "/" + "/".join(urllib.parse.unquote(part) for part in parts)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            with state.lock:
+                state.requests.append((method, path))
+            handler = getattr(self, "handle_" + method + "_" + (parts[0] if parts else ""), None)
+            if handler is None:
+                self.sendError(404, f"page not found: {method} {path}")
+                return
+            handler(path, params, body)
+
+        def do_GET(self):
+            self.route("GET")
+
+        def do_POST(self):
+            self.route("POST")
+
+        def do_DELETE(self):
+            self.route("DELETE")
+
+        # system
+
+        def handle_GET__ping(self, path, params, body):
+            body = b"OK"
+            self.send_response(200)
+            self.send_header("API-Version", "1.43")
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle_GET_info(self, path, params, body):
+            self.sendJSON({"ServerVersion": "fake", "Images": len(state.images), "Containers": len(state.containers)})
+
+        def handle_GET_version(self, path, params, body):
+            self.sendJSON({"Version": "fake", "ApiVersion": "1.43"})
+
+        # images
+
+        def handle_GET_images(self, path, params, body):
+            self.sendJSON([{"Id": image["Id"], "RepoTags": [ref], "Size": image["Size"]} for ref, image in state.images.items()])
+
+        def handle_DELETE_images(self, path, params, body):
+            ref = path[len("/images/"):]
+            if ref not in state.images:
+                self.sendError(404, f"No such image: {ref}")
+                return
+            image = state.images.pop(ref)
+            self.sendJSON([{"Untagged": ref}, {"Deleted": image["Id"]}])
+
+        def handle_POST_images(self, path, params, body):
+            ref = f"{params.get('fromImage')}:{params.get('tag', 'latest')}"
+            if "missing" in ref:
+                self.sendError(404, f"pull access denied for {params.get('fromImage')}")
+                return
+            self.startStream()
+            self.sendMessage({"status": f"Pulling from {params.get('fromImage')}", "id": params.get("tag", "latest")})
+            for layer in ("a1b2c3", "d4e5f6"):
+                self.sendMessage({"status": "Pulling fs layer", "progressDetail": {}, "id": layer})
+                for current in (0, 50, 100):
+                    self.sendMessage({"status": "Downloading", "progressDetail": {"current": current * 1000, "total": 100000}, "id": layer})
+                self.sendMessage({"status": "Pull complete", "progressDetail": {}, "id": layer})
+            state.images[ref] = {"Id": "sha256:" + os.urandom(32).hex(), "Size": 200000}
+            self.sendMessage({"status": f"Status: Downloaded newer image for {ref}"})
+            self.endStream()
+
+        def handle_POST_build(self, path, params, body):
+            try:
+                with tarfile.open(fileobj=io.BytesIO(body), mode="r") as tar:
+                    dockerfile = tar.extractfile("Dockerfile").read().decode("utf-8")
+            except (tarfile.TarError, KeyError, AttributeError):
+                self.sendError(400, "Cannot locate specified Dockerfile: Dockerfile")
+                return
+            self.startStream()
+            steps = [line for line in dockerfile.splitlines() if line.strip() and not line.startswith("#")]
+            for index, step in enumerate(steps):
+                self.sendMessage({"stream": f"Step {index + 1}/{len(steps)} : {step}\n"})
+                if "FAIL" in step:
+                    self.sendMessage({"errorDetail": {"message": "The command returned a non-zero code: 1"}, "error": "The command returned a non-zero code: 1"})
+                    self.endStream()
+                    return
+                self.sendMessage({"stream": " ---> Running\n"})
+            state.images[params["t"]] = {"Id": "sha256:" + os.urandom(32).hex(), "Size": 300000}
+            self.sendMessage({"aux": {"ID": state.images[params["t"]]["Id"]}})
+            self.sendMessage({"stream": f"Successfully tagged {params['t']}\n"})
+            self.endStream()
+
+        # containers
+
+        def findContainer(self, nameOrId):
+            for id, container in state.containers.items():
+                if nameOrId in (id, container["Name"]):
+                    return id, container
+            return None, None
+
+        def handle_POST_containers(self, path, params, body):
+            parts = path.strip("/").split("/")
+            if parts[1] == "create":
+                data = json.loads(body.decode("utf-8"))
+                if data["Image"] not in state.images:
+                    self.sendError(404, f"No such image: {data['Image']}")
+                    return
+                id = os.urandom(32).hex()
+                state.containers[id] = {"Name": params.get("name") or id[:12], "Config": data, "State": "created", "killed": threading.Event()}
+                self.sendJSON({"Id": id, "Warnings": []}, 201)
+                return
+
+            id, container = self.findContainer(parts[1])
+            if container is None:
+                self.sendError(404, f"No such container: {parts[1]}")
+                return
+            action = parts[2]
+            if action == "start":
+                container["State"] = "running"
+                container["startedAt"] = time.time()
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif action == "kill":
+                if container["State"] != "running":
+                    self.sendError(409, f"Container {parts[1]} is not running")
+                    return
+                container["killed"].set()
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif action == "wait":
+                container["killed"].wait(timeout=container.get("runTime", 0))
+                self.sendJSON({"StatusCode": 137 if container["killed"].is_set() else state.exitCode})
+            else:
+                self.sendError(404, f"page not found: {path}")
+
+        def handle_GET_containers(self, path, params, body):
+            parts = path.strip("/").split("/")
+            id, container = self.findContainer(parts[1])
+            if container is None or parts[2] != "logs":
+                self.sendError(404, f"No such container: {parts[1]}")
+                return
+            config = container["Config"]
+            self.startStream("application/vnd.docker.multiplexed-stream")
+            self.sendFrame(1, "container started: " + " ".join(config["Cmd"]) + "\n")
+            for bind in config["HostConfig"].get("Binds", []):
+                self.sendFrame(1, f"volume {bind}\n")
+            if config["HostConfig"].get("DeviceRequests"):
+                self.sendFrame(2, "gpu requested\n")
+            for key in ("NanoCpus", "Memory", "ShmSize", "IpcMode"):
+                if key in config["HostConfig"]:
+                    self.sendFrame(1, f"{key} {config['HostConfig'][key]}\n")
+            # a running "model" that can be killed
+            for step in range(int(params.get("steps", 3))):
+                if container["killed"].wait(timeout=state.stepDelay):
+                    break
+                self.sendFrame(1, f"progress {step + 1}")
+                self.sendFrame(1, "\n")
+            container["State"] = "exited"
+            self.endStream()
+
+        def handle_DELETE_containers(self, path, params, body):
+            id, container = self.findContainer(path.strip("/").split("/")[1])
+            if container is None:
+                self.sendError(404, "No such container")
+                return
+            del state.containers[id]
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    return FakeEngineHandler
+
+
+class FakeDockerEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socketPath: str, state: FakeEngineState) -> None:
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+        self.state = state
+        super().__init__(socketPath, createHandler(state))
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="FakeDockerEngine", daemon=True)
+        thread.start()
+        return thread
+
+
+def selfTest() -> int:
+    """Run the engine backend against the fake engine."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from Utils.Docker import DockerEngineClient, DockerEngineBackend, DockerError, ContainerResources, formatEvent
+
+    tmpDir = tempfile.mkdtemp()
+    socketPath = os.path.join(tmpDir, "docker.sock")
+    state = FakeEngineState()
+    server = FakeDockerEngine(socketPath, state)
+    server.start()
+
+    client = DockerEngineClient(socketPath)
+    backend = DockerEngineBackend(client)
+    assert client.ping() and client.apiVersion == "1.41"
+    assert backend.info()["ServerVersion"] == "fake"
+
+    op = backend.pullImage("mhubai/test:nocuda")
+    lines = [formatEvent(event) for event in op]
+    op.wait()
+    assert op.returncode == 0 and "a1b2c3: Pull complete" in lines, lines
+    assert "mhubai/test:nocuda" in backend.listImages()
+
+    try:
+        backend.pullImage("mhubai/missing:nocuda")
+        raise AssertionError("pull of a missing image must fail")
+    except DockerError as e:
+        assert e.returncode == 404
+
+    with open(os.path.join(tmpDir, "Dockerfile"), "w") as f:
+        f.write("FROM mhubai/base\nRUN echo ok\n")
+    op = backend.buildImage("mhubai/built:nocuda", tmpDir, buildArgs={"USER_ID": "1001"}, platform="linux/amd64")
+    assert op.wait() == 0 and "mhubai/built:nocuda" in backend.listImages()
+
+    with open(os.path.join(tmpDir, "Dockerfile"), "w") as f:
+        f.write("FROM mhubai/base\nRUN FAIL\n")
+    op = backend.buildImage("mhubai/broken:nocuda", tmpDir)
+    assert op.wait() == 1 and "non-zero" in op.error
+
+    op = backend.runContainer("mhubai/test:nocuda", ["python3", "run.py"], [f"{tmpDir}:/app/data/input_data"], name="mrunner-test", useGPU=True)
+    lines = [event["stream"] for event in op]
+    assert op.returncode == 0 and lines[0] == "container started: python3 run.py" and "gpu requested" in lines, lines
+    assert not state.containers, "container not removed"
+
+    # resource limits
+    resources = ContainerResources(cpus=2.5, memory=4 * 1024**3, shmSize=1024**3)
+    op = backend.runContainer("mhubai/test:nocuda", ["python3", "run.py"], [], name="mrunner-limits", resources=resources)
+    lines = [event["stream"] for event in op]
+    assert op.returncode == 0 and "NanoCpus 2500000000" in lines and f"Memory {4 * 1024**3}" in lines and f"ShmSize {1024**3}" in lines, lines
+
+    # cancel a running container
+    state.stepDelay = 0.2
+    op = backend.runContainer("mhubai/test:nocuda", ["python3", "run.py"], [], name="mrunner-cancel")
+    threading.Timer(0.3, op.kill).start()
+    start = time.time()
+    op.wait()
+    assert op.returncode == -9 and time.time() - start < 2 and not state.containers
+    state.stepDelay = 0.0
+
+    backend.killContainer("missing")
+    backend.removeContainer("missing")
+    assert backend.removeImage("mhubai/test:nocuda")[0] == "Untagged: mhubai/test:nocuda"
+
+    # all calls share the pooled connections
+    requests = len(state.requests)
+    for _ in range(20):
+        backend.listImages()
+    assert client.connectionsCreated <= 4, client.connectionsCreated
+
+    print(f"ok ({len(state.requests)} requests on {state.connections} connections, {requests} before the pooled loop)")
+    server.shutdown()
+    client.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MRunner fake docker engine")
+    parser.add_argument("--socket", default="/tmp/fake-docker.sock")
+    parser.add_argument("--exit-code", type=int, default=0, help="exit code of all containers")
+    parser.add_argument("--step-delay", type=float, default=0.05, help="delay between streamed messages (s)")
+    parser.add_argument("--self-test", action="store_true")
+    args = parser.parse_args()
+
+    if args.self_test:
+        return selfTest()
+
+    server = FakeDockerEngine(args.socket, FakeEngineState(args.exit_code, args.step_delay))
+    print(f"fake docker engine on unix://{args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+-------------------------------------------------
+MRunner - Benchmark Suite
+-------------------------------------------------
+
+Times the repository loading, the SegDB lookups, the
+import of model outputs (displaySegmentation) and full
+runs (process) across volume sizes and label counts.
+Runs use the fake docker cli (FakeDocker.py), no gpu,
+docker or real containers are needed. Results are
+written as a JSON report that can be compared between
+versions (--compare).
+
+usage: Slicer --no-main-window --python-script MRunnerBenchmark.py [--sizes 64,128,256x256x128] [--labels 1,8,32]
+                                                                   [--repeat 3] [--output report.json] [--compare baseline.json]
+       python3 MRunnerBenchmark.py --only repo,segdb   (without Slicer)
+       python3 MRunnerBenchmark.py --report report.json --compare baseline.json [--threshold 0.1]
+-------------------------------------------------
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import os, sys, json, time, shutil, platform, argparse, tempfile, statistics, subprocess
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_DIR = os.path.dirname(os.path.dirname(TESTING_DIR))
+sys.path.insert(0, TESTING_DIR)
+sys.path.insert(0, MODULE_DIR)
+
+import FakeDocker
+
+try:
+    import slicer
+    IN_SLICER = hasattr(slicer, "app")
+except ImportError:
+    IN_SLICER = False
+
+BENCHMARKS = ["repo", "segdb", "import", "process"]
+SLICER_BENCHMARKS = ["import", "process"]
+
+
+def measure(run: Callable[[], None], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """Wall times of repeat calls of run (setup is called before each run and not timed)."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times: Sequence[float]) -> dict:
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.mean(times), "max": max(times), "times": list(times)}
+
+
+def parseSize(text: str) -> List[int]:
+    """"128" (cube) or "512x512x300"."""
+    sizes = [int(v) for v in text.lower().split("x")]
+    return sizes * 3 if len(sizes) == 1 else sizes
+
+
+def getVersion() -> str:
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=MODULE_DIR, stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class BenchmarkReport:
+
+    def __init__(self, args: dict) -> None:
+        self.meta = {
+            "version": getVersion(),
+            "slicer": slicer.app.applicationVersion if IN_SLICER else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": args,
+        }
+        self.results: List[dict] = []
+
+    def add(self, name: str, params: dict, times: Sequence[float], **extra) -> dict:
+        result = {"name": name, "params": params, **summarize(times), **extra}
+        self.results.append(result)
+        print(f"{getResultKey(result):<60} median {result['median']:8.4f} s  (min {result['min']:.4f} s, {len(times)} runs)", flush=True)
+        return result
+
+    def toDict(self) -> dict:
+        return {"meta": self.meta, "results": self.results}
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.toDict(), f, indent=2)
+
+
+def getResultKey(result: dict) -> str:
+    params = ", ".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']} ({params})" if params else result["name"]
+
+
+#
+# benchmarks without slicer
+#
+
+def benchRepository(report: BenchmarkReport, repeat: int) -> None:
+    from Utils.Repo import Repository
+
+    repoFile = os.path.join(MODULE_DIR, "Resources", "Dockerfiles", "repo.json")
+    with open(repoFile, "r") as f:
+        data = json.load(f)
+
+    report.add("repo.load", {"validate": True}, measure(lambda: Repository(repoFile), repeat), models=len(data["models"]))
+    report.add("repo.load", {"validate": False}, measure(lambda: Repository(repoFile, validate=False), repeat))
+    report.add("repo.fromData", {}, measure(lambda: Repository.fromData(data), repeat))
+
+    repo = Repository(repoFile)
+    names = [model.getName() for model in repo.getModels()]
+    report.add("repo.getModelByName", {"lookups": 1000 * len(names)}, measure(lambda: [repo.getModelByName(name) for name in names for _ in range(1000)], repeat))
+
+
+def benchSegDB(report: BenchmarkReport, repeat: int) -> None:
+    from Utils import SegDB
+    from Utils.Repo import Repository
+
+    report.add("segdb.load", {}, measure(SegDB.DB, repeat))
+
+    # all segments of the database
+    ids = list(SegDB.getDB().segmentations)
+    def lookupAll():
+        for id in ids:
+            segment = SegDB.getSegment(id)
+            segment.getName(), segment.getColor(), segment.getCategory(), segment.getType(), segment.getModifier()
+    report.add("segdb.lookup", {"segments": len(ids)}, measure(lookupAll, repeat))
+
+    # the segments of all catalog models (as resolved during an import)
+    def resolveModels():
+        repo = Repository(os.path.join(MODULE_DIR, "Resources", "Dockerfiles", "repo.json"), validate=False)
+        for model in repo.getModels():
+            for of in model.getOutputFiles():
+                for ofl in of.getLabels():
+                    segment = ofl.getSegment()
+                    segment.getName(), segment.getColor()
+    report.add("segdb.resolveModels", {}, measure(resolveModels, repeat))
+
+
+#
+# benchmarks in slicer
+#
+
+def createBenchmarkModel(labels: int, layout: str):
+    """Repository model with labels segments, either one single label file per segment (files) or one multi label file (multilabel)."""
+    from Utils.Repo import Repository
+    from Utils.SegDB import getDB
+
+    ids = list(getDB().segmentations)[:labels]
+    assert len(ids) == labels, f"SegDB has only {len(ids)} segments."
+    if layout == "files":
+        output = [{"file": f"{id.lower()}.nii.gz", "labels": {"1": id}} for id in ids]
+    else:
+        output = [{"file": "segmentations.nii.gz", "labels": {str(i + 1): id for i, id in enumerate(ids)}}]
+
+    data = {"models": [{"name": "benchmark", "label": "Benchmark", "type": "segmentation", "dockerfile": {"pull": True}, "output": output}]}
+    return Repository.fromData(data).getModels()[0]
+
+
+def createInputVolume(sizes: Sequence[int]):
+    import numpy as np
+    voxels = np.random.default_rng(0).integers(-1000, 1000, size=tuple(reversed(sizes)), dtype=np.int16)
+    return slicer.util.addVolumeFromArray(voxels, name="BenchmarkInput")
+
+
+def createSegmentation():
+    segmentation = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode", "BenchmarkOutput")
+    segmentation.CreateDefaultDisplayNodes()
+    return segmentation
+
+
+def createFakeDockerBackend(dir: str, model, progress: int = 0):
+    """Docker cli backend running the fake docker (FakeDocker.py) with the outputs of model (posix only).
+       progress: number of progress bar updates the model prints."""
+    from Utils.Docker import DockerCLIBackend
+
+    specFile = os.path.join(dir, "spec.json")
+    with open(specFile, "w") as f:
+        json.dump({"images": [model.getDockerfile().getImageRef()], "outputs": FakeDocker.getModelOutputs(model), "progress": progress}, f)
+
+    executable = FakeDocker.createExecutable(dir, specFile=specFile, python=shutil.which("PythonSlicer") or sys.executable)
+    return DockerCLIBackend(executable, launch=slicer.util.launchConsoleProcess)
+
+
+def createLogic():
+    import MRunner
+    logic = MRunner.MRunnerLogic()
+    logic.useResultCache = False
+    logic.prefetchImages = False
+    logic.logCallback = lambda text, setStep=False, transient=False: None
+    return logic
+
+
+def benchImport(report: BenchmarkReport, sizes: List[List[int]], labelCounts: List[int], repeat: int) -> None:
+    logic = createLogic()
+    workDir = tempfile.mkdtemp(prefix="mrunner-benchmark-")
+    try:
+        for size in sizes:
+            for labels in labelCounts:
+                for layout in ("files", "multilabel"):
+                    model = createBenchmarkModel(labels, layout)
+                    outputDir = os.path.join(workDir, f"{'x'.join(map(str, size))}-{labels}-{layout}")
+                    os.makedirs(outputDir)
+                    FakeDocker.writeOutputs(outputDir, FakeDocker.getModelOutputs(model), FakeDocker.getGeometry(size))
+
+                    segmentations = []
+                    setup = lambda: segmentations.append(createSegmentation())
+                    times = measure(lambda: logic.displaySegmentation(segmentations[-1], outputDir, model), repeat, setup)
+                    segments = segmentations[-1].GetSegmentation().GetNumberOfSegments()
+                    assert segments == labels, f"{segments} segments imported, expected {labels}."
+
+                    for segmentation in segmentations:
+                        slicer.mrmlScene.RemoveNode(segmentation)
+                    shutil.rmtree(outputDir, ignore_errors=True)
+
+                    report.add("displaySegmentation", {"size": "x".join(map(str, size)), "labels": labels, "layout": layout}, times)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+
+def benchProcess(report: BenchmarkReport, sizes: List[List[int]], labelCounts: List[int], repeat: int, progress: int = 0) -> None:
+    binDir = tempfile.mkdtemp(prefix="mrunner-benchmark-bin-")
+    try:
+        for size in sizes:
+            for labels in labelCounts:
+                model = createBenchmarkModel(labels, "files")
+                logic = createLogic()
+                logic.dockerBackend = createFakeDockerBackend(binDir, model, progress)
+
+                # a new input volume per run (no reuse of the previous export)
+                nodes, stages = [], {}
+                def setup():
+                    nodes.append((createInputVolume(size), createSegmentation()))
+                def run():
+                    logic.process(model, nodes[-1][0], nodes[-1][1], None, downloadDockerfile=False)
+                    for name, span in logic.lastTelemetry.getRows():
+                        stages.setdefault(name.strip(), []).append(span.duration)
+                times = measure(run, repeat, setup)
+
+                for inputVolume, segmentation in nodes:
+                    slicer.mrmlScene.RemoveNode(inputVolume)
+                    slicer.mrmlScene.RemoveNode(segmentation)
+
+                report.add("process", {"size": "x".join(map(str, size)), "labels": labels, **({"progress": progress} if progress else {})}, times,
+                           stages={name: statistics.median(durations) for name, durations in stages.items()})
+    finally:
+        shutil.rmtree(binDir, ignore_errors=True)
+
+
+#
+# comparison
+#
+
+def compareReports(report: dict, baseline: dict, threshold: float = 0.1) -> int:
+    """Print the median change of every result found in both reports. Returns the number of regressions (slower than 1 + threshold)."""
+    baselineResults = {getResultKey(result): result for result in baseline["results"]}
+    print(f"\n{report['meta']['version']} vs. {baseline['meta']['version']}")
+
+    regressions = 0
+    for result in report["results"]:
+        key = getResultKey(result)
+        if key not in baselineResults:
+            continue
+        before, after = baselineResults[key]["median"], result["median"]
+        ratio = after / before if before > 0 else float("inf")
+        regressed = ratio > 1 + threshold
+        regressions += regressed
+        print(f"{key:<60} {before:8.4f} s -> {after:8.4f} s  {100 * (ratio - 1):+6.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="MRunner benchmark suite")
+    parser.add_argument("--sizes", default="64,128,256", help="volume sizes, N (cube) or NxNxN, comma separated")
+    parser.add_argument("--labels", default="1,8,32", help="label counts, comma separated")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--progress", type=int, default=0, help="progress bar updates printed by the fake model (process benchmark)")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", default="mrunner-benchmark.json", help="report file")
+    parser.add_argument("--report", help="compare an existing report instead of running the benchmarks")
+    parser.add_argument("--compare", help="baseline report")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as regression")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        with open(args.report, "r") as f:
+            data = json.load(f)
+    else:
+        sizes = [parseSize(size) for size in args.sizes.split(",")]
+        labelCounts = [int(labels) for labels in args.labels.split(",")]
+        only = [name.strip() for name in args.only.split(",")]
+
+        report = BenchmarkReport(vars(args))
+        for name in only:
+            if name in SLICER_BENCHMARKS and not IN_SLICER:
+                print(f"Skipping {name} (requires Slicer).")
+            elif name == "repo":
+                benchRepository(report, args.repeat)
+            elif name == "segdb":
+                benchSegDB(report, args.repeat)
+            elif name == "import":
+                benchImport(report, sizes, labelCounts, args.repeat)
+            elif name == "process":
+                benchProcess(report, sizes, labelCounts, args.repeat, args.progress)
+            else:
+                parser.error(f"unknown benchmark {name}")
+
+        report.write(args.output)
+        print(f"Report written to {args.output}")
+        data = report.toDict()
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            return 1 if compareReports(data, json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    exitCode = main(sys.argv[1:])
+    if IN_SLICER:
+        slicer.util.exit(exitCode)
+    sys.exit(exitCode)
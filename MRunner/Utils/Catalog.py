@@ -0,0 +1,144 @@
+"""
+-------------------------------------------------
+MedicalHub - Model Catalog
+-------------------------------------------------
+
+Merges the bundled repo.json with remote catalogs
+(e.g. upstream and an internal catalog). Remote
+catalogs are revalidated with conditional requests
+(ETag / If-Modified-Since) in the background and kept
+as local copies, so loading the catalog never waits
+on the network.
+-------------------------------------------------
+"""
+
+from typing import Dict, List, Optional, Tuple
+import os, json, hashlib, logging, threading, time
+
+from .Http import fetch
+from .Repo import Repository
+
+
+class CatalogSource:
+    __slots__ = ('name', 'url')
+
+    def __init__(self, name: str, url: str) -> None:
+        self.name = name
+        self.url = url
+
+    def __repr__(self) -> str:
+        return f"CatalogSource({self.name}, {self.url})"
+
+
+class Catalog:
+
+    def __init__(self, cacheDir: str, bundledFile: str, sources: List[CatalogSource], timeout: float = 10.0) -> None:
+        self.cacheDir = cacheDir
+        self.bundledFile = bundledFile
+        self.sources = sources      # in priority order, later sources override models of earlier ones
+        self.timeout = timeout
+        self._syncThread: Optional[threading.Thread] = None
+        self._syncResult: Tuple[bool, Dict[str, Exception]] = (False, {})
+        os.makedirs(self.cacheDir, exist_ok=True)
+
+    # local copies
+
+    def getCachedFile(self, source: CatalogSource) -> str:
+        return os.path.join(self.cacheDir, f"{source.name}.json")
+
+    def _getMetaFile(self, source: CatalogSource) -> str:
+        return os.path.join(self.cacheDir, f"{source.name}.meta.json")
+
+    def getMeta(self, source: CatalogSource) -> dict:
+        """Validators and timestamps of the local copy (empty if there is none or it belongs to another url)."""
+        try:
+            with open(self._getMetaFile(source), "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get("url") == source.url and os.path.isfile(self.getCachedFile(source)) else {}
+
+    def _writeAtomic(self, path: str, data: bytes) -> None:
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    # sync
+
+    def sync(self, source: CatalogSource) -> bool:
+        """Revalidate the local copy of a source. Returns True if it changed. Invalid catalogs are rejected."""
+        meta = self.getMeta(source)
+        response = fetch(source.url, etag=meta.get("etag"), lastModified=meta.get("lastModified"), timeout=self.timeout)
+
+        if response.isNotModified():
+            meta["checkedAt"] = time.time()
+            self._writeAtomic(self._getMetaFile(source), json.dumps(meta).encode("utf-8"))
+            return False
+
+        # the catalog must be a valid repository on its own
+        Repository.fromData(json.loads(response.body.decode("utf-8")))
+
+        checksum = hashlib.sha256(response.body).hexdigest()
+        changed = checksum != meta.get("sha256")
+        self._writeAtomic(self.getCachedFile(source), response.body)
+        meta = {"url": source.url, "etag": response.etag, "lastModified": response.lastModified, "sha256": checksum, "checkedAt": time.time()}
+        self._writeAtomic(self._getMetaFile(source), json.dumps(meta).encode("utf-8"))
+        return changed
+
+    def syncAll(self) -> Tuple[bool, Dict[str, Exception]]:
+        """Sync all sources. Returns whether any source changed and the errors by source name."""
+        changed, errors = False, {}
+        for source in self.sources:
+            try:
+                changed = self.sync(source) or changed
+            except Exception as e:
+                logging.warning(f"Catalog source {source.name} ({source.url}) not updated: {e}")
+                errors[source.name] = e
+        return changed, errors
+
+    def syncAsync(self) -> None:
+        """Sync all sources on a background thread (see isSyncing, getSyncResult)."""
+        if self.isSyncing():
+            return
+
+        def run():
+            self._syncResult = self.syncAll()
+
+        self._syncThread = threading.Thread(target=run, name="MRunnerCatalogSync", daemon=True)
+        self._syncThread.start()
+
+    def isSyncing(self) -> bool:
+        return self._syncThread is not None and self._syncThread.is_alive()
+
+    def getSyncResult(self) -> Tuple[bool, Dict[str, Exception]]:
+        return self._syncResult
+
+    # merged catalog
+
+    def loadData(self) -> dict:
+        """The bundled repo.json merged with the local copies of all sources (no network access).
+           Models are identified by name and label, models of later sources replace earlier ones."""
+        with open(self.bundledFile, "r") as f:
+            data = json.load(f)
+
+        models = {}
+        for model_data in data.get("models", []):
+            models.setdefault((model_data.get("name"), model_data.get("label")), model_data)
+
+        for source in self.sources:
+            if not self.getMeta(source):
+                continue
+            try:
+                with open(self.getCachedFile(source), "r") as f:
+                    source_data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring the local copy of catalog source {source.name}: {e}")
+                continue
+            for model_data in source_data.get("models", []):
+                models[(model_data.get("name"), model_data.get("label"))] = model_data
+
+        data["models"] = list(models.values())
+        return data
+
+    def load(self) -> Repository:
+        return Repository.fromData(self.loadData())
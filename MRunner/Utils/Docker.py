@@ -0,0 +1,655 @@
+"""
+-------------------------------------------------
+MedicalHub - Docker Backends
+-------------------------------------------------
+
+Docker operations used by MRunner behind a common
+interface. The engine backend talks to the Docker
+Engine REST API over the unix socket (pooled keep-alive
+connections, structured progress). The cli backend forks
+the docker executable and is used as fallback (e.g. on
+windows or if the socket is not accessible).
+
+Long running calls (pull, build, run) return a
+DockerOperation: iterate it to receive progress events
+(dicts as sent by the engine, cli output and container
+log lines are reported as {"stream": line, "transient":
+bool}, see Utils/LogPipeline.py). It provides the
+poll/kill interface of a process, so jobs can cancel it.
+-------------------------------------------------
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import os, io, abc, sys, json, socket, struct, logging, tarfile, threading, subprocess
+import http.client, urllib.parse
+
+from .ImageInventory import ImageRecord
+from .LogPipeline import LineSplitter
+
+
+class DockerError(subprocess.CalledProcessError):
+    """A failed docker call (returncode: exit code of the cli / container or the http status of the engine)."""
+
+    def __init__(self, returncode: int, cmd: List[str], message: Optional[str] = None) -> None:
+        super().__init__(returncode, cmd, output=message)
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message or super().__str__()
+
+
+def splitImageRef(ref: str) -> Tuple[str, str]:
+    """repository[:tag] -> (repository, tag)"""
+    name, sep, tag = ref.rpartition(":")
+    if not sep or "/" in tag:
+        return ref, "latest"
+    return name, tag
+
+
+def formatSize(size: int) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.3g}{unit}"
+        size /= 1000
+    return f"{size:.3g}TB"
+
+
+class ContainerResources:
+    """Resource limits of a container (None: docker default). Sizes in bytes."""
+    __slots__ = ('cpus', 'memory', 'shmSize', 'ipcMode')
+
+    def __init__(self, cpus: Optional[float] = None, memory: Optional[int] = None, shmSize: Optional[int] = None, ipcMode: Optional[str] = None) -> None:
+        self.cpus = cpus
+        self.memory = memory
+        self.shmSize = shmSize if ipcMode != "host" else None   # a shared host ipc namespace uses the host's /dev/shm
+        self.ipcMode = ipcMode
+
+    def __repr__(self) -> str:
+        parts = []
+        if self.cpus:
+            parts.append(f"cpus {self.cpus:g}")
+        if self.memory:
+            parts.append(f"memory {formatSize(self.memory)}")
+        if self.shmSize:
+            parts.append(f"shm {formatSize(self.shmSize)}")
+        if self.ipcMode:
+            parts.append(f"ipc {self.ipcMode}")
+        return ", ".join(parts) or "no limits"
+
+    def toCLIOptions(self) -> List[str]:
+        options = []
+        if self.cpus:
+            options += ["--cpus", f"{self.cpus:g}"]
+        if self.memory:
+            options += ["--memory", f"{max(6, self.memory // 1024**2)}m"]
+        if self.shmSize:
+            options += ["--shm-size", f"{max(1, self.shmSize // 1024**2)}m"]
+        if self.ipcMode:
+            options += ["--ipc", self.ipcMode]
+        return options
+
+    def toHostConfig(self) -> dict:
+        config = {}
+        if self.cpus:
+            config["NanoCpus"] = int(self.cpus * 1e9)
+        if self.memory:
+            config["Memory"] = int(self.memory)
+        if self.shmSize:
+            config["ShmSize"] = int(self.shmSize)
+        if self.ipcMode:
+            config["IpcMode"] = self.ipcMode
+        return config
+
+
+def formatEvent(event: dict) -> Optional[str]:
+    """Log line of a progress event (None for byte progress updates and auxiliary messages)."""
+    if "error" in event or "errorDetail" in event:
+        return "ERROR: " + (event.get("error") or event["errorDetail"].get("message", ""))
+    if "stream" in event:
+        line = event["stream"].rstrip()
+        return line or None
+    if "status" in event:
+        if event.get("progressDetail", {}).get("current") is not None:
+            return None
+        return f"{event['id']}: {event['status']}" if event.get("id") else event["status"]
+    return None
+
+
+#
+# operations
+#
+
+class DockerOperation(abc.ABC):
+
+    def __init__(self, args: List[str]) -> None:
+        self.args = args
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @abc.abstractmethod
+    def __iter__(self) -> Iterator[dict]:
+        ...
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    @abc.abstractmethod
+    def kill(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    def wait(self) -> int:
+        ...
+
+
+class DockerCLIOperation(DockerOperation):
+
+    def __init__(self, proc) -> None:
+        super().__init__(proc.args)
+        self.proc = proc
+
+    def __iter__(self) -> Iterator[dict]:
+        # read the raw bytes (text mode pipes turn every carriage return of a progress bar into a line)
+        stdout = getattr(self.proc.stdout, "buffer", self.proc.stdout)
+        splitter = LineSplitter()
+        while True:
+            data = stdout.read1(65536)
+            if not data:
+                break
+            for line, transient in splitter.feed(data):
+                yield {"stream": line, "transient": transient}
+        for line, transient in splitter.flush():
+            yield {"stream": line, "transient": transient}
+
+    def poll(self) -> Optional[int]:
+        self.returncode = self.proc.poll()
+        return self.returncode
+
+    def kill(self) -> None:
+        self.proc.kill()
+
+    def wait(self) -> int:
+        self.returncode = self.proc.wait()
+        return self.returncode
+
+
+class DockerEngineOperation(DockerOperation):
+
+    def __init__(self, client: 'DockerEngineClient', args: List[str], conn: http.client.HTTPConnection, response: http.client.HTTPResponse,
+                 frames: bool = False, onFinish: Optional[Callable[[], int]] = None, onKill: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(args)
+        self.client = client
+        self.conn = conn
+        self.response = response
+        self.frames = frames        # multiplexed stdout / stderr frames (container logs), json messages otherwise
+        self.onFinish = onFinish    # returns the exit code (e.g. waits for the container)
+        self.onKill = onKill
+        self._killed = False
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._consumed:
+            return
+        self._consumed = True
+        clean = False
+        try:
+            for event in (self._readFrames() if self.frames else self._readMessages()):
+                if "error" in event or "errorDetail" in event:
+                    self.error = formatEvent(event)[len("ERROR: "):]
+                yield event
+            clean = True
+        except GeneratorExit:
+            # abandoned by the consumer
+            self.kill()
+            raise
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            if not self._killed:
+                self.error = self.error or f"Connection to the docker engine lost: {e}"
+        finally:
+            self.client._release(self.conn, clean and not self.response.will_close)
+            self._finish()
+
+    def _finish(self) -> None:
+        returncode = 1 if self.error else 0
+        if self.onFinish is not None:
+            try:
+                exitCode = self.onFinish()
+                if not self.error:
+                    returncode = exitCode
+            except (OSError, DockerError) as e:
+                self.error = self.error or str(e)
+                returncode = returncode or 1
+        self.returncode = -9 if self._killed else returncode
+
+    def _readMessages(self) -> Iterator[dict]:
+        decoder = json.JSONDecoder()
+        while True:
+            line = self.response.readline()
+            if not line:
+                break
+            text = line.decode("utf-8", errors="replace").strip()
+            while text:
+                event, end = decoder.raw_decode(text)
+                yield event
+                text = text[end:].lstrip()
+
+    def _readFrames(self) -> Iterator[dict]:
+        # 8 byte header: stream type (1: stdout, 2: stderr), 3 bytes padding, payload size (big endian)
+        splitters = {1: LineSplitter(), 2: LineSplitter()}
+        while True:
+            header = self.response.read(8)
+            if len(header) < 8:
+                break
+            streamType, size = header[0], struct.unpack(">I", header[4:])[0]
+            data = self.response.read(size)
+            streamType = streamType if streamType in splitters else 1
+            for line, transient in splitters[streamType].feed(data):
+                yield {"stream": line, "transient": transient, "source": "stderr" if streamType == 2 else "stdout"}
+        for streamType, splitter in splitters.items():
+            for line, transient in splitter.flush():
+                yield {"stream": line, "transient": transient, "source": "stderr" if streamType == 2 else "stdout"}
+
+    def kill(self) -> None:
+        self._killed = True
+        if self.onKill is not None:
+            try:
+                self.onKill()
+            except (OSError, DockerError):
+                pass
+        try:
+            self.conn.sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+
+    def wait(self) -> int:
+        for _ in self:
+            pass
+        return self.returncode
+
+
+#
+# engine client
+#
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socketPath: str, timeout: Optional[float] = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socketPath = socketPath
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socketPath)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerEngineClient:
+    """Minimal Docker Engine API client over a unix socket.
+
+       Connections are kept alive and reused (at most maxIdle idle connections), a streaming call
+       holds its connection until the stream is consumed. Safe to use from several threads.
+    """
+
+    def __init__(self, socketPath: str, timeout: float = 30.0, maxIdle: int = 4, apiVersion: str = "1.41") -> None:
+        self.socketPath = socketPath
+        self.timeout = timeout
+        self.maxIdle = maxIdle
+        self.apiVersion = apiVersion
+        self.connectionsCreated = 0
+        self._idle: List[UnixHTTPConnection] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromEnvironment(cls, **kwargs) -> Optional['DockerEngineClient']:
+        """Client for the local docker socket (DOCKER_HOST=unix://... or the default locations), None if there is none."""
+        if not hasattr(socket, "AF_UNIX") or sys.platform.startswith("win"):
+            return None
+        host = os.environ.get("DOCKER_HOST", "")
+        if host.startswith("unix://"):
+            candidates = [host[len("unix://"):]]
+        elif host:
+            return None # tcp / ssh hosts are left to the cli
+        else:
+            candidates = ["/var/run/docker.sock", os.path.expanduser("~/.docker/run/docker.sock"), os.path.expanduser("~/.docker/desktop/docker.sock")]
+        for path in candidates:
+            if os.path.exists(path):
+                return cls(path, **kwargs)
+        return None
+
+    # connections
+
+    def _acquire(self) -> Tuple[UnixHTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.connectionsCreated += 1
+        return UnixHTTPConnection(self.socketPath, timeout=self.timeout), False
+
+    def _release(self, conn: UnixHTTPConnection, reusable: bool = True) -> None:
+        with self._lock:
+            if reusable and len(self._idle) < self.maxIdle:
+                if conn.sock is not None:
+                    conn.sock.settimeout(self.timeout)
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _url(self, path: str, params: Optional[dict] = None, versioned: bool = True) -> str:
+        url = f"/v{self.apiVersion}{path}" if versioned else path
+        if params:
+            url += "?" + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        return url
+
+    def _send(self, method: str, url: str, body: Optional[bytes], headers: Optional[dict]) -> Tuple[UnixHTTPConnection, http.client.HTTPResponse]:
+        headers = dict(headers or {})
+        if body is not None:
+            headers.setdefault("Content-Type", "application/json")
+        for attempt in range(2):
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                # the engine may have closed an idle keep-alive connection, retry once on a new one
+                if not reused or attempt > 0:
+                    raise
+
+    def _raiseForStatus(self, method: str, url: str, status: int, data: bytes) -> None:
+        if status < 400:
+            return
+        try:
+            message = json.loads(data.decode("utf-8")).get("message")
+        except ValueError:
+            message = data.decode("utf-8", errors="replace").strip()
+        raise DockerError(status, [method, url], message or f"HTTP {status}")
+
+    def request(self, method: str, path: str, params: Optional[dict] = None, body: Optional[bytes] = None,
+                headers: Optional[dict] = None, versioned: bool = True) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        url = self._url(path, params, versioned)
+        conn, response = self._send(method, url, body, headers)
+        try:
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+        self._release(conn, not response.will_close)
+        return response.status, response.headers, data
+
+    def call(self, method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None):
+        """JSON request, returns the decoded response (None if empty). Raises DockerError on error status."""
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        status, _, data = self.request(method, path, params, data)
+        self._raiseForStatus(method, path, status, data)
+        return json.loads(data.decode("utf-8")) if data.strip() else None
+
+    def stream(self, method: str, path: str, params: Optional[dict] = None, body: Optional[bytes] = None,
+               headers: Optional[dict] = None) -> Tuple[UnixHTTPConnection, http.client.HTTPResponse]:
+        """Start a streaming request. The caller must pass the connection back through _release."""
+        url = self._url(path, params)
+        conn, response = self._send(method, url, body, headers)
+        if response.status >= 400:
+            data = response.read()
+            self._release(conn, not response.will_close)
+            self._raiseForStatus(method, path, response.status, data)
+        conn.sock.settimeout(None) # builds and containers may not report anything for a long time
+        return conn, response
+
+    # system
+
+    def ping(self) -> bool:
+        """True if the engine answers. Lowers the api version to the one supported by the engine."""
+        try:
+            status, headers, _ = self.request("GET", "/_ping", versioned=False)
+        except OSError:
+            return False
+        serverVersion = headers.get("API-Version")
+        if serverVersion:
+            try:
+                if tuple(map(int, serverVersion.split("."))) < tuple(map(int, self.apiVersion.split("."))):
+                    self.apiVersion = serverVersion
+            except ValueError:
+                pass
+        return status == 200
+
+    def info(self) -> dict:
+        return self.call("GET", "/info")
+
+    def version(self) -> dict:
+        return self.call("GET", "/version")
+
+
+#
+# backends
+#
+
+class DockerBackend(abc.ABC):
+    """Docker operations used by MRunner. Volumes (binds) are given as HOST:CONTAINER[:ro]."""
+
+    name = ""
+
+    @abc.abstractmethod
+    def info(self) -> dict:
+        ...
+
+    @abc.abstractmethod
+    def listImages(self) -> Dict[str, ImageRecord]:
+        ...
+
+    @abc.abstractmethod
+    def removeImage(self, ref: str) -> List[str]:
+        ...
+
+    @abc.abstractmethod
+    def pullImage(self, ref: str) -> DockerOperation:
+        ...
+
+    @abc.abstractmethod
+    def buildImage(self, ref: str, contextDir: str, buildArgs: Optional[Dict[str, str]] = None, platform: Optional[str] = None,
+                   noCache: bool = False) -> DockerOperation:
+        ...
+
+    @abc.abstractmethod
+    def runContainer(self, ref: str, command: List[str], binds: List[str], name: Optional[str] = None,
+                     useGPU: bool = False, resources: Optional[ContainerResources] = None) -> DockerOperation:
+        """Run a container in the foreground, it is removed when done."""
+
+    @abc.abstractmethod
+    def startContainer(self, ref: str, command: List[str], binds: List[str], name: str, useGPU: bool = False,
+                       resources: Optional[ContainerResources] = None) -> None:
+        """Start a detached container that is removed once it stops."""
+
+    @abc.abstractmethod
+    def killContainer(self, name: str) -> None:
+        """Kill a container without blocking the caller, missing containers are ignored."""
+
+    @abc.abstractmethod
+    def removeContainer(self, name: str) -> None:
+        """Force remove a container, missing containers are ignored."""
+
+
+class DockerCLIBackend(DockerBackend):
+
+    name = "cli"
+
+    def __init__(self, executable: Optional[str], launch: Optional[Callable[[List[str]], subprocess.Popen]] = None) -> None:
+        self.executable = executable
+        self.launch = launch or self._launch
+
+    @staticmethod
+    def _launch(command: List[str]) -> subprocess.Popen:
+        return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+    def _command(self, *args: str) -> List[str]:
+        assert self.executable is not None, "DockerExecPath is None."
+        return [self.executable, *args]
+
+    def info(self) -> dict:
+        return json.loads(subprocess.check_output(self._command('info', '--format', '{{json .}}')).decode('utf-8'))
+
+    def listImages(self) -> Dict[str, ImageRecord]:
+        command = self._command('images', '--no-trunc', '--format', '{{.Repository}}:{{.Tag}}\t{{.ID}}\t{{.Size}}')
+        images = {}
+        for line in subprocess.check_output(command).decode('utf-8').splitlines():
+            fields = line.strip().split("\t")
+            if not fields[0]:
+                continue
+            images[fields[0]] = ImageRecord(*fields[:3])
+        return images
+
+    def removeImage(self, ref: str) -> List[str]:
+        command = self._command('rmi', ref)
+        proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        if proc.returncode != 0:
+            raise DockerError(proc.returncode, command, proc.stdout.strip())
+        return proc.stdout.splitlines()
+
+    def pullImage(self, ref: str) -> DockerOperation:
+        return DockerCLIOperation(self.launch(self._command('pull', ref)))
+
+    def buildImage(self, ref, contextDir, buildArgs=None, platform=None, noCache=False) -> DockerOperation:
+        command = self._command('build', '-t', ref)
+        for key, value in (buildArgs or {}).items():
+            command += ['--build-arg', f'{key}={value}']
+        if platform:
+            command += ['--platform', platform]
+        if noCache:
+            command += ['--no-cache']
+        command += [contextDir]
+        return DockerCLIOperation(self.launch(command))
+
+    def _runOptions(self, binds: List[str], name: Optional[str], useGPU: bool, resources: Optional[ContainerResources]) -> List[str]:
+        options = []
+        for bind in binds:
+            options += ["--volume", bind]
+        if name is not None:
+            options += ["--name", name]
+        if useGPU:
+            options += ["--gpus", "all"]
+        if resources is not None:
+            options += resources.toCLIOptions()
+        return options
+
+    def runContainer(self, ref, command, binds, name=None, useGPU=False, resources=None) -> DockerOperation:
+        return DockerCLIOperation(self.launch(self._command("run", "--rm", *self._runOptions(binds, name, useGPU, resources), ref, *command)))
+
+    def startContainer(self, ref, command, binds, name, useGPU=False, resources=None) -> None:
+        subprocess.check_output(self._command("run", "-d", "--rm", *self._runOptions(binds, name, useGPU, resources), ref, *command), stderr=subprocess.STDOUT)
+
+    def killContainer(self, name: str) -> None:
+        # non-blocking
+        subprocess.Popen(self._command("kill", name), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def removeContainer(self, name: str) -> None:
+        subprocess.call(self._command("rm", "-f", name), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class DockerEngineBackend(DockerBackend):
+
+    name = "engine"
+
+    def __init__(self, client: DockerEngineClient) -> None:
+        self.client = client
+
+    def info(self) -> dict:
+        return self.client.info()
+
+    def listImages(self) -> Dict[str, ImageRecord]:
+        images = {}
+        for image in self.client.call("GET", "/images/json") or []:
+            for ref in image.get("RepoTags") or []:
+                if ref != "<none>:<none>":
+                    images[ref] = ImageRecord(ref, image.get("Id", ""), formatSize(image.get("Size", 0)))
+        return images
+
+    def removeImage(self, ref: str) -> List[str]:
+        lines = []
+        for item in self.client.call("DELETE", f"/images/{urllib.parse.quote(ref, safe='')}") or []:
+            for key, value in item.items():
+                lines.append(f"{key}: {value}")
+        return lines
+
+    def pullImage(self, ref: str) -> DockerOperation:
+        repository, tag = splitImageRef(ref)
+        conn, response = self.client.stream("POST", "/images/create", {"fromImage": repository, "tag": tag})
+        return DockerEngineOperation(self.client, ["engine", "pull", ref], conn, response)
+
+    def buildImage(self, ref, contextDir, buildArgs=None, platform=None, noCache=False) -> DockerOperation:
+        context = io.BytesIO()
+        with tarfile.open(fileobj=context, mode="w") as tar:
+            for fileName in sorted(os.listdir(contextDir)):
+                tar.add(os.path.join(contextDir, fileName), arcname=fileName)
+
+        params = {"t": ref, "rm": 1, "forcerm": 1}
+        if buildArgs:
+            params["buildargs"] = json.dumps(buildArgs)
+        if platform:
+            params["platform"] = platform
+        if noCache:
+            params["nocache"] = 1
+
+        conn, response = self.client.stream("POST", "/build", params, body=context.getvalue(), headers={"Content-Type": "application/x-tar"})
+        return DockerEngineOperation(self.client, ["engine", "build", "-t", ref, contextDir], conn, response)
+
+    def _createContainer(self, ref: str, command: List[str], binds: List[str], name: Optional[str], useGPU: bool, autoRemove: bool,
+                         resources: Optional[ContainerResources] = None) -> str:
+        hostConfig = {"Binds": list(binds), "AutoRemove": autoRemove}
+        if useGPU:
+            hostConfig["DeviceRequests"] = [{"Driver": "", "Count": -1, "Capabilities": [["gpu"]]}]
+        if resources is not None:
+            hostConfig.update(resources.toHostConfig())
+        body = {"Image": ref, "Cmd": list(command), "Tty": False, "HostConfig": hostConfig}
+        return self.client.call("POST", "/containers/create", {"name": name} if name else None, body)["Id"]
+
+    def runContainer(self, ref, command, binds, name=None, useGPU=False, resources=None) -> DockerOperation:
+        containerId = self._createContainer(ref, command, binds, name, useGPU, autoRemove=False, resources=resources)
+        try:
+            self.client.call("POST", f"/containers/{containerId}/start")
+            conn, response = self.client.stream("GET", f"/containers/{containerId}/logs", {"follow": 1, "stdout": 1, "stderr": 1})
+        except (OSError, DockerError):
+            self.removeContainer(containerId)
+            raise
+
+        def finish() -> int:
+            try:
+                return self.client.call("POST", f"/containers/{containerId}/wait")["StatusCode"]
+            finally:
+                self.removeContainer(containerId)
+
+        return DockerEngineOperation(self.client, ["engine", "run", ref, *command], conn, response, frames=True,
+                                     onFinish=finish, onKill=lambda: self.killContainer(containerId))
+
+    def startContainer(self, ref, command, binds, name, useGPU=False, resources=None) -> None:
+        containerId = self._createContainer(ref, command, binds, name, useGPU, autoRemove=True, resources=resources)
+        self.client.call("POST", f"/containers/{containerId}/start")
+
+    def killContainer(self, name: str) -> None:
+        # non-blocking (called from the main thread when a job is cancelled)
+        def kill() -> None:
+            try:
+                self.client.call("POST", f"/containers/{urllib.parse.quote(name, safe='')}/kill")
+            except DockerError as e:
+                if e.returncode not in (404, 409): # missing / not running
+                    logging.warning(f"Cannot kill container {name}: {e}")
+            except OSError as e:
+                logging.warning(f"Cannot kill container {name}: {e}")
+
+        threading.Thread(target=kill, name=f"docker-kill-{name}", daemon=True).start()
+
+    def removeContainer(self, name: str) -> None:
+        try:
+            self.client.call("DELETE", f"/containers/{urllib.parse.quote(name, safe='')}", {"force": 1})
+        except DockerError as e:
+            if e.returncode != 404:
+                raise
@@ -0,0 +1,107 @@
+"""
+-------------------------------------------------
+MedicalHub - Dockerfile Cache
+-------------------------------------------------
+
+Keeps downloaded Dockerfiles in a stable build-context
+directory per model, branch and image tag. Cached files
+are revalidated with conditional requests and verified
+by checksum, so rebuilds reuse the same context path
+(docker layer cache) and work offline.
+-------------------------------------------------
+"""
+
+from typing import Optional, Tuple
+import os, re, json, time, hashlib, logging
+
+from .Http import fetch
+
+DOCKERFILE = "Dockerfile"
+
+
+class DockerfileCacheError(RuntimeError):
+    pass
+
+
+class DockerfileCache:
+
+    def __init__(self, rootDir: str, timeout: float = 10.0, maxAge: float = 0) -> None:
+        self.rootDir = rootDir
+        self.timeout = timeout
+        self.maxAge = maxAge        # s, cached files checked more recently are not revalidated (0: always revalidate)
+        os.makedirs(self.rootDir, exist_ok=True)
+
+    @staticmethod
+    def getKey(imageName: str, branch: str, imageTag: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{imageName}-{branch}-{imageTag}")
+
+    def getContextDir(self, key: str) -> str:
+        """Stable build context directory (contains only the Dockerfile)."""
+        return os.path.join(self.rootDir, key)
+
+    def _getMetaFile(self, key: str) -> str:
+        # kept outside of the build context
+        return os.path.join(self.rootDir, f"{key}.meta.json")
+
+    def getMeta(self, key: str, url: str) -> dict:
+        """Validators of the cached Dockerfile (empty if there is none, it belongs to another url or fails the checksum)."""
+        try:
+            with open(self._getMetaFile(key), "r") as f:
+                meta = json.load(f)
+            with open(os.path.join(self.getContextDir(key), DOCKERFILE), "rb") as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+        except (OSError, ValueError):
+            return {}
+        if meta.get("url") != url or meta.get("sha256") != checksum:
+            return {}
+        return meta
+
+    def _writeAtomic(self, path: str, data: bytes) -> None:
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def get(self, url: str, key: str, force: bool = False) -> Tuple[str, str]:
+        """Returns the build context directory holding the current Dockerfile of url and how it was
+           obtained ('downloaded', 'updated', 'revalidated', 'cached' or 'offline').
+           force: ignore the cached copy and download the Dockerfile again."""
+        contextDir = self.getContextDir(key)
+        meta = {} if force else self.getMeta(key, url)
+
+        if meta and self.maxAge > 0 and time.time() - meta.get("checkedAt", 0) < self.maxAge:
+            return contextDir, "cached"
+
+        try:
+            response = fetch(url, etag=meta.get("etag"), lastModified=meta.get("lastModified"), timeout=self.timeout)
+        except OSError as e:
+            # offline rebuilds use the verified local copy
+            if not meta:
+                raise DockerfileCacheError(f"Cannot download Dockerfile from {url} and there is no cached copy: {e}") from e
+            logging.warning(f"Cannot revalidate Dockerfile {url}, using the cached copy: {e}")
+            return contextDir, "offline"
+
+        if response.isNotModified():
+            meta["checkedAt"] = time.time()
+            self._writeAtomic(self._getMetaFile(key), json.dumps(meta).encode("utf-8"))
+            return contextDir, "revalidated"
+
+        checksum = hashlib.sha256(response.body).hexdigest()
+        status = "downloaded" if not meta else "updated"
+        os.makedirs(contextDir, exist_ok=True)
+
+        # keep the file untouched if the content did not change
+        if checksum != meta.get("sha256"):
+            self._writeAtomic(os.path.join(contextDir, DOCKERFILE), response.body)
+        else:
+            status = "revalidated"
+
+        meta = {"url": url, "etag": response.etag, "lastModified": response.lastModified, "sha256": checksum, "checkedAt": time.time()}
+        self._writeAtomic(self._getMetaFile(key), json.dumps(meta).encode("utf-8"))
+        return contextDir, status
+
+    def getChecksum(self, key: str) -> Optional[str]:
+        try:
+            with open(self._getMetaFile(key), "r") as f:
+                return json.load(f).get("sha256")
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,128 @@
+"""
+-------------------------------------------------
+MedicalHub - Input Export Manifest
+-------------------------------------------------
+
+Records which exported input volumes are still valid
+(node id + modification time or content hash), so
+later runs on an unchanged volume link the existing
+export instead of writing it again. The manifest is
+only valid within one session (mrml modification times
+are per process): each Slicer process has its own
+session directory, directories of ended sessions are
+removed when a manifest is created.
+-------------------------------------------------
+"""
+
+from typing import Callable, Dict, List, Optional
+import os, re, json, shutil, tempfile, time
+
+from .Host import isProcessAlive
+
+MANIFEST_FILE = "manifest.json"
+SESSION_DIR = re.compile(r'^session-(\d+)$')
+
+
+class ExportEntry:
+    __slots__ = ('nodeID', 'mtime', 'contentHash', 'dir', 'files', 'lastUsed')
+
+    def __init__(self, nodeID: str, mtime: int, contentHash: Optional[str], dir: str, files: List[str]) -> None:
+        self.nodeID = nodeID
+        self.mtime = mtime
+        self.contentHash = contentHash
+        self.dir = dir
+        self.files = files
+        self.lastUsed = time.time()
+
+    def toDict(self) -> dict:
+        return {"nodeID": self.nodeID, "mtime": self.mtime, "contentHash": self.contentHash, "dir": self.dir, "files": self.files, "lastUsed": self.lastUsed}
+
+
+class ExportManifest:
+
+    def __init__(self, baseDir: str, maxEntries: int = 4) -> None:
+        self.baseDir = baseDir
+        self.rootDir = os.path.join(baseDir, f"session-{os.getpid()}")
+        self.maxEntries = maxEntries
+        self.entries: Dict[str, ExportEntry] = {}
+
+        # exports of an earlier session cannot be validated, other running sessions keep theirs
+        removeEndedSessions(baseDir)
+        shutil.rmtree(self.rootDir, ignore_errors=True)
+        os.makedirs(self.rootDir)
+
+    def lookup(self, nodeID: str, mtime: int, contentHash: Optional[str] = None) -> Optional[ExportEntry]:
+        """Returns the export of a node if it is still valid. If a content hash is given, it is compared
+           instead of the modification time (catches modifications that did not update the node)."""
+        entry = self.entries.get(nodeID)
+        if entry is None:
+            return None
+
+        valid = entry.contentHash == contentHash if contentHash is not None else entry.mtime == mtime
+        if not valid or not all(os.path.isfile(os.path.join(entry.dir, f)) for f in entry.files):
+            self.remove(nodeID)
+            return None
+
+        entry.lastUsed = time.time()
+        return entry
+
+    def add(self, nodeID: str, mtime: int, contentHash: Optional[str], writer: Callable[[str], object]) -> ExportEntry:
+        """Export a node through writer(dir) into a new export directory and record all written files."""
+        self.remove(nodeID)
+
+        exportDir = tempfile.mkdtemp(prefix=re.sub(r'[^A-Za-z0-9_.-]', '_', nodeID) + "-", dir=self.rootDir)
+        try:
+            writer(exportDir)
+        except Exception:
+            shutil.rmtree(exportDir, ignore_errors=True)
+            raise
+
+        entry = ExportEntry(nodeID, mtime, contentHash, exportDir, sorted(os.listdir(exportDir)))
+        self.entries[nodeID] = entry
+
+        # evict least recently used exports
+        for old in sorted(self.entries.values(), key=lambda e: e.lastUsed)[:max(0, len(self.entries) - self.maxEntries)]:
+            self.remove(old.nodeID)
+
+        self.save()
+        return entry
+
+    def remove(self, nodeID: str) -> None:
+        entry = self.entries.pop(nodeID, None)
+        if entry is not None:
+            shutil.rmtree(entry.dir, ignore_errors=True)
+            self.save()
+
+    def clear(self) -> None:
+        for nodeID in list(self.entries):
+            self.remove(nodeID)
+
+    def save(self) -> None:
+        manifestFile = os.path.join(self.rootDir, MANIFEST_FILE)
+        with open(manifestFile + ".tmp", "w") as f:
+            json.dump([entry.toDict() for entry in self.entries.values()], f, indent=2)
+        os.replace(manifestFile + ".tmp", manifestFile)
+
+
+def removeEndedSessions(baseDir: str) -> List[str]:
+    """Remove the export directories of Slicer processes that are no longer running (and of the
+       former unscoped layout). Returns the removed paths."""
+    try:
+        names = os.listdir(baseDir)
+    except OSError:
+        return []
+    removed = []
+    for name in names:
+        match = SESSION_DIR.match(name)
+        if match is not None and (int(match.group(1)) == os.getpid() or isProcessAlive(int(match.group(1)))):
+            continue
+        path = os.path.join(baseDir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        removed.append(path)
+    return removed
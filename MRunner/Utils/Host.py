@@ -0,0 +1,86 @@
+"""
+-------------------------------------------------
+MedicalHub - Host Resources
+-------------------------------------------------
+
+Number of cpu cores and (available) memory of the
+host, used to size worker pools and containers, and
+liveness of other processes (e.g. Slicer sessions).
+-------------------------------------------------
+"""
+
+from typing import Optional
+import os, sys
+
+
+def getCPUCount() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _getMemInfo(key: str) -> Optional[int]:
+    """Read a value (in bytes) from /proc/meminfo (linux only)."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _getWindowsMemoryStatus():
+    import ctypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("sullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+    status = MEMORYSTATUSEX()
+    status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+    return status
+
+
+def getTotalMemory() -> Optional[int]:
+    """Total physical memory in bytes (None if unknown)."""
+    if sys.platform == "win32":
+        return int(_getWindowsMemoryStatus().ullTotalPhys)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return _getMemInfo("MemTotal")
+
+
+def isProcessAlive(pid: int) -> bool:
+    """True if a process with this id is running (the id might have been reused)."""
+    if sys.platform == "win32":
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exitCode = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exitCode))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return exitCode.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def getAvailableMemory() -> Optional[int]:
+    """Available physical memory in bytes (falls back to the total memory if unknown)."""
+    if sys.platform == "win32":
+        return int(_getWindowsMemoryStatus().ullAvailPhys)
+    available = _getMemInfo("MemAvailable")
+    return available if available is not None else getTotalMemory()
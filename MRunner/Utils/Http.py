@@ -0,0 +1,46 @@
+"""
+-------------------------------------------------
+MedicalHub - Conditional HTTP Fetch
+-------------------------------------------------
+
+Small urllib wrapper for GET requests that revalidate a
+cached copy (ETag / If-Modified-Since). A 304 response is
+reported as not modified instead of raising.
+-------------------------------------------------
+"""
+
+from typing import Dict, Optional
+import urllib.request, urllib.error
+
+
+class HttpResponse:
+    __slots__ = ('url', 'status', 'body', 'etag', 'lastModified')
+
+    def __init__(self, url: str, status: int, body: Optional[bytes], etag: Optional[str], lastModified: Optional[str]) -> None:
+        self.url = url
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.lastModified = lastModified
+
+    def isNotModified(self) -> bool:
+        return self.status == 304
+
+
+def fetch(url: str, etag: Optional[str] = None, lastModified: Optional[str] = None, timeout: float = 10.0,
+          headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+    """GET url. Pass the validators of a cached copy to receive a 304 (body None) if it is still current.
+       Raises urllib.error.URLError (or HTTPError) on network and server errors."""
+    request = urllib.request.Request(url, headers=dict(headers or {}))
+    if etag:
+        request.add_header("If-None-Match", etag)
+    if lastModified:
+        request.add_header("If-Modified-Since", lastModified)
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return HttpResponse(url, response.status, response.read(), response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return HttpResponse(url, 304, None, e.headers.get("ETag") or etag, e.headers.get("Last-Modified") or lastModified)
+        raise
@@ -0,0 +1,122 @@
+"""
+-------------------------------------------------
+MedicalHub - Docker Image Inventory
+-------------------------------------------------
+
+Caches the list of locally available docker images so
+that GUI updates can check for an image without forking
+the docker cli on every change.
+-------------------------------------------------
+"""
+
+from typing import Callable, Dict, Optional
+import threading, time
+
+
+class ImageRecord:
+    __slots__ = ('ref', 'id', 'size')
+
+    def __init__(self, ref: str, id: str = "", size: str = "") -> None:
+        self.ref = ref
+        self.id = id
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"ImageRecord({self.ref}, {self.id[:19]})"
+
+
+class ImageInventory:
+    """Image inventory keyed by image ref (repository:tag).
+
+       The inventory is filled by a single loader call (e.g. one `docker images --format ...` call).
+       Entries expire after `ttl` seconds or when `invalidate()` is called. Non-blocking lookups
+       return the last known state and trigger a refresh on a background thread. After a failed
+       load (e.g. the daemon is down) non-blocking lookups retry after `retryInterval` seconds.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, ImageRecord]], ttl: float = 60.0, retryInterval: float = 30.0) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.retryInterval = retryInterval
+
+        self._images: Optional[Dict[str, ImageRecord]] = None
+        self._loadedAt: float = 0.0
+        self._valid: bool = False
+        self._error: Optional[Exception] = None
+        self._failedAt: float = 0.0
+        self._lock = threading.Lock()
+        self._refreshThread: Optional[threading.Thread] = None
+
+    def isFresh(self) -> bool:
+        return self._images is not None and self._valid and (time.monotonic() - self._loadedAt) < self.ttl
+
+    def isLoaded(self) -> bool:
+        return self._images is not None
+
+    def isRefreshing(self) -> bool:
+        return self._refreshThread is not None and self._refreshThread.is_alive()
+
+    def getError(self) -> Optional[Exception]:
+        return self._error
+
+    def invalidate(self) -> None:
+        self._valid = False
+
+    def refresh(self) -> None:
+        """Reload the inventory synchronously (blocking)."""
+        try:
+            images = self.loader()
+        except Exception as e:
+            self._error = e
+            self._failedAt = time.monotonic()
+            raise
+        with self._lock:
+            self._images = images
+            self._loadedAt = time.monotonic()
+            self._valid = True
+            self._error = None
+
+    def refreshAsync(self) -> None:
+        """Reload the inventory on a background thread (no-op if a refresh is already running)."""
+        with self._lock:
+            if self.isRefreshing():
+                return
+            self._refreshThread = threading.Thread(target=self._refreshQuietly, name="MRunnerImageInventory", daemon=True)
+            self._refreshThread.start()
+
+    def _refreshQuietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            pass # error is kept in self._error
+
+    def _ensure(self, wait: bool) -> bool:
+        """Make sure inventory data is available. Returns False if no data is available (yet)."""
+        if self.isFresh():
+            return True
+        if wait:
+            if self.isRefreshing():
+                self._refreshThread.join()
+            if not self.isFresh():
+                self.refresh()
+            return True
+        if self._error is None or time.monotonic() - self._failedAt >= self.retryInterval:
+            self.refreshAsync()
+        return self._images is not None
+
+    def get(self, ref: str, wait: bool = True) -> Optional[ImageRecord]:
+        if not self._ensure(wait):
+            return None
+        with self._lock:
+            return self._images.get(ref)
+
+    def contains(self, ref: str, wait: bool = True) -> Optional[bool]:
+        """Returns True/False if the image is (not) available or None if the inventory is not loaded yet (only if wait=False)."""
+        if not self._ensure(wait):
+            return None
+        with self._lock:
+            return ref in self._images
+
+    def getImageID(self, ref: str, wait: bool = True) -> Optional[str]:
+        record = self.get(ref, wait=wait)
+        return record.id if record is not None else None
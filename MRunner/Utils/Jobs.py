@@ -0,0 +1,227 @@
+"""
+-------------------------------------------------
+MedicalHub - Asynchronous Jobs
+-------------------------------------------------
+
+Job handle for a model run that is executed on a
+worker thread. Output and state changes are queued
+by the worker and consumed on the main thread.
+-------------------------------------------------
+"""
+
+from typing import Any, Callable, List, Optional
+from enum import Enum
+import logging, threading, time, uuid
+
+from .LogPipeline import LogBuffer, LogItem
+
+
+class JobState(Enum):
+    QUEUED = "queued"
+    PULLING = "pulling"
+    BUILDING = "building"
+    RUNNING = "running"
+    IMPORTING = "importing"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def isFinished(self) -> bool:
+        return self in (JobState.DONE, JobState.FAILED, JobState.CANCELLED)
+
+
+class JobCancelledError(Exception):
+    pass
+
+
+class JobCase:
+    """A single case of a batch job (one staged input and its output segmentation)."""
+
+    def __init__(self, name: str, dir: str, inputVolume: Any = None, outputSegmentation: Any = None) -> None:
+        self.name = name
+        self.dir = dir
+        self.inputVolume = inputVolume
+        self.outputSegmentation = outputSegmentation
+        self.ok: Optional[bool] = None
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"JobCase({self.name}, ok={self.ok})"
+
+
+class Job:
+    """Handle of a single model run.
+
+       The worker thread reports output lines and state changes, the main thread drains them
+       (see takeOutput) and finishes the job. Completion callbacks are called with the job as
+       the only argument once it is done, failed or cancelled.
+    """
+
+    def __init__(self, model: Any, useGPU: bool = False) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.model = model
+        self.useGPU = useGPU
+        self.containerName = f"mrunner-{self.id}"
+
+        # run context (set by the logic)
+        self.dir: Optional[str] = None
+        self.inputVolume = None
+        self.outputSegmentation = None
+        self.workDir: Optional[str] = None  # managed working directory (see Utils.WorkDirs), released when finished
+        self.inputDir: Optional[str] = None   # separate (tmpfs) input directory, None: input is in dir
+        self.cases: List[JobCase] = []    # batch jobs only
+        self.keepWarm = False             # run on a warm model server
+        self.downloadDockerfile = True
+        self.noCache = False
+        self.inputHash: Optional[str] = None    # result cache (see MRunnerLogic.computeVolumeHash)
+        self.watcher = None                     # streaming import (see Utils.OutputWatcher)
+        self.streamedFiles: List[str] = []
+        self.cacheHit = False
+        self.telemetry = None                   # run telemetry (see MRunnerLogic.startTelemetry)
+        self.logFile = None                     # complete output of the run (see Utils.LogPipeline.RunLogFile)
+
+        self.state = JobState.QUEUED
+        self.error: Optional[BaseException] = None
+        self.createdAt = time.time()
+        self.finishedAt: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._output = LogBuffer()
+        self._progress = None       # latest pull / build progress snapshot (see Utils.Progress)
+        self._proc = None
+        self._cancelRequested = False
+        self._cancelHandler: Optional[Callable[['Job'], None]] = None
+        self._callbacks: List[Callable[['Job'], None]] = []
+        self._workerStarted = False
+        self._workerDone = threading.Event()
+        self._workerDoneAt: Optional[float] = None
+        self._workerError: Optional[BaseException] = None
+
+    def __repr__(self) -> str:
+        return f"Job({self.id}, {self.state.value})"
+
+    # state
+
+    def setState(self, state: JobState) -> None:
+        self.state = state
+        self.appendOutput(f"[{state.value}]", setStep=True)
+
+    def isFinished(self) -> bool:
+        return self.state.isFinished()
+
+    def isCancelRequested(self) -> bool:
+        return self._cancelRequested
+
+    def checkCancelled(self) -> None:
+        if self._cancelRequested:
+            raise JobCancelledError(f"Job {self.id} was cancelled.")
+
+    # output
+
+    def appendOutput(self, text: str, setStep: bool = False, transient: bool = False) -> None:
+        """Queue a log line (transient: progress update replaced by the next line)."""
+        self._output.append(text, setStep, transient)
+        if self.logFile is not None:
+            self.logFile.write(text, transient)
+
+    def takeOutput(self, maxItems: Optional[int] = None) -> List[LogItem]:
+        return self._output.take(maxItems)
+
+    def takeDroppedOutput(self) -> int:
+        """Number of queued lines dropped since the last call (the log window fell behind)."""
+        return self._output.takeDropped()
+
+    def pendingOutput(self) -> int:
+        return len(self._output)
+
+    def setProgress(self, snapshot) -> None:
+        self._progress = snapshot
+
+    def takeProgress(self):
+        """Latest progress snapshot reported since the last call (None if there is none)."""
+        snapshot, self._progress = self._progress, None
+        return snapshot
+
+    # worker
+
+    def attachProcess(self, proc) -> None:
+        with self._lock:
+            self._proc = proc
+
+        # cancelled while the process was starting
+        if self._cancelRequested:
+            self._killProcess()
+            if self._cancelHandler is not None:
+                self._cancelHandler(self)
+
+    def detachProcess(self) -> None:
+        with self._lock:
+            self._proc = None
+
+    def setWorkerStarted(self) -> None:
+        self._workerStarted = True
+
+    def isWorkerStarted(self) -> bool:
+        return self._workerStarted
+
+    def setWorkerResult(self, error: Optional[BaseException] = None) -> None:
+        self._workerError = error
+        self._workerDoneAt = time.time()
+        self._workerDone.set()
+
+    def isWorkerDone(self) -> bool:
+        return self._workerDone.is_set()
+
+    def getWorkerDoneAt(self) -> Optional[float]:
+        return self._workerDoneAt
+
+    def getWorkerError(self) -> Optional[BaseException]:
+        return self._workerError
+
+    def waitForWorker(self, timeout: Optional[float] = None) -> bool:
+        return self._workerDone.wait(timeout)
+
+    # cancel
+
+    def setCancelHandler(self, handler: Callable[['Job'], None]) -> None:
+        self._cancelHandler = handler
+
+    def cancel(self) -> None:
+        """Request cancellation. Kills the running process and (through the cancel handler) the container."""
+        if self.isFinished() or self._cancelRequested:
+            return
+        self._cancelRequested = True
+        self._killProcess()
+        if self._cancelHandler is not None:
+            self._cancelHandler(self)
+
+    def _killProcess(self) -> None:
+        with self._lock:
+            proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    # completion
+
+    def addDoneCallback(self, callback: Callable[['Job'], None]) -> None:
+        if self.isFinished():
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def finish(self, state: JobState, error: Optional[BaseException] = None) -> None:
+        """Mark the job as finished and run all completion callbacks (called on the main thread)."""
+        assert state.isFinished(), f"Invalid final state {state}."
+        self.state = state
+        self.error = error
+        self.finishedAt = time.time()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            # a failing callback must not skip the others (e.g. releasing the working directory)
+            try:
+                callback(self)
+            except Exception as e:
+                logging.exception(f"Completion callback of job {self.id} failed: {e}")
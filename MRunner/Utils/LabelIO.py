@@ -0,0 +1,100 @@
+"""
+-------------------------------------------------
+MedicalHub - Label File IO
+-------------------------------------------------
+
+Reads the (single-label) output files of a model in
+parallel and merges them into as few shared labelmaps
+as possible, so all of them can be imported into a
+segmentation node with a single call per labelmap.
+-------------------------------------------------
+"""
+
+from typing import List, Optional, Tuple
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LabelImage:
+    """Voxels (kji order) and geometry of a label file, with the time it took to read (and inflate) the file."""
+    __slots__ = ('path', 'array', 'ijkToRAS', 'readTime', 'fileSize')
+
+    def __init__(self, path: str, array, ijkToRAS: List[List[float]], readTime: float = 0.0, fileSize: int = 0) -> None:
+        self.path = path
+        self.array = array
+        self.ijkToRAS = ijkToRAS
+        self.readTime = readTime
+        self.fileSize = fileSize     # size of the (compressed) file in bytes
+
+    def getGeometryKey(self) -> Tuple:
+        return (self.array.shape, tuple(round(v, 6) for row in self.ijkToRAS for v in row))
+
+
+class MergedLabelmap:
+    """Labelmap of several label images. Label value i+1 is the i-th entry of indices (non-empty images only)."""
+    __slots__ = ('array', 'ijkToRAS', 'indices')
+
+    def __init__(self, array, ijkToRAS: List[List[float]]) -> None:
+        self.array = array
+        self.ijkToRAS = ijkToRAS
+        self.indices: List[int] = []
+
+
+def getIJKToRAS(image) -> List[List[float]]:
+    """IJK to RAS matrix of a SimpleITK image (itk images are in LPS)."""
+    spacing, origin, direction = image.GetSpacing(), image.GetOrigin(), image.GetDirection()
+    matrix = [[0.0] * 4 for _ in range(4)]
+    matrix[3][3] = 1.0
+    for r in range(3):
+        flip = -1.0 if r < 2 else 1.0
+        for c in range(3):
+            matrix[r][c] = flip * direction[3 * r + c] * spacing[c]
+        matrix[r][3] = flip * origin[r]
+    return matrix
+
+
+def readLabelFile(path: str) -> LabelImage:
+    import SimpleITK as sitk
+
+    start = time.time()
+    image = sitk.ReadImage(path)
+    return LabelImage(path, sitk.GetArrayFromImage(image), getIJKToRAS(image), time.time() - start, os.path.getsize(path))
+
+
+def readLabelFiles(paths: List[str], maxWorkers: Optional[int] = None) -> List[LabelImage]:
+    """Read all label files in parallel (order is preserved). Gzipped files (.nii.gz) are inflated
+       by the reader in memory, itk releases the GIL while reading, so they are inflated in parallel."""
+    maxWorkers = maxWorkers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="MRunnerLabelIO") as executor:
+        return list(executor.map(readLabelFile, paths))
+
+
+def mergeLabelImages(images: List[LabelImage]) -> List[MergedLabelmap]:
+    """Merge label images into shared labelmaps. Images with a different geometry or overlapping
+       voxels end up in another labelmap, empty images are skipped."""
+    import numpy as np
+
+    labelmaps: List[MergedLabelmap] = []
+    geometryKeys: List[Tuple] = []
+
+    for index, image in enumerate(images):
+        mask = image.array != 0
+        if not mask.any():
+            continue
+
+        # first labelmap with the same geometry that has no voxel of this label set yet
+        key = image.getGeometryKey()
+        target = None
+        for labelmap, labelmapKey in zip(labelmaps, geometryKeys):
+            if labelmapKey == key and not labelmap.array[mask].any():
+                target = labelmap
+                break
+        if target is None:
+            target = MergedLabelmap(np.zeros(image.array.shape, dtype=np.uint16), image.ijkToRAS)
+            labelmaps.append(target)
+            geometryKeys.append(key)
+
+        target.indices.append(index)
+        target.array[mask] = len(target.indices)
+
+    return labelmaps
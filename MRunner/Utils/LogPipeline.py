@@ -0,0 +1,160 @@
+"""
+-------------------------------------------------
+MedicalHub - Container Log Pipeline
+-------------------------------------------------
+
+Turns the raw output of model containers into log
+lines. Carriage return updates (tqdm progress bars)
+are transient: the next line replaces them, as in a
+terminal. The job buffer folds them and drops the
+oldest lines if the log window falls behind, the
+complete log of each run is written to a log file.
+-------------------------------------------------
+"""
+
+from typing import List, Optional, Tuple
+import os, re, time, codecs, threading
+from collections import deque
+
+LINE_END = re.compile(r'\r\n|\n|\r')
+
+LogItem = Tuple[str, bool, bool]   # text, setStep, transient
+
+
+class LineSplitter:
+    """Incremental decoder of a byte stream into (line, transient) tuples. Lines ended by a carriage return are transient."""
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._pending = ""
+        self._transient: Optional[str] = None   # last line, if it was transient
+
+    def feed(self, data: bytes) -> List[Tuple[str, bool]]:
+        text = self._pending + self._decoder.decode(data)
+        lines, start = [], 0
+        for match in LINE_END.finditer(text):
+            # a carriage return at the end might be followed by a newline in the next chunk
+            if match.group() == "\r" and match.end() == len(text):
+                break
+            self._addLine(lines, text[start:match.start()], match.group() == "\r")
+            start = match.end()
+        self._pending = text[start:]
+        return lines
+
+    def flush(self) -> List[Tuple[str, bool]]:
+        """Remaining lines at the end of the stream, the last progress update is kept as a regular line."""
+        lines = []
+        text = (self._pending + self._decoder.decode(b"", final=True)).rstrip("\r")
+        self._pending = ""
+        if text:
+            self._addLine(lines, text, False)
+        elif self._transient is not None:
+            self._addLine(lines, self._transient, False)
+        return lines
+
+    def _addLine(self, lines: List[Tuple[str, bool]], line: str, transient: bool) -> None:
+        line = line.rstrip()
+        if transient and not line:
+            # "\r" at the start of a progress update
+            return
+        self._transient = line if transient else None
+        lines.append((line, transient))
+
+
+class LogBuffer:
+    """Thread-safe queue of log items between a worker thread and the main thread.
+
+       A line replaces a queued transient line. At most maxLines lines are queued, older lines
+       are dropped (and counted) so a verbose model cannot stall the log window.
+    """
+
+    def __init__(self, maxLines: int = 10000) -> None:
+        self.maxLines = maxLines
+        self.dropped = 0
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+
+    def append(self, text: str, setStep: bool = False, transient: bool = False) -> None:
+        with self._lock:
+            if not setStep:
+                # the last line (skipping step updates) was a progress update
+                for index in range(len(self._items) - 1, -1, -1):
+                    if not self._items[index][1]:
+                        if self._items[index][2]:
+                            del self._items[index]
+                        break
+            self._items.append((text, setStep, transient))
+            while len(self._items) > self.maxLines:
+                self._items.popleft()
+                self.dropped += 1
+
+    def take(self, maxItems: Optional[int] = None) -> List[LogItem]:
+        with self._lock:
+            items = []
+            while self._items and (maxItems is None or len(items) < maxItems):
+                items.append(self._items.popleft())
+            return items
+
+    def takeDropped(self) -> int:
+        """Number of lines dropped since the last call."""
+        with self._lock:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RunLogFile:
+    """Complete log of a single run. Transient lines are only written if no line replaces them."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._transient: Optional[str] = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", errors="replace")
+
+    def write(self, text: str, transient: bool = False) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if transient:
+                self._transient = text
+                return
+            self._transient = None
+            self._file.write(text + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if self._transient is not None:
+                self._file.write(self._transient + "\n")
+            self._file.close()
+            self._file = None
+
+
+def getRunLogPath(dir: str, name: str) -> str:
+    return os.path.join(dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.log")
+
+
+def pruneRunLogs(dir: str, keep: int) -> List[str]:
+    """Remove all but the keep newest run logs in dir. Returns the removed paths."""
+    try:
+        paths = sorted((os.path.join(dir, fileName) for fileName in os.listdir(dir) if fileName.endswith(".log")), key=os.path.getmtime)
+    except OSError:
+        return []
+    removed = []
+    for path in paths[:max(0, len(paths) - keep)]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,76 @@
+"""
+-------------------------------------------------
+MedicalHub - Raw NRRD Writer
+-------------------------------------------------
+
+Writes a voxel array as a NRRD file with a detached
+header (image.nrrd + image.raw). The raw file is a
+plain dump of the array, no compression and no vtk
+writer pipeline, so it can be written straight into
+a tmpfs (/dev/shm) mount.
+-------------------------------------------------
+"""
+
+from typing import Sequence
+import os, sys
+
+NRRD_TYPES = {
+    "int8": "signed char", "uint8": "uchar",
+    "int16": "short", "uint16": "ushort",
+    "int32": "int", "uint32": "uint",
+    "int64": "longlong", "uint64": "ulonglong",
+    "float32": "float", "float64": "double",
+}
+
+
+def _vector(values: Sequence[float]) -> str:
+    return "(" + ",".join(f"{v:.17g}" for v in values) + ")"
+
+
+def writeDetachedNrrd(headerFile: str, voxels, ijkToRAS: Sequence[Sequence[float]]) -> str:
+    """Write voxels (numpy array in kji order, optionally with a trailing component axis) and
+       its 4x4 IJK to RAS matrix as detached header NRRD. Returns the path of the raw data file."""
+    if not voxels.dtype.isnative:
+        voxels = voxels.astype(voxels.dtype.newbyteorder("="))
+    if voxels.dtype.name not in NRRD_TYPES:
+        raise ValueError(f"Unsupported voxel type {voxels.dtype}.")
+
+    # nrrd axes are ordered fastest first (ijk), the array is in kji order
+    sizes = [voxels.shape[2], voxels.shape[1], voxels.shape[0]]
+
+    # ijk to lps: flip the first two (ras) coordinates
+    directions = [_vector([-ijkToRAS[0][a], -ijkToRAS[1][a], ijkToRAS[2][a]]) for a in range(3)]
+    origin = _vector([-ijkToRAS[0][3], -ijkToRAS[1][3], ijkToRAS[2][3]])
+    kinds = ["domain"] * 3
+
+    # multi-component volumes (e.g. rgb) have the component axis first in the file
+    if voxels.ndim == 4:
+        sizes = [voxels.shape[3]] + sizes
+        directions = ["none"] + directions
+        kinds = ["vector"] + kinds
+
+    rawFile = os.path.splitext(headerFile)[0] + ".raw"
+    header = [
+        "NRRD0004",
+        f"type: {NRRD_TYPES[voxels.dtype.name]}",
+        f"dimension: {len(sizes)}",
+        "space: left-posterior-superior",
+        f"sizes: {' '.join(str(s) for s in sizes)}",
+        f"space directions: {' '.join(directions)}",
+        f"kinds: {' '.join(kinds)}",
+        f"endian: {sys.byteorder}",
+        "encoding: raw",
+        f"space origin: {origin}",
+        f"data file: {os.path.basename(rawFile)}",
+    ]
+
+    # write data first, the header marks the file as complete
+    with open(rawFile, "wb") as f:
+        if voxels.flags["C_CONTIGUOUS"]:
+            f.write(memoryview(voxels).cast("B"))
+        else:
+            voxels.tofile(f)
+    with open(headerFile, "w") as f:
+        f.write("\n".join(header) + "\n")
+
+    return rawFile
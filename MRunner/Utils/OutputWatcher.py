@@ -0,0 +1,131 @@
+"""
+-------------------------------------------------
+MedicalHub - Output Directory Watcher
+-------------------------------------------------
+
+Watches the output directory of a running container and
+reports every expected output file as soon as it is
+completely written, so it can be imported while the
+model is still running. Uses inotify on linux (close
+after write / moved into place) and polls file sizes
+otherwise.
+-------------------------------------------------
+"""
+
+from typing import Iterable, List, Optional
+import os, sys, time, select, struct, threading
+from collections import deque
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _openInotify(dir: str) -> Optional[int]:
+    """Returns an inotify file descriptor watching dir (None if inotify is not available)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, dir.encode(), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _readEvents(fd: int) -> List[str]:
+    """Names of all files reported by the pending inotify events."""
+    names = []
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        names.append(data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="replace"))
+        offset += length
+    return names
+
+
+class OutputWatcher:
+
+    def __init__(self, dir: str, fileNames: Iterable[str], pollInterval: float = 0.5, settleTime: float = 2.0) -> None:
+        self.dir = dir
+        self.pollInterval = pollInterval
+        self.settleTime = settleTime        # polling: a file is complete if it did not change for this time (s)
+        self.mode: Optional[str] = None     # "inotify" or "polling" once started
+        self._pending = set(fileNames)
+        self._completed = deque()
+        self._stats = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="MRunnerOutputWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    def takeCompleted(self, maxItems: Optional[int] = None) -> List[str]:
+        """Names of expected files completed since the last call (thread-safe)."""
+        names = []
+        while self._completed and (maxItems is None or len(names) < maxItems):
+            names.append(self._completed.popleft())
+        return names
+
+    def _markCompleted(self, name: str) -> None:
+        if name in self._pending:
+            self._pending.discard(name)
+            self._completed.append(name)
+
+    def _run(self) -> None:
+        # inotify only reports files of the watched directory itself
+        fd = _openInotify(self.dir) if all(os.sep not in name and "/" not in name for name in self._pending) else None
+        self.mode = "inotify" if fd is not None else "polling"
+
+        try:
+            # files written before the watch was set up
+            for name in list(self._pending):
+                if fd is not None and os.path.isfile(os.path.join(self.dir, name)):
+                    self._markCompleted(name)
+
+            while self._pending and not self._stop.is_set():
+                if fd is not None:
+                    ready, _, _ = select.select([fd], [], [], self.pollInterval)
+                    if ready:
+                        for name in _readEvents(fd):
+                            self._markCompleted(name)
+                else:
+                    self._poll()
+                    self._stop.wait(self.pollInterval)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _poll(self) -> None:
+        now = time.time()
+        for name in list(self._pending):
+            try:
+                st = os.stat(os.path.join(self.dir, name))
+            except OSError:
+                continue
+            signature = (st.st_size, st.st_mtime)
+            previous = self._stats.get(name)
+            if previous is None or previous[0] != signature:
+                self._stats[name] = (signature, now)
+            elif st.st_size > 0 and now - previous[1] >= self.settleTime:
+                self._markCompleted(name)
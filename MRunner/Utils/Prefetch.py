@@ -0,0 +1,111 @@
+"""
+-------------------------------------------------
+MedicalHub - Image Prefetch
+-------------------------------------------------
+
+Pulls (or builds) the image of a selected model in the
+background before the user presses Apply. At most
+maxConcurrent prefetches run at a time, newer requests
+replace the oldest queued ones. A run of the same image
+joins the in-flight prefetch instead of starting its own.
+-------------------------------------------------
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import threading, time
+
+
+class PrefetchTask:
+    __slots__ = ('key', 'run', 'job', 'state', 'error', 'createdAt', 'startedAt', 'finishedAt', '_done')
+
+    def __init__(self, key: str, run: Callable[[], None], job: Any = None) -> None:
+        self.key = key
+        self.run = run
+        self.job = job                  # Utils.Jobs.Job receiving the output and progress of the prefetch
+        self.state = "queued"           # queued, running, done, failed, dropped
+        self.error: Optional[BaseException] = None
+        self.createdAt = time.time()
+        self.startedAt: Optional[float] = None
+        self.finishedAt: Optional[float] = None
+        self._done = threading.Event()
+
+    def __repr__(self) -> str:
+        return f"PrefetchTask({self.key}, {self.state})"
+
+    def isDone(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+
+class ImagePrefetcher:
+
+    def __init__(self, maxConcurrent: int = 1, maxQueued: int = 2) -> None:
+        self.maxConcurrent = maxConcurrent
+        self.maxQueued = maxQueued
+        self._tasks: Dict[str, PrefetchTask] = {}   # latest task by key
+        self._queue: List[PrefetchTask] = []
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def request(self, key: str, run: Callable[[], None], job: Any = None) -> PrefetchTask:
+        """Queue a prefetch. Returns the pending task of the same key if there is one."""
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is not None and task.state in ("queued", "running"):
+                return task
+
+            task = self._tasks[key] = PrefetchTask(key, run, job)
+            self._queue.append(task)
+
+            # the latest selections are the most likely to be run next
+            while len(self._queue) > self.maxQueued:
+                self._finish(self._queue.pop(0), "dropped")
+
+            self._startQueued()
+        return task
+
+    def getTask(self, key: str) -> Optional[PrefetchTask]:
+        return self._tasks.get(key)
+
+    def getPendingTasks(self) -> List[PrefetchTask]:
+        with self._lock:
+            return [task for task in self._tasks.values() if task.state in ("queued", "running")]
+
+    def cancel(self) -> None:
+        """Drop all queued prefetches and cancel the running ones (through their job)."""
+        with self._lock:
+            queued, self._queue = self._queue, []
+            for task in queued:
+                self._finish(task, "dropped")
+            running = [task for task in self._tasks.values() if task.state == "running"]
+        for task in running:
+            if task.job is not None:
+                task.job.cancel()
+
+    def _finish(self, task: PrefetchTask, state: str, error: Optional[BaseException] = None) -> None:
+        task.state = state
+        task.error = error
+        task.finishedAt = time.time()
+        task._done.set()
+
+    def _startQueued(self) -> None:
+        # called with the lock held
+        while self._queue and self._running < self.maxConcurrent:
+            task = self._queue.pop(0)
+            task.state = "running"
+            task.startedAt = time.time()
+            self._running += 1
+            threading.Thread(target=self._runTask, args=(task,), name=f"MRunnerPrefetch-{task.key}", daemon=True).start()
+
+    def _runTask(self, task: PrefetchTask) -> None:
+        error = None
+        try:
+            task.run()
+        except BaseException as e:
+            error = e
+        with self._lock:
+            self._running -= 1
+            self._finish(task, "failed" if error is not None else "done", error)
+            self._startQueued()
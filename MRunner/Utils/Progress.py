@@ -0,0 +1,271 @@
+"""
+-------------------------------------------------
+MedicalHub - Pull / Build Progress
+-------------------------------------------------
+
+Turns the progress events of docker pulls (per layer
+download and extract bytes) and builds (step N/M) into
+an overall percentage, throughput and ETA. Works with
+the structured events of the engine backend and with
+the text lines of the docker cli (layer states only).
+-------------------------------------------------
+"""
+
+from typing import Callable, Deque, Dict, Optional, Tuple
+import re, time
+from collections import deque
+
+# cli lines: "a1b2c3d4e5f6: Pull complete", classic builder: "Step 3/12 : RUN ...", buildkit: "#7 [3/12] RUN ..."
+CLI_LAYER_LINE = re.compile(r'^([0-9a-f]{12}): (.+)$')
+BUILD_STEP_LINE = re.compile(r'^Step (\d+)/(\d+) : (.*)$')
+BUILDKIT_STEP_LINE = re.compile(r'^#\d+ \[(?:[\w.-]+ )?\s*(\d+)/(\d+)\] (.*)$')
+
+
+def formatBytes(size: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if abs(size) < 1000:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1000
+    return f"{size:.1f} TB"
+
+
+def formatDuration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class ProgressSnapshot:
+    __slots__ = ('kind', 'name', 'fraction', 'bytesDone', 'bytesTotal', 'rate', 'eta', 'step', 'steps', 'detail', 'done', 'failed')
+
+    def __init__(self, kind: str, name: str, fraction: Optional[float] = None, bytesDone: int = 0, bytesTotal: int = 0,
+                 rate: Optional[float] = None, eta: Optional[float] = None, step: int = 0, steps: int = 0, detail: str = "", done: bool = False,
+                 failed: bool = False) -> None:
+        self.kind = kind            # "pull" or "build"
+        self.name = name            # image ref
+        self.fraction = fraction    # 0..1, None if unknown
+        self.bytesDone = bytesDone
+        self.bytesTotal = bytesTotal
+        self.rate = rate            # bytes / s (pull) or steps / s (build)
+        self.eta = eta              # s
+        self.step = step
+        self.steps = steps
+        self.detail = detail
+        self.done = done
+        self.failed = failed      # the pull / build stopped with an error
+
+    def getPercent(self) -> Optional[int]:
+        return int(self.fraction * 100) if self.fraction is not None else None
+
+    def getText(self) -> str:
+        parts = [f"{'Pulling' if self.kind == 'pull' else 'Building'} {self.name}"]
+        if self.failed:
+            parts.append("failed")
+            return ", ".join(parts) + (f"\n{self.detail}" if self.detail else "")
+        if self.fraction is not None:
+            parts.append(f"{self.getPercent()}%")
+        if self.kind == "pull" and self.bytesTotal:
+            parts.append(f"{formatBytes(self.bytesDone)} / {formatBytes(self.bytesTotal)}")
+        if self.kind == "pull" and self.rate:
+            parts.append(f"{formatBytes(self.rate)}/s")
+        if self.kind == "build" and self.steps:
+            parts.append(f"step {self.step}/{self.steps}")
+        if self.eta is not None and not self.done:
+            parts.append(f"ETA {formatDuration(self.eta)}")
+        text = ", ".join(parts)
+        return text + (f"\n{self.detail}" if self.detail else "")
+
+    def __repr__(self) -> str:
+        return f"ProgressSnapshot({self.getText()!r})"
+
+
+class LayerProgress:
+    __slots__ = ('id', 'status', 'downloaded', 'extracted', 'total', 'done')
+
+    def __init__(self, id: str) -> None:
+        self.id = id
+        self.status = ""
+        self.downloaded = 0
+        self.extracted = 0
+        self.total = 0      # compressed layer size (0: not known yet)
+        self.done = False
+
+
+class RateMeter:
+    """Throughput over a sliding time window."""
+
+    def __init__(self, window: float = 5.0) -> None:
+        self.window = window
+        self._samples: Deque[Tuple[float, float]] = deque()
+
+    def add(self, value: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._samples.append((now, value))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+
+    def getRate(self) -> Optional[float]:
+        if len(self._samples) < 2:
+            return None
+        (t0, v0), (t1, v1) = self._samples[0], self._samples[-1]
+        return (v1 - v0) / (t1 - t0) if t1 > t0 else None
+
+
+class PullProgress:
+    """Progress of an image pull. The download and the extraction of each layer count half."""
+
+    kind = "pull"
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.layers: Dict[str, LayerProgress] = {}
+        self.rateMeter = RateMeter()
+        self.detail = ""
+        self.done = False
+        self.failed = False
+
+    def update(self, event: dict) -> None:
+        # cli output line
+        if "stream" in event and "status" not in event:
+            match = CLI_LAYER_LINE.match(event["stream"].strip())
+            if match is None:
+                self.detail = event["stream"].strip() or self.detail
+                return
+            event = {"id": match.group(1), "status": match.group(2)}
+
+        status, id = event.get("status", ""), event.get("id")
+        if not id or status.startswith("Pulling from") or status.startswith("Digest") or status.startswith("Status"):
+            self.detail = status or self.detail
+            return
+
+        layer = self.layers.get(id)
+        if layer is None:
+            layer = self.layers[id] = LayerProgress(id)
+        layer.status = status
+
+        detail = event.get("progressDetail") or {}
+        if detail.get("total"):
+            layer.total = detail["total"]
+        if status == "Downloading" and detail.get("current") is not None:
+            layer.downloaded = detail["current"]
+        elif status == "Extracting" and detail.get("current") is not None:
+            layer.downloaded = layer.total
+            layer.extracted = detail["current"]
+        elif status in ("Download complete", "Verifying Checksum"):
+            layer.downloaded = layer.total
+        elif status in ("Pull complete", "Already exists"):
+            layer.downloaded = layer.extracted = layer.total
+            layer.done = True
+
+        self.rateMeter.add(sum(layer.downloaded for layer in self.layers.values()))
+
+    def finish(self) -> None:
+        self.done = True
+
+    def fail(self) -> None:
+        self.failed = True
+
+    def getSnapshot(self) -> ProgressSnapshot:
+        if self.failed:
+            return ProgressSnapshot(self.kind, self.name, detail=self.detail, failed=True)
+        layers = list(self.layers.values())
+        bytesTotal = sum(layer.total for layer in layers)
+        bytesDone = sum(layer.downloaded for layer in layers)
+
+        fraction = eta = None
+        if self.done:
+            fraction = 1.0
+        elif layers and all(layer.total or layer.done for layer in layers):
+            # all sizes known (engine)
+            fraction = sum(layer.downloaded + layer.extracted for layer in layers) / (2 * bytesTotal) if bytesTotal else 1.0
+        elif layers:
+            # no byte progress (cli), count completed layers
+            fraction = sum(1 for layer in layers if layer.done) / len(layers)
+
+        rate = self.rateMeter.getRate()
+        if rate and bytesTotal and not self.done:
+            # remaining download plus the extraction at the same speed
+            extracted = sum(layer.extracted for layer in layers)
+            eta = (bytesTotal - bytesDone) / rate + (bytesTotal - extracted) / rate / 2
+
+        return ProgressSnapshot(self.kind, self.name, fraction, bytesDone, bytesTotal, rate, eta, detail=self.detail, done=self.done)
+
+
+class BuildProgress:
+    """Progress of an image build by build step (classic builder and buildkit output)."""
+
+    kind = "build"
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.step = 0
+        self.steps = 0
+        self.detail = ""
+        self.done = False
+        self.failed = False
+        self.startedAt = time.monotonic()
+        self.stepStartedAt: Dict[int, float] = {}
+
+    def update(self, event: dict) -> None:
+        line = event.get("stream", "").strip()
+        if not line:
+            return
+        match = BUILD_STEP_LINE.match(line) or BUILDKIT_STEP_LINE.match(line)
+        if match is None:
+            return
+        step, steps = int(match.group(1)), int(match.group(2))
+        if step >= self.step:
+            self.step, self.steps = step, steps
+            self.detail = match.group(3)
+            self.stepStartedAt.setdefault(step, time.monotonic())
+
+    def finish(self) -> None:
+        self.done = True
+
+    def fail(self) -> None:
+        self.failed = True
+
+    def getSnapshot(self) -> ProgressSnapshot:
+        if self.failed:
+            return ProgressSnapshot(self.kind, self.name, step=self.step, steps=self.steps, detail=self.detail, failed=True)
+        fraction = eta = rate = None
+        if self.done:
+            fraction = 1.0
+        elif self.steps:
+            fraction = (self.step - 1) / self.steps
+
+            # average duration of the finished steps (cached steps may arrive within one clock tick)
+            firstStartedAt = self.stepStartedAt.get(min(self.stepStartedAt)) if self.stepStartedAt else None
+            finished = self.step - min(self.stepStartedAt) if self.stepStartedAt else 0
+            elapsed = self.stepStartedAt[self.step] - firstStartedAt if firstStartedAt is not None else 0.0
+            if finished > 0 and elapsed > 0:
+                rate = finished / elapsed
+                eta = (self.steps - self.step + 1) / rate
+
+        return ProgressSnapshot(self.kind, self.name, fraction, rate=rate, eta=eta, step=self.step, steps=self.steps, detail=self.detail, done=self.done)
+
+
+class ProgressReporter:
+    """Feeds events into a progress tracker and reports snapshots at most every interval seconds."""
+
+    def __init__(self, tracker, callback: Callable[[ProgressSnapshot], None], interval: float = 0.25) -> None:
+        self.tracker = tracker
+        self.callback = callback
+        self.interval = interval
+        self._reportedAt = 0.0
+
+    def update(self, event: dict) -> None:
+        self.tracker.update(event)
+        now = time.monotonic()
+        if now - self._reportedAt >= self.interval:
+            self._reportedAt = now
+            self.callback(self.tracker.getSnapshot())
+
+    def finish(self) -> None:
+        self.tracker.finish()
+        self.callback(self.tracker.getSnapshot())
+
+    def fail(self) -> None:
+        self.tracker.fail()
+        self.callback(self.tracker.getSnapshot())
@@ -9,11 +9,11 @@ Email:  leonard.nuernberg@maastrichtuniversity.nl
 -------------------------------------------------
 """
 
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from enum import Enum
 
-import os, json
-from .SegDB import Segment, Color
+import os, re, json
+from .SegDB import Segment, Color, getSegment, getDB
 
 """
  "models": [
@@ -35,35 +35,149 @@ from .SegDB import Segment, Color
     ]
 """
 
+class RepositoryError(ValueError):
+    pass
+
+
+BYTE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+IPC_MODES = ("host", "private", "shareable", "none")
+
+def parseByteSize(value: Union[int, float, str, None]) -> Optional[int]:
+    """ Bytes of a size hint: a number of GB or a docker style size string ("512m", "2g", "1.5gb"). """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid size {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value * 1024**3)
+    match = re.match(r'^(\d+(?:\.\d+)?)\s*([kmgt]?)b?$', str(value).strip().lower())
+    if match is None:
+        raise ValueError(f"Invalid size {value!r}")
+    return int(float(match.group(1)) * BYTE_UNITS[match.group(2)])
+
+
 class Repository:
     
-    def __init__(self, repo_json_file: str) -> None:
+    def __init__(self, repo_json_file: str, validate: bool = True) -> None:
         
         # load repo
         assert os.path.isfile(repo_json_file), f"Repository file not found {repo_json_file}"
         with open(repo_json_file, 'r') as f:
-            self.data = json.load(f)
+            self._load(json.load(f), validate)
+
+    @classmethod
+    def fromData(cls, data: dict, validate: bool = True) -> 'Repository':
+        """ Repository from already parsed repo.json data (e.g. a merged catalog, see Utils.Catalog). """
+        repo = cls.__new__(cls)
+        repo._load(data, validate)
+        return repo
+
+    def _load(self, data: dict, validate: bool) -> None:
+        self.data = data
+
+        # bad entries fail here instead of when a model is run
+        if validate:
+            self.validate()
+
+        # model objects are created once, name and tag lookups are indexed (the first model wins on duplicates)
+        self.models = [RepositoryModel(repo=self, data=model_data) for model_data in self.data['models']]
+        self.modelsByName: Dict[str, RepositoryModel] = {}
+        self.modelsByTag: Dict[str, RepositoryModel] = {}
+        for model in self.models:
+            self.modelsByName.setdefault(model.getName(), model)
+            if 'tag' in model.data:
+                self.modelsByTag.setdefault(model.data['tag'], model)
+
+    def validate(self) -> None:
+        """ Check all models of the repository, raises a RepositoryError listing all problems. """
+        if not isinstance(self.data, dict) or not isinstance(self.data.get('models'), list):
+            raise RepositoryError("Invalid repository: 'models' must be a list.")
+
+        problems = []
+        for i, model_data in enumerate(self.data['models']):
+            name = model_data.get('name', f"#{i}") if isinstance(model_data, dict) else f"#{i}"
+            problems += [f"model {name}: {problem}" for problem in validateModel(model_data)]
+
+        if problems:
+            raise RepositoryError("Invalid repository:\n" + "\n".join(problems))
 
     def getModels(self) -> List['RepositoryModel']:
-        models = []
-        for model_data in self.data['models']:
-            models.append(RepositoryModel(repo=self, data=model_data))
-        return models
+        return list(self.models)
 
     def getModelNames(self) -> List[str]:
-        return list(map(lambda x: f"{x['name']} ({x['tag']})", self.data['models']))
+        return [f"{model.getName()} ({model.data['tag']})" if 'tag' in model.data else model.getName() for model in self.models]
 
     def getModelByTag(self, tag: str) -> Optional['RepositoryModel']:
-        for model_data in self.data['models']:
-            if model_data['tag'] == tag:
-                return RepositoryModel(repo=self, data=model_data)
-        return None
+        return self.modelsByTag.get(tag)
 
     def getModelByName(self, name: str) -> Optional['RepositoryModel']:
-        for model_data in self.data['models']:
-            if model_data['name'] == name:
-                return RepositoryModel(repo=self, data=model_data)
-        return None
+        return self.modelsByName.get(name)
+
+
+def validateModel(data: any) -> List[str]:
+    """ Problems of a model definition (empty if the model is valid). """
+    if not isinstance(data, dict):
+        return ["not an object"]
+
+    problems = []
+    for key in ('name', 'label', 'type', 'dockerfile', 'output'):
+        if key not in data:
+            problems.append(f"missing '{key}'")
+    if problems:
+        return problems
+
+    if data['type'] not in [t.value for t in RepositoryModelType]:
+        problems.append(f"unknown type '{data['type']}'")
+    if not isinstance(data['dockerfile'], dict):
+        problems.append("'dockerfile' must be an object")
+    elif 'resources' in data['dockerfile']:
+        problems += validateResources(data['dockerfile']['resources'])
+
+    # output files, short form {segment_id: file} or long form [{"file": ..., "labels": {...}}]
+    if isinstance(data['output'], dict):
+        outputFiles = [{"file": file_name, "labels": {"1": segment_id}} for segment_id, file_name in data['output'].items()]
+    elif isinstance(data['output'], list):
+        outputFiles = data['output']
+    else:
+        return problems + ["'output' must be an object or a list"]
+
+    segmentations = getDB().segmentations
+    for of_data in outputFiles:
+        if not isinstance(of_data, dict) or not isinstance(of_data.get('file'), str) or not isinstance(of_data.get('labels'), dict):
+            problems.append(f"invalid output file {of_data}")
+            continue
+        for label, segment in of_data['labels'].items():
+            if not str(label).isdigit():
+                problems.append(f"{of_data['file']}: label '{label}' is not a positive integer")
+            if isinstance(segment, str):
+                if segment not in segmentations:
+                    problems.append(f"{of_data['file']}: unknown segment id '{segment}'")
+            elif not isinstance(segment, dict) or 'name' not in segment:
+                problems.append(f"{of_data['file']}: custom segment of label {label} needs a name")
+
+    return problems
+
+
+def validateResources(resources: any) -> List[str]:
+    """ Problems of the container resource hints of a model (dockerfile.resources). """
+    if not isinstance(resources, dict):
+        return ["'dockerfile.resources' must be an object"]
+
+    problems = []
+    for key in resources:
+        if key not in ('cpus', 'memory', 'shm', 'ipc'):
+            problems.append(f"unknown resource '{key}'")
+    if 'cpus' in resources and (isinstance(resources['cpus'], bool) or not isinstance(resources['cpus'], (int, float)) or resources['cpus'] <= 0):
+        problems.append("resource 'cpus' must be a positive number")
+    for key in ('memory', 'shm'):
+        if key in resources:
+            try:
+                parseByteSize(resources[key])
+            except ValueError:
+                problems.append(f"resource '{key}' must be a number of GB or a size like '512m' or '2g'")
+    if 'ipc' in resources and resources['ipc'] not in IPC_MODES:
+        problems.append(f"resource 'ipc' must be one of {', '.join(IPC_MODES)}")
+    return problems
 
 
 class RepositoryModelType(Enum):
@@ -99,40 +213,49 @@ class CustomSegment(Segment):
     # override
     def getColor(self) -> Optional['Color']:
         if "color" in self.data:
-            return Color(*self.data["color"])
+            if not hasattr(self, '_color'):
+                self._color = Color(*self.data["color"])
+            return self._color
         else:
             return None
 
 class ExpectedOutputFile:
     def __init__(self, data: any) -> None:
         self.data = data
+        self._labels: Optional[List['ExpectedOutputFileLabel']] = None
 
     def getFileName(self) -> str:
         return str(self.data["file"])
 
     def getLabels(self) -> List['ExpectedOutputFileLabel']:
-        labels = []
-        for k in self.data["labels"]:
-            label = int(k)
-            segment_id = self.data["labels"][k]
-            labels.append(ExpectedOutputFileLabel(self, label, segment_id))
-        return labels
+        if self._labels is None:
+            labels = []
+            for k in self.data["labels"]:
+                label = int(k)
+                segment_id = self.data["labels"][k]
+                labels.append(ExpectedOutputFileLabel(self, label, segment_id))
+            self._labels = labels
+        return list(self._labels)
 
 class ExpectedOutputFileLabel:
     def __init__(self, file: ExpectedOutputFile, label: int, segment: Union[str, object]) -> None:
         self.file = file
         self.label = label
         self.segment = segment
+        self._segment: Optional[Segment] = None
 
     def getSegment(self) -> Segment:
+        if self._segment is not None:
+            return self._segment
         if isinstance(self.segment, str):
             segment_id = self.segment
-            return Segment(segment_id)
+            self._segment = getSegment(segment_id)
         elif isinstance(self.segment, object):
             segment_data = self.segment
-            return CustomSegment(segment_data)
+            self._segment = CustomSegment(segment_data)
         else:
             raise TypeError(f"Invalid segment type {type(self.segment)}. Expect a segment id (str) or custom (object).")
+        return self._segment
 
     def getFile(self) -> ExpectedOutputFile:
         return self.file
@@ -187,6 +310,26 @@ class RepositoryModelDockerfile:
         else: 
             return None
 
+    def getResources(self) -> Dict[str, any]:
+        """ Optional resource hints for the model container, e.g. {"cpus": 4, "memory": "16g", "shm": "2g", "ipc": "host"}. """
+        resources = self.data.get("resources")
+        return dict(resources) if isinstance(resources, dict) else {}
+
+    def getCPUs(self) -> Optional[float]:
+        cpus = self.getResources().get("cpus")
+        return float(cpus) if cpus is not None else None
+
+    def getMemory(self) -> Optional[int]:
+        """ Memory limit hint in bytes. """
+        return parseByteSize(self.getResources().get("memory"))
+
+    def getShmSize(self) -> Optional[int]:
+        """ Shared memory (/dev/shm) size hint in bytes. """
+        return parseByteSize(self.getResources().get("shm"))
+
+    def getIpcMode(self) -> Optional[str]:
+        return self.getResources().get("ipc")
+
     def getDownloadPath(self, useGPU: bool = False) -> str:
         branch = self.getDownloadBranch()
         assert branch is not None
@@ -200,6 +343,8 @@ class RepositoryModel:
     def __init__(self, repo: Repository, data: any) -> None:
         self.repo = repo
         self.data = data
+        self._dockerfile: Optional[RepositoryModelDockerfile] = None
+        self._outputFiles: Optional[List[ExpectedOutputFile]] = None
 
 
     def getName(self) -> str:
@@ -212,12 +357,19 @@ class RepositoryModel:
         return RepositoryModelType(self.data['type'])
 
     def getDockerfile(self) -> RepositoryModelDockerfile:
-        return RepositoryModelDockerfile(self, self.data['dockerfile'])
+        if self._dockerfile is None:
+            self._dockerfile = RepositoryModelDockerfile(self, self.data['dockerfile'])
+        return self._dockerfile
     
     def getConfig(self) -> None:
         return None
 
     def getOutputFiles(self) -> List[ExpectedOutputFile]:
+        if self._outputFiles is None:
+            self._outputFiles = self._createOutputFiles()
+        return list(self._outputFiles)
+
+    def _createOutputFiles(self) -> List[ExpectedOutputFile]:
         output_files = []
 
         # short form : {segment_id1: file_name1, segment_id2: file_name2, ...}
@@ -239,4 +391,8 @@ class RepositoryModel:
             for of_data in self.data['output']:
                 output_files.append(ExpectedOutputFile(of_data))
 
-        return output_files
\ No newline at end of file
+        return output_files
+
+    def getSegments(self) -> List[Segment]:
+        """ All segments of the model (in output file and label order). """
+        return [label.getSegment() for of in self.getOutputFiles() for label in of.getLabels()]
\ No newline at end of file
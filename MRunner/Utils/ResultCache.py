@@ -0,0 +1,143 @@
+"""
+-------------------------------------------------
+MedicalHub - Inference Result Cache
+-------------------------------------------------
+
+Content-addressed, size-bounded on-disk cache of model
+outputs. Entries are keyed by a hash of the input data,
+the model, the image digest and the gpu flag and are
+evicted in least-recently-used order.
+-------------------------------------------------
+"""
+
+from typing import Iterable, List, Optional
+import os, json, shutil, hashlib, time, threading
+
+ENTRY_FILE = "entry.json"
+
+
+class ResultCacheEntry:
+    __slots__ = ('key', 'dir', 'model', 'files', 'bytes', 'created', 'lastUsed')
+
+    def __init__(self, key: str, dir: str, data: dict) -> None:
+        self.key = key
+        self.dir = dir
+        self.model = str(data.get("model", ""))
+        self.files = list(data.get("files", []))
+        self.bytes = int(data.get("bytes", 0))
+        self.created = float(data.get("created", 0))
+        self.lastUsed = float(data.get("lastUsed", 0))
+
+    def toDict(self) -> dict:
+        return {"key": self.key, "model": self.model, "files": self.files, "bytes": self.bytes, "created": self.created, "lastUsed": self.lastUsed}
+
+
+class ResultCache:
+
+    def __init__(self, rootDir: str, maxBytes: int) -> None:
+        self.rootDir = rootDir
+        self.maxBytes = maxBytes
+        self._lock = threading.Lock()
+        os.makedirs(self.rootDir, exist_ok=True)
+
+    @staticmethod
+    def computeKey(inputHash: str, modelName: str, outputFiles: Iterable[str], imageDigest: str, useGPU: bool) -> str:
+        h = hashlib.sha256()
+        for part in (inputHash, modelName, ",".join(sorted(outputFiles)), imageDigest, "gpu" if useGPU else "cpu"):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _getEntryDir(self, key: str) -> str:
+        return os.path.join(self.rootDir, key[:2], key)
+
+    def _readEntry(self, entryDir: str) -> Optional[ResultCacheEntry]:
+        try:
+            with open(os.path.join(entryDir, ENTRY_FILE), "r") as f:
+                data = json.load(f)
+            return ResultCacheEntry(data["key"], entryDir, data)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _writeEntry(self, entry: ResultCacheEntry) -> None:
+        entryFile = os.path.join(entry.dir, ENTRY_FILE)
+        with open(entryFile + ".tmp", "w") as f:
+            json.dump(entry.toDict(), f)
+        os.replace(entryFile + ".tmp", entryFile)
+
+    def lookup(self, key: str) -> Optional[ResultCacheEntry]:
+        """Returns the cache entry (and marks it as recently used) or None on a miss."""
+        with self._lock:
+            entry = self._readEntry(self._getEntryDir(key))
+            if entry is None or not all(os.path.isfile(os.path.join(entry.dir, f)) for f in entry.files):
+                return None
+            entry.lastUsed = time.time()
+            self._writeEntry(entry)
+            return entry
+
+    def store(self, key: str, sourceDir: str, files: List[str], model: str = "") -> ResultCacheEntry:
+        """Add the output files of a run (hard-linked if possible) and evict least recently used entries."""
+        entryDir = self._getEntryDir(key)
+        stagingDir = entryDir + f".tmp{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(stagingDir, ignore_errors=True)
+
+        size = 0
+        for fileName in files:
+            src, dst = os.path.join(sourceDir, fileName), os.path.join(stagingDir, fileName)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
+            size += os.path.getsize(dst)
+
+        now = time.time()
+        entry = ResultCacheEntry(key, stagingDir, {"model": model, "files": files, "bytes": size, "created": now, "lastUsed": now})
+        self._writeEntry(entry)
+
+        with self._lock:
+            shutil.rmtree(entryDir, ignore_errors=True)
+            os.rename(stagingDir, entryDir)
+            entry.dir = entryDir
+            self._evict(keep=key)
+
+        return entry
+
+    def getEntries(self) -> List[ResultCacheEntry]:
+        entries = []
+        for prefix in os.listdir(self.rootDir):
+            prefixDir = os.path.join(self.rootDir, prefix)
+            if not os.path.isdir(prefixDir):
+                continue
+            for name in os.listdir(prefixDir):
+                entry = self._readEntry(os.path.join(prefixDir, name))
+                if entry is not None:
+                    entries.append(entry)
+        return entries
+
+    def getTotalBytes(self) -> int:
+        return sum(entry.bytes for entry in self.getEntries())
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        entries = sorted(self.getEntries(), key=lambda entry: entry.lastUsed)
+        total = sum(entry.bytes for entry in entries)
+        for entry in entries:
+            if total <= self.maxBytes:
+                break
+            if entry.key == keep:
+                continue
+            shutil.rmtree(entry.dir, ignore_errors=True)
+            total -= entry.bytes
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            shutil.rmtree(self._getEntryDir(key), ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.rootDir):
+                shutil.rmtree(os.path.join(self.rootDir, name), ignore_errors=True)
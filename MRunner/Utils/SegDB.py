@@ -1,19 +1,66 @@
-from typing import Optional, List
-import os, json, yaml, pandas as pd, numpy as np
+from typing import Optional, List, Dict
+from functools import lru_cache
+import os, csv, threading
 
 # global ressource path (./data)
 YMLSEG_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Resources', 'SegDB')
 
+class CodeRecord:
+    __slots__ = ('CodeValue', 'CodingSchemeDesignator', 'CodeMeaning')
+
+    def __init__(self, row: Dict[str, str]) -> None:
+        self.CodeValue = int(row['CodeValue'])
+        self.CodingSchemeDesignator = row['CodingSchemeDesignator']
+        self.CodeMeaning = row['CodeMeaning']
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+class SegmentRecord:
+    __slots__ = ('id', 'name', 'category', 'type', 'modifyer', 'color')
+
+    def __init__(self, row: Dict[str, str]) -> None:
+        self.id = row['id']
+        self.name = row['name']
+        self.category = int(row['category'])
+        self.type = int(row['type'])
+        self.modifyer = int(row['modifyer']) if row['modifyer'] else None # TODO: fix spelling
+        self.color = row['color'] or None
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
 class DB:
     def __init__(self) -> None:
 
-        # load ressources
-        self.categories = pd.read_csv(os.path.join(YMLSEG_DATA_DIR, 'categories.csv')).set_index('CodeValue')
-        self.types = pd.read_csv(os.path.join(YMLSEG_DATA_DIR, 'types.csv')).set_index('CodeValue')
-        self.modifiers = pd.read_csv(os.path.join(YMLSEG_DATA_DIR, 'modifyers.csv')).set_index('CodeValue')
-        self.segmentations = pd.read_csv(os.path.join(YMLSEG_DATA_DIR, 'segmentations.csv')).set_index('id') 
-
-db = DB()
+        # load ressources (plain csv, indexed by code value / id)
+        self.categories = self._load('categories.csv', CodeRecord, 'CodeValue')
+        self.types = self._load('types.csv', CodeRecord, 'CodeValue')
+        self.modifiers = self._load('modifyers.csv', CodeRecord, 'CodeValue')
+        self.segmentations = self._load('segmentations.csv', SegmentRecord, 'id')
+
+    def _load(self, file_name: str, record_class: type, key: str) -> dict:
+        with open(os.path.join(YMLSEG_DATA_DIR, file_name), 'r', newline='', encoding='utf-8') as f:
+            records = (record_class(row) for row in csv.DictReader(f))
+            return {getattr(record, key): record for record in records}
+
+_db: Optional[DB] = None
+_db_lock = threading.Lock()
+
+def getDB() -> DB:
+    """ The database is loaded on first use. """
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = DB()
+    return _db
+
+def __getattr__(name: str):
+    # backwards compatibility for the former module level db instance
+    if name == 'db':
+        return getDB()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Item:
     def __init__(self, db: DB) -> None:
@@ -25,36 +72,30 @@ class Segment:
 
         # lookup id
         self.id = id
-        self.data = db.segmentations.loc[id]
+        self.data = getDB().segmentations[id]
 
     def getID(self) -> str:
         return self.id
 
     def getCategory(self) -> 'Category':
         category_cv = self.data.category # TODO: fix spelling
-        return Category(category_cv) 
+        return getCategory(category_cv)
 
     def getType(self) -> 'Type':
         type_cv = self.data.type # TODO: fix spelling
-        return Type(type_cv)
+        return getType(type_cv)
 
     def getModifier(self) -> Optional['Modifier']:
         modifier_cv = self.data.modifyer # TODO: fix spelling
-        if np.isnan(modifier_cv):
+        if modifier_cv is None:
             return None
-        return Modifier(modifier_cv)
+        return getModifier(modifier_cv)
 
     def getName(self) -> str:
         return str(self.data['name'])
 
     def getColor(self) -> Optional['Color']:
-        try:
-            rgb = self.data["color"].split(",")
-            assert len(rgb) == 3
-        except:
-            return None
-
-        return Color(*map(int, rgb))
+        return parseColor(self.data["color"])
 
     def __str__(self) -> str:
         c = self.getCategory().getCodeMeaning()
@@ -66,7 +107,7 @@ class Modifier:
     def __init__(self, cv: int) -> None:
         
         # lookup code value
-        self.data = db.modifiers.loc[cv]
+        self.data = getDB().modifiers[int(cv)]
 
     def getCodeMeaning(self) -> str:
         return str(self.data['CodeMeaning'])
@@ -78,7 +119,7 @@ class Type:
     def __init__(self, cv: int) -> None:
         
         # lookup code value
-        self.data = db.types.loc[cv]
+        self.data = getDB().types[int(cv)]
 
     def getCodeMeaning(self) -> str:
         return str(self.data['CodeMeaning'])
@@ -90,7 +131,7 @@ class Category:
     def __init__(self, cv: int) -> None:
     
         # lookup code value
-        self.data = db.categories.loc[cv]
+        self.data = getDB().categories[int(cv)]
 
     def getCodeMeaning(self) -> str:
         return str(self.data['CodeMeaning'])
@@ -120,9 +161,40 @@ class Color:
         return self.b
 
 
+# interned (shared) objects: every segment id, code value and color is resolved once per process
+
+@lru_cache(maxsize=None)
+def getSegment(id: str) -> Segment:
+    return Segment(id)
+
+@lru_cache(maxsize=None)
+def getCategory(cv: int) -> Category:
+    return Category(cv)
+
+@lru_cache(maxsize=None)
+def getType(cv: int) -> Type:
+    return Type(cv)
+
+@lru_cache(maxsize=None)
+def getModifier(cv: int) -> Modifier:
+    return Modifier(cv)
+
+@lru_cache(maxsize=None)
+def parseColor(rgb: Optional[str]) -> Optional[Color]:
+    """ Color from a "r,g,b" string (None if the string is invalid). """
+    try:
+        components = rgb.split(",")
+        assert len(components) == 3
+        return Color(*map(int, components))
+    except:
+        return None
+
+
 class YMLSEG:
     def __init__(self, config_file: str) -> None:
         
+        import yaml
+
         assert os.path.isfile(config_file), f"Config file not found: {config_file}"
         with open(config_file, 'r') as f:
             self.config = yaml.safe_load(f)
@@ -133,7 +205,7 @@ class YMLSEG:
     def getSegments(self) -> List[Segment]:
         segments: List[Segment] = []
         for segment_id in self.config["segments"]:
-            segments.append(Segment(segment_id))
+            segments.append(getSegment(segment_id))
  
         return segments
 
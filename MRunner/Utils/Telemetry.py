@@ -0,0 +1,251 @@
+"""
+-------------------------------------------------
+MedicalHub - Run Telemetry
+-------------------------------------------------
+
+Per-run span tree (export, image check, pull / build,
+container, import, ...) with wall time, cpu time of the
+calling thread, bytes read / written and the peak rss
+sampled while the stage ran. Io and rss are counters of
+the whole process, they include concurrent runs. A run
+is bound to the current thread with activate(), nested
+code opens spans through the module level span() (no-op
+without an active run). Finished runs are appended as
+JSON lines to a local log.
+-------------------------------------------------
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os, sys, json, time, threading, contextlib
+
+_local = threading.local()
+
+
+def _readIOCounters() -> Tuple[int, int]:
+    """Bytes read / written by the process (linux: all file and pipe io, 0 elsewhere)."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(":", 1) for line in f)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def _readRSS() -> int:
+    """Current resident set size of the process in bytes (linux and windows, 0 elsewhere)."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD), ("PeakWorkingSetSize", ctypes.c_size_t),
+                        ("WorkingSetSize", ctypes.c_size_t), ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t), ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t), ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return 0
+        return counters.WorkingSetSize
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class _RSSSampler:
+    """Samples the rss every interval seconds on a daemon thread while spans are open and raises their peak."""
+
+    def __init__(self, interval: float = 0.1) -> None:
+        self.interval = interval
+        self._spans: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, span: 'Span') -> None:
+        with self._lock:
+            self._spans.add(span)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="MRunner-rss", daemon=True)
+                self._thread.start()
+
+    def remove(self, span: 'Span') -> None:
+        with self._lock:
+            self._spans.discard(span)
+
+    def _run(self) -> None:
+        while True:
+            rss = _readRSS()
+            with self._lock:
+                if not self._spans:
+                    self._thread = None
+                    return
+                for span in self._spans:
+                    span.peakRSS = max(span.peakRSS, rss)
+            time.sleep(self.interval)
+
+
+_sampler = _RSSSampler()
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'children', 'start', 'duration', 'cpu', 'bytesRead', 'bytesWritten', 'peakRSS', 'error', '_t0', '_cpu0', '_io0')
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.children: List['Span'] = []
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.cpu = 0.0
+        self.bytesRead = 0
+        self.bytesWritten = 0
+        self.peakRSS = _readRSS()
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.thread_time()
+        self._io0 = _readIOCounters()
+        _sampler.add(self)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        self.cpu = time.thread_time() - self._cpu0
+        io = _readIOCounters()
+        self.bytesRead, self.bytesWritten = io[0] - self._io0[0], io[1] - self._io0[1]
+        _sampler.remove(self)
+        self.peakRSS = max(self.peakRSS, _readRSS())
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def toDict(self) -> dict:
+        data = {"name": self.name, "start": self.start, "wall": self.duration, "cpu": self.cpu,
+                "read": self.bytesRead, "written": self.bytesWritten, "peakRSS": self.peakRSS}
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.toDict() for child in self.children]
+        return data
+
+    def walk(self, depth: int = 0) -> Iterator[Tuple[int, 'Span']]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class RunTelemetry:
+    """Span tree of a single run. Spans may be opened on several threads (each thread nests its own spans)."""
+
+    def __init__(self, runId: str, name: str = "run", attrs: Optional[Dict[str, Any]] = None) -> None:
+        self.runId = runId
+        self.root = Span(name, attrs)
+        self.state: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stacks: Dict[int, List[Span]] = {}
+
+    def _getStack(self) -> List[Span]:
+        return self._stacks.setdefault(threading.get_ident(), [self.root])
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        stack = self._getStack()
+        span = Span(name, attrs)
+        with self._lock:
+            stack[-1].children.append(span)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            span.end()
+            stack.pop()
+
+    def finish(self, state: str, error: Optional[BaseException] = None) -> None:
+        self.state = state
+        self.root.end(error)
+
+    def toDict(self) -> dict:
+        return {"run": self.runId, "state": self.state, **self.root.toDict()}
+
+    def getRows(self) -> List[Tuple[str, Span]]:
+        """(indented name, span) of all spans in tree order, e.g. for a breakdown table."""
+        return [("  " * depth + span.name, span) for depth, span in self.root.walk()]
+
+    def formatTable(self) -> str:
+        """Breakdown table, io and rss are process-wide (see module docstring)."""
+        lines = [f"{'stage':<28} {'wall s':>8} {'cpu s':>8} {'read MB*':>9} {'written MB*':>11} {'peak RSS MB*':>12}"]
+        for name, span in self.getRows():
+            wall = span.duration if span.duration is not None else float("nan")
+            lines.append(f"{name:<28} {wall:>8.2f} {span.cpu:>8.2f} {span.bytesRead / 1e6:>9.1f} {span.bytesWritten / 1e6:>11.1f} {span.peakRSS / 1e6:>12.0f}")
+        lines.append("* whole process, includes concurrent runs")
+        return "\n".join(lines)
+
+
+class TelemetryLog:
+    """Append-only JSON lines file of finished runs (rotated once it exceeds maxBytes)."""
+
+    def __init__(self, path: str, maxBytes: int = 10 * 1024**2) -> None:
+        self.path = path
+        self.maxBytes = maxBytes
+        self._lock = threading.Lock()
+
+    def append(self, telemetry: RunTelemetry) -> None:
+        line = json.dumps(telemetry.toDict()) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.isfile(self.path) and os.path.getsize(self.path) > self.maxBytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def read(self, limit: Optional[int] = None) -> List[dict]:
+        """The last limit records (all if None)."""
+        try:
+            with open(self.path, "r") as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines[-limit:] if limit else lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass
+        return records
+
+
+#
+# thread bound runs
+#
+
+def getActive() -> Optional[RunTelemetry]:
+    return getattr(_local, "telemetry", None)
+
+
+@contextlib.contextmanager
+def activate(telemetry: Optional[RunTelemetry]) -> Iterator[Optional[RunTelemetry]]:
+    """Bind a run to the current thread for the duration of the block."""
+    previous = getActive()
+    _local.telemetry = telemetry
+    try:
+        yield telemetry
+    finally:
+        _local.telemetry = previous
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Open a span in the run bound to the current thread (no-op if there is none)."""
+    telemetry = getActive()
+    if telemetry is None:
+        yield None
+        return
+    with telemetry.span(name, **attrs) as s:
+        yield s
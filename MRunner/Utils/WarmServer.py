@@ -0,0 +1,170 @@
+"""
+-------------------------------------------------
+MedicalHub - Warm Model Server Client
+-------------------------------------------------
+
+Client side of the warm server protocol (see
+Resources/Scripts/warm_server.py). Jobs are exchanged
+through the server directory that is mounted into the
+long-lived model container.
+-------------------------------------------------
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import os, json, shutil, threading, time
+
+from .LogPipeline import LineSplitter
+
+REQUEST_FILE = "request.json"
+RESPONSE_FILE = "response.json"
+LOG_FILE = "log.txt"
+HEARTBEAT_FILE = "heartbeat"
+SHUTDOWN_FILE = "shutdown"
+CANCEL_FILE = "cancel"
+
+
+class WarmServerError(Exception):
+    pass
+
+
+class WarmServer:
+    """A warm server for one (model, gpu) combination."""
+
+    def __init__(self, key: Tuple[str, bool], containerName: str, serverDir: str) -> None:
+        self.key = key
+        self.containerName = containerName
+        self.serverDir = serverDir
+        self.jobsDir = os.path.join(serverDir, "jobs")
+        self.startedAt: Optional[float] = None
+        self.lastUsed = time.time()
+        self.busy = 0
+        self.startLock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"WarmServer({self.containerName}, busy={self.busy})"
+
+    # server state
+
+    def getHeartbeatAge(self) -> Optional[float]:
+        try:
+            with open(os.path.join(self.serverDir, HEARTBEAT_FILE), "r") as f:
+                return time.time() - float(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def isAlive(self, maxHeartbeatAge: float = 15.0) -> bool:
+        age = self.getHeartbeatAge()
+        return age is not None and age < maxHeartbeatAge
+
+    def reset(self) -> None:
+        """Remove all state of a previous server (call before starting a new container)."""
+        shutil.rmtree(self.serverDir, ignore_errors=True)
+        os.makedirs(self.jobsDir)
+
+    def requestShutdown(self) -> None:
+        with open(os.path.join(self.serverDir, SHUTDOWN_FILE), "w") as f:
+            f.write(str(time.time()))
+
+    # jobs
+
+    def createJobDir(self, jobId: str) -> str:
+        """Create a (hidden) staging directory for a job, see submit."""
+        stagingDir = os.path.join(self.jobsDir, f".{jobId}")
+        os.makedirs(stagingDir)
+        return stagingDir
+
+    def cancel(self, jobId: str) -> None:
+        """Cancel a submitted job: the server skips it or drops its output, other jobs and the server keep running."""
+        for jobDir in (os.path.join(self.jobsDir, jobId), os.path.join(self.jobsDir, f".{jobId}")):
+            if os.path.isdir(jobDir):
+                try:
+                    with open(os.path.join(jobDir, CANCEL_FILE), "w") as f:
+                        f.write(str(time.time()))
+                except OSError:
+                    pass
+
+    def submit(self, jobId: str, request: dict) -> str:
+        """Publish a staged job. Returns the job directory the server reads from and writes to."""
+        stagingDir = os.path.join(self.jobsDir, f".{jobId}")
+        jobDir = os.path.join(self.jobsDir, jobId)
+        os.rename(stagingDir, jobDir)
+
+        requestFile = os.path.join(jobDir, REQUEST_FILE)
+        with open(requestFile + ".tmp", "w") as f:
+            json.dump(request, f)
+        os.replace(requestFile + ".tmp", requestFile)
+
+        self.lastUsed = time.time()
+        return jobDir
+
+    def wait(self, jobDir: str, logCallback: Optional[Callable[[str, bool], None]] = None, isCancelled: Optional[Callable[[], bool]] = None,
+             startupTimeout: float = 300.0, pollInterval: float = 0.2) -> dict:
+        """Wait for the response of a job, forwarding new lines of the job log as (line, transient). Raises WarmServerError if the server dies."""
+        logFile = os.path.join(jobDir, LOG_FILE)
+        responseFile = os.path.join(jobDir, RESPONSE_FILE)
+        logOffset = 0
+        splitter = LineSplitter()
+        submittedAt = time.time()
+
+        while True:
+            done = os.path.isfile(responseFile)
+
+            # forward new log lines
+            if logCallback is not None and os.path.isfile(logFile):
+                with open(logFile, "rb") as f:
+                    f.seek(logOffset)
+                    data = f.read()
+                logOffset += len(data)
+                lines = splitter.feed(data) + (splitter.flush() if done else [])
+                for line, transient in lines:
+                    logCallback(line, transient)
+
+            if done:
+                with open(responseFile, "r") as f:
+                    response = json.load(f)
+                self.lastUsed = time.time()
+                return response
+
+            if isCancelled is not None and isCancelled():
+                raise WarmServerError("Job cancelled.")
+
+            # the server must report a heartbeat (it might still be starting)
+            age = self.getHeartbeatAge()
+            if age is None and time.time() - submittedAt > startupTimeout:
+                raise WarmServerError(f"Warm server {self.containerName} did not start within {startupTimeout:.0f} seconds.")
+            if age is not None and age > 60.0:
+                raise WarmServerError(f"Warm server {self.containerName} stopped responding.")
+
+            time.sleep(pollInterval)
+
+
+class WarmServerPool:
+    """Registry of running warm servers keyed by (model name, gpu flag)."""
+
+    def __init__(self, rootDir: str) -> None:
+        self.rootDir = rootDir
+        self.servers: Dict[Tuple[str, bool], WarmServer] = {}
+
+    def getKey(self, modelName: str, useGPU: bool) -> Tuple[str, bool]:
+        return (modelName.lower(), bool(useGPU))
+
+    def getServer(self, modelName: str, useGPU: bool) -> Optional[WarmServer]:
+        return self.servers.get(self.getKey(modelName, useGPU))
+
+    def createServer(self, modelName: str, useGPU: bool) -> WarmServer:
+        key = self.getKey(modelName, useGPU)
+        suffix = "gpu" if useGPU else "cpu"
+        server = WarmServer(key, f"mrunner-warm-{key[0]}-{suffix}", os.path.join(self.rootDir, f"{key[0]}-{suffix}"))
+        self.servers[key] = server
+        return server
+
+    def removeServer(self, server: WarmServer) -> None:
+        if self.servers.get(server.key) is server:
+            del self.servers[server.key]
+
+    def getIdleServers(self, idleTimeout: float) -> List[WarmServer]:
+        now = time.time()
+        return [s for s in self.servers.values() if s.busy == 0 and now - s.lastUsed > idleTimeout]
+
+    def getAllServers(self) -> List[WarmServer]:
+        return list(self.servers.values())
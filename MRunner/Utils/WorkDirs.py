@@ -0,0 +1,126 @@
+"""
+-------------------------------------------------
+MedicalHub - Working Directories
+-------------------------------------------------
+
+Managed per-run working directories (model input and
+output, downloaded dockerfiles). Directories are removed
+once a run is finished, optionally the last N runs are
+kept for debugging. A byte quota over all directories is
+enforced before a new directory is created.
+-------------------------------------------------
+"""
+
+from typing import List, Optional, Set, Tuple
+import os, json, shutil, tempfile, threading, time
+
+DONE_FILE = ".mrunner_done"
+
+
+class WorkDirQuotaError(Exception):
+    pass
+
+
+def getDirectorySize(path: str, seen: Optional[Set[Tuple[int, int]]] = None) -> int:
+    """Size of all files below path in bytes, hard-linked files are counted once."""
+    seen = set() if seen is None else seen
+    size = 0
+    for root, _, files in os.walk(path):
+        for fileName in files:
+            try:
+                st = os.lstat(os.path.join(root, fileName))
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            size += st.st_size
+    return size
+
+
+class WorkDirManager:
+
+    def __init__(self, rootDir: str, keepLast: int = 0, maxBytes: int = 0, staleAge: float = 24 * 3600) -> None:
+        self.rootDir = rootDir
+        self.keepLast = keepLast        # number of finished directories kept for debugging
+        self.maxBytes = maxBytes        # 0: no quota
+        self.staleAge = staleAge        # unfinished directories of earlier sessions are removed after this time (s)
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.rootDir, exist_ok=True)
+        self.removeStale()
+
+    def _getDirs(self) -> List[str]:
+        return [os.path.join(self.rootDir, name) for name in sorted(os.listdir(self.rootDir)) if os.path.isdir(os.path.join(self.rootDir, name))]
+
+    def _getFinishedDirs(self) -> List[str]:
+        """Finished (kept) directories, oldest first."""
+        dirs = [d for d in self._getDirs() if d not in self._active and os.path.isfile(os.path.join(d, DONE_FILE))]
+        return sorted(dirs, key=lambda d: os.path.getmtime(os.path.join(d, DONE_FILE)))
+
+    def create(self, kind: str, name: str, requiredBytes: int = 0) -> str:
+        """Create a new working directory. Raises WorkDirQuotaError if the quota cannot be met."""
+        self.enforceQuota(requiredBytes)
+        with self._lock:
+            path = tempfile.mkdtemp(prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{name}-", dir=self.rootDir)
+            self._active.add(path)
+        return path
+
+    def release(self, path: str, state: str = "") -> None:
+        """Mark a directory as finished, it is kept if keepLast > 0 (and the quota allows) and removed otherwise."""
+        with self._lock:
+            self._active.discard(path)
+            if not os.path.isdir(path):
+                return
+            if self.keepLast <= 0:
+                shutil.rmtree(path, ignore_errors=True)
+                return
+            with open(os.path.join(path, DONE_FILE), "w") as f:
+                json.dump({"state": state, "finished": time.time()}, f)
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = self._getFinishedDirs()
+        for path in finished[:max(0, len(finished) - self.keepLast)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def getUsage(self) -> int:
+        """Size of all working directories in bytes."""
+        seen: Set[Tuple[int, int]] = set()
+        return sum(getDirectorySize(path, seen) for path in self._getDirs())
+
+    def enforceQuota(self, requiredBytes: int = 0) -> None:
+        """Remove finished directories (oldest first) until requiredBytes fit into the quota."""
+        if self.maxBytes <= 0:
+            return
+        with self._lock:
+            usage = self.getUsage()
+            for path in self._getFinishedDirs():
+                if usage + requiredBytes <= self.maxBytes:
+                    break
+                size = getDirectorySize(path)
+                shutil.rmtree(path, ignore_errors=True)
+                usage -= size
+            if usage + requiredBytes > self.maxBytes:
+                raise WorkDirQuotaError(f"Working directory quota exceeded ({usage / 1024**3:.1f} GB used, {requiredBytes / 1024**3:.1f} GB required, "
+                                        f"{self.maxBytes / 1024**3:.1f} GB allowed). Wait for running jobs to finish or increase the quota.")
+
+    def removeStale(self) -> None:
+        """Remove unfinished directories left behind by earlier sessions (e.g. after a crash)."""
+        now = time.time()
+        with self._lock:
+            for path in self._getDirs():
+                if path in self._active or os.path.isfile(os.path.join(path, DONE_FILE)):
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > self.staleAge:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+            self._prune()
+
+    def clear(self) -> None:
+        """Remove all finished directories."""
+        with self._lock:
+            for path in self._getFinishedDirs():
+                shutil.rmtree(path, ignore_errors=True)